@@ -18,6 +18,7 @@ SHARED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_filters',
     'rest_framework',
     'rest_framework_simplejwt',
@@ -49,7 +50,7 @@ INSTALLED_APPS = SHARED_APPS + [
 ]
 
 MIDDLEWARE = [
-    'django_tenants.middleware.main.TenantMainMiddleware',
+    'institution.middleware.CachedTenantMainMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -212,4 +213,18 @@ CACHES = {
         },
         'KEY_PREFIX': 'smile-pro'
     }
-}
\ No newline at end of file
+}
+
+# Maksymalna liczba dni w jednym zapytaniu o kalendarz (date_start..date_end)
+EVENT_CALENDAR_MAX_SPAN_DAYS = 62
+
+# Cache hostname -> tenant w pamięci procesu (institution/middleware.py)
+TENANT_CACHE_SIZE = 1024
+TENANT_CACHE_TTL = 300
+# Zmiany tenantów i domen rozgłaszane przez wersję w Redisie do pozostałych procesów
+TENANT_CACHE_BROADCAST = True
+# Jak często (w sekundach) proces sprawdza tę wersję
+TENANT_CACHE_BROADCAST_INTERVAL = 5
+
+# Schemat-szablon, z którego klonowane są nowe instytucje (manage.py prepare_tenant_template)
+TENANT_TEMPLATE_SCHEMA = '_tenant_template'
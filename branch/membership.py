@@ -0,0 +1,214 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from django_tenants.utils import schema_context
+
+from institution.models import Institution, UserBranchMembership
+from institution.scoped_cache import namespace, generation_key, tenant_generations
+from user_profile.models import ProfileCentralUser
+from .models import Branch
+
+# Członkostwo użytkownika w branchach bieżącego tenanta, trzymane w cache tenanta
+# (institution/scoped_cache.py): {uuid branchu: {'branch_id', 'profile_id', 'role',
+# 'is_owner'}}. Uprawnienia sprawdzają je bez zapytań do bazy; sygnały
+# z branch/signals.py unieważniają wpisy użytkowników, których dotyczy zmiana
+# profilu albo branchu.
+
+CACHE_TIMEOUT = 60 * 60
+
+# Claimy tokena JWT: {schemat: {'g': generacja tenanta, 'b': {uuid: [branch_id, profile_id, role, is_owner]}}}
+# i wersja członkostwa użytkownika. Token jest aktualny, dopóki obie liczby zgadzają się z Redisem.
+# Generacja tenanta pochodzi z institution/scoped_cache.py - podbija ją tylko unieważnienie całego tenanta.
+MEMBERSHIP_CLAIM = 'mbr'
+VERSION_CLAIM = 'mbv'
+ENTRY_FIELDS = ('branch_id', 'profile_id', 'role', 'is_owner')
+
+
+def _user_version_key(user_id):
+    # Wspólny dla wszystkich tenantów - token obejmuje je wszystkie
+    return f'membership:user:{user_id}:version'
+
+
+def _membership_key(user_id):
+    return f'membership:{user_id}'
+
+
+def collect_memberships(user_ids=None):
+    """
+    {user_id: członkostwa} w bieżącym tenancie dla podanych użytkowników
+    (None - dla wszystkich), zawsze dwoma zapytaniami.
+    """
+    profiles = ProfileCentralUser.objects.filter(branch__isnull=False, user__isnull=False)
+    owned = Branch.objects.filter(owner__user__isnull=False)
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=user_ids)
+        owned = owned.filter(owner__user_id__in=user_ids)
+
+    memberships = defaultdict(dict)
+    for user_id, profile_id, branch_id, identyficator, role, owner_user_id in profiles.values_list(
+        'user_id', 'id', 'branch_id', 'branch__identyficator', 'role', 'branch__owner__user_id'
+    ):
+        memberships[user_id][str(identyficator)] = {
+            'branch_id': branch_id,
+            'profile_id': profile_id,
+            'role': role,
+            'is_owner': owner_user_id == user_id,
+        }
+
+    # Właściciel nie musi mieć profilu w każdym swoim branchu
+    for user_id, branch_id, identyficator in owned.values_list('owner__user_id', 'id', 'identyficator'):
+        memberships[user_id].setdefault(str(identyficator), {
+            'branch_id': branch_id,
+            'profile_id': None,
+            'role': None,
+            'is_owner': True,
+        })
+    return memberships
+
+
+def build_memberships(user_id):
+    return collect_memberships([user_id]).get(user_id, {})
+
+
+def get_memberships(user_id):
+    scope = namespace()
+    memberships = scope.get(_membership_key(user_id))
+    if memberships is None:
+        memberships = build_memberships(user_id)
+        scope.set(_membership_key(user_id), memberships, timeout=CACHE_TIMEOUT)
+    return memberships
+
+
+def get_membership(user_id, branch_uuid):
+    if user_id is None or not branch_uuid:
+        return None
+    return get_memberships(user_id).get(str(branch_uuid))
+
+
+def _pinned(key):
+    # Token ufa tylko licznikom, które istnieją w Redisie - po jego wyczyszczeniu
+    # brak klucza oznacza nieaktualny token, a nie "wersję 0"
+    cache.add(key, 1, timeout=None)
+    return cache.get(key)
+
+
+def token_user_version(user_id):
+    return _pinned(_user_version_key(user_id))
+
+
+def token_generations(schema_names):
+    # Generacje cache tenantów - każde unieważnienie tenanta unieważnia też token
+    return tenant_generations(schema_names)
+
+
+def token_claims(user_version, memberships_by_schema):
+    """
+    Claimy członkostwa do tokena z {schemat: (generacja, członkostwa)}. Wersję
+    użytkownika i generacje trzeba odczytać przed zbudowaniem członkostw - wtedy
+    zmiana w międzyczasie oznaczy token jako nieaktualny, a nie zgubi się.
+    """
+    return {
+        MEMBERSHIP_CLAIM: {
+            schema: {
+                'g': generation,
+                'b': {uuid: [entry[field] for field in ENTRY_FIELDS] for uuid, entry in memberships.items()},
+            }
+            for schema, (generation, memberships) in memberships_by_schema.items()
+        },
+        VERSION_CLAIM: user_version,
+    }
+
+
+def get_token_membership(token, user_id, branch_uuid):
+    """
+    (aktualny, wpis) z claimów tokena dla bieżącego tenanta. Gdy token nie ma
+    claimów dla tego schematu albo członkostwo zmieniło się po jego wydaniu,
+    zwraca (False, None) i trzeba sięgnąć do get_membership.
+    """
+    claims = token.get(MEMBERSHIP_CLAIM) if token is not None and hasattr(token, 'get') else None
+    tenant = claims.get(connection.schema_name) if claims else None
+    if tenant is None:
+        return False, None
+
+    user_key, tenant_key = _user_version_key(user_id), generation_key()
+    versions = cache.get_many([user_key, tenant_key])
+    if versions.get(user_key) != token.get(VERSION_CLAIM) or versions.get(tenant_key) != tenant['g']:
+        return False, None
+
+    entry = tenant['b'].get(str(branch_uuid))
+    return True, dict(zip(ENTRY_FIELDS, entry)) if entry is not None else None
+
+
+def _bump(key):
+    if not cache.add(key, 1, timeout=None):
+        cache.incr(key)
+
+
+def invalidate_user(user_id):
+    if user_id is None:
+        return
+    scope = namespace()
+    key = _membership_key(user_id)
+    version_key = _user_version_key(user_id)
+    # Jak w occupancy: kasujemy od razu i ponownie po commicie
+    scope.delete(key)
+    _bump(version_key)
+
+    def on_commit():
+        scope.delete(key)
+        _bump(version_key)
+
+    transaction.on_commit(on_commit)
+
+
+# Kopia członkostw w schemacie public (institution.UserBranchMembership) - z niej
+# logowanie buduje listę instytucji i claimy tokena bez przełączania schematów.
+
+def _index_rows(institution, memberships):
+    return [
+        UserBranchMembership(
+            user_id=user_id,
+            institution=institution,
+            branch_identyficator=identyficator,
+            branch_pk=entry['branch_id'],
+            profile_pk=entry['profile_id'],
+            role=entry['role'],
+            is_owner=entry['is_owner'],
+        )
+        for user_id, user_memberships in memberships.items()
+        for identyficator, entry in user_memberships.items()
+    ]
+
+
+def current_institution():
+    return Institution.objects.filter(schema_name=connection.schema_name).first()
+
+
+def indexed_users(institution, branch_identyficator):
+    return set(UserBranchMembership.objects.filter(
+        institution=institution, branch_identyficator=branch_identyficator
+    ).values_list('user_id', flat=True))
+
+
+def sync_index(institution, user_ids):
+    """
+    Odświeża kopię członkostw podanych użytkowników w bieżącym tenancie.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if institution is None or not user_ids:
+        return
+    UserBranchMembership.objects.filter(institution=institution, user_id__in=user_ids).delete()
+    UserBranchMembership.objects.bulk_create(_index_rows(institution, collect_memberships(user_ids)))
+
+
+def rebuild_index(institution):
+    """
+    Buduje od nowa kopię członkostw całej instytucji; zwraca liczbę wierszy.
+    """
+    with schema_context(institution.schema_name), transaction.atomic():
+        rows = _index_rows(institution, collect_memberships())
+        UserBranchMembership.objects.filter(institution=institution).delete()
+        UserBranchMembership.objects.bulk_create(rows)
+    return len(rows)
@@ -0,0 +1,115 @@
+from rest_framework.exceptions import NotFound
+
+from user_profile.models import ProfileCentralUser
+from .models import Branch
+from . import membership
+
+# Branch z `branch_uuid` w URL-u i profil zalogowanego użytkownika w tym branchu
+# pobieramy raz na żądanie i trzymamy na obiekcie żądania. Uprawnienia, widoki
+# i serializery korzystają z tych samych obiektów i filtrują po `branch_id`.
+
+BRANCH_NOT_FOUND = "Nie znaleziono branchu o podanym identyfikatorze."
+
+_UNSET = object()
+
+
+def _state(request):
+    # Request z DRF opakowuje HttpRequest; stan trzymamy na tym drugim, żeby był
+    # wspólny dla wszystkich opakowań tego samego żądania.
+    http_request = getattr(request, '_request', request)
+    state = getattr(http_request, '_branch_context', None)
+    if state is None:
+        state = {'branch': _UNSET, 'profile': _UNSET, 'membership': _UNSET}
+        http_request._branch_context = state
+    return state
+
+
+def get_branch_uuid(request):
+    # Request z DRF zna argumenty widoku; zwykły HttpRequest - tylko z resolvera
+    parser_context = getattr(request, 'parser_context', None)
+    if parser_context and 'kwargs' in parser_context:
+        return parser_context['kwargs'].get('branch_uuid')
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        return None
+    return resolver_match.kwargs.get('branch_uuid')
+
+
+def get_branch(request):
+    """
+    Branch z URL-a albo None, jeśli nie istnieje.
+    """
+    state = _state(request)
+    if state['branch'] is _UNSET:
+        branch_uuid = get_branch_uuid(request)
+        state['branch'] = (
+            Branch.objects.select_related('owner').filter(identyficator=branch_uuid).first()
+            if branch_uuid else None
+        )
+    return state['branch']
+
+
+def get_profile(request):
+    """
+    Profil zalogowanego użytkownika w branchu z URL-a albo None.
+    """
+    state = _state(request)
+    if state['profile'] is _UNSET:
+        branch_uuid = get_branch_uuid(request)
+        profile = None
+        if branch_uuid and request.user.is_authenticated:
+            profile = ProfileCentralUser.objects.select_related('branch__owner').filter(
+                user=request.user, branch__identyficator=branch_uuid
+            ).first()
+        state['profile'] = profile
+        # Profil przynosi ze sobą branch - nie trzeba go pobierać drugi raz
+        if profile is not None and state['branch'] is _UNSET:
+            state['branch'] = profile.branch
+    return state['profile']
+
+
+def get_membership(request):
+    """
+    Wpis członkostwa użytkownika w branchu z URL-a albo None: z claimów tokena,
+    jeśli są aktualne, w przeciwnym razie z cache (patrz branch/membership.py).
+    """
+    state = _state(request)
+    if state['membership'] is _UNSET:
+        user_id = request.user.id if request.user.is_authenticated else None
+        branch_uuid = get_branch_uuid(request)
+        fresh, entry = False, None
+        if user_id is not None and branch_uuid:
+            fresh, entry = membership.get_token_membership(getattr(request, 'auth', None), user_id, branch_uuid)
+        state['membership'] = entry if fresh else membership.get_membership(user_id, branch_uuid)
+    return state['membership']
+
+
+def get_branch_id(request):
+    # Dla członków branchu id jest już w cache członkostwa - bez zapytania o Branch
+    entry = get_membership(request)
+    if entry is not None:
+        return entry['branch_id']
+    branch = get_branch(request)
+    return branch.id if branch is not None else None
+
+
+class BranchContextMixin:
+    """
+    Dla widoków pod `<uuid:branch_uuid>/`: self.get_branch() / self.get_profile()
+    z jednym zapytaniem na żądanie.
+    """
+
+    def get_branch(self):
+        branch = get_branch(self.request)
+        if branch is None:
+            raise NotFound(BRANCH_NOT_FOUND)
+        return branch
+
+    def get_profile(self):
+        return get_profile(self.request)
+
+    def get_branch_id(self):
+        branch_id = get_branch_id(self.request)
+        if branch_id is None:
+            raise NotFound(BRANCH_NOT_FOUND)
+        return branch_id
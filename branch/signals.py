@@ -0,0 +1,57 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from institution.scoped_cache import invalidate_branch
+from user_profile.models import ProfileCentralUser
+from .models import Branch
+from .membership import invalidate_user, current_institution, indexed_users, sync_index
+
+
+@receiver(pre_save, sender=ProfileCentralUser)
+def store_profile_old_user(sender, instance, **kwargs):
+    instance._membership_old_user_id = None
+    if instance.pk:
+        instance._membership_old_user_id = ProfileCentralUser.objects.filter(pk=instance.pk).values_list(
+            'user_id', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=ProfileCentralUser)
+@receiver(post_delete, sender=ProfileCentralUser)
+def invalidate_profile_membership(sender, instance, **kwargs):
+    # Przepięcie profilu na innego użytkownika zmienia członkostwo obu
+    user_ids = {instance.user_id, getattr(instance, '_membership_old_user_id', None)} - {None}
+    for user_id in user_ids:
+        invalidate_user(user_id)
+    sync_index(current_institution(), user_ids)
+
+
+@receiver(pre_save, sender=Branch)
+def store_branch_old_owner(sender, instance, **kwargs):
+    instance._membership_old_owner_id = None
+    if instance.pk:
+        instance._membership_old_owner_id = Branch.objects.filter(pk=instance.pk).values_list(
+            'owner_id', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+def invalidate_branch_membership(sender, instance, **kwargs):
+    # Cache w przestrzeni branchu; cache tenanta (mapy zajętości, claimy innych
+    # użytkowników) zostaje nietknięty
+    invalidate_branch(instance.id)
+
+    # Członkowie branchu (z kopii członkostw - przy usuwaniu profile już zniknęły)
+    # oraz poprzedni i nowy właściciel
+    owner_ids = {instance.owner_id, getattr(instance, '_membership_old_owner_id', None)} - {None}
+    user_ids = set(ProfileCentralUser.objects.filter(pk__in=owner_ids, user__isnull=False).values_list('user_id', flat=True))
+    institution = current_institution()
+    if institution is not None:
+        user_ids |= indexed_users(institution, instance.identyficator)
+    else:
+        user_ids |= set(ProfileCentralUser.objects.filter(branch=instance, user__isnull=False).values_list('user_id', flat=True))
+
+    for user_id in user_ids:
+        invalidate_user(user_id)
+    sync_index(institution, user_ids)
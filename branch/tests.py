@@ -1,3 +1,155 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from django_tenants.utils import tenant_context
+
+from institution.models import CentralUser, Domain
+from institution.serializers import InstitutionSerializer
+from branch.models import Branch
+from user_profile.models import ProfileCentralUser
+from branch.membership import get_memberships
+from institution.scoped_cache import namespace
+
+
+class BranchContextTestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+        self.client = APIClient()
+        payload = {
+            "name": "Instytucja Kontekst",
+            "owner_email": "kontekst@example.com",
+            "owner_password": "test12345",
+            "owner_name": "Jan",
+            "owner_surname": "Kowalski",
+            "owner_phone_number": "+48123456789",
+        }
+        serializer = InstitutionSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.institution = serializer.save()
+        self.domain_obj = Domain.objects.get(tenant=self.institution)
+
+        self.owner_user = CentralUser.objects.get(email=payload["owner_email"])
+        self.client.force_authenticate(user=self.owner_user)
+
+        with tenant_context(self.institution):
+            self.branch = Branch.objects.filter(is_mother=True).first()
+            self.employee_user = CentralUser.objects.create_user(email="pracownik@example.com")
+            ProfileCentralUser.objects.create(user=self.employee_user, branch=self.branch, role='doctor')
+
+        self.url = f"/{self.branch.identyficator}/"
+
+    def tearDown(self):
+        connection.set_schema_to_public()
+
+    def lookups(self, queries):
+        # Zapytania o branch lub profil - tylko to, co rozwiązuje kontekst żądania
+        return [
+            query['sql'] for query in queries
+            if 'FROM "branch_branch"' in query['sql'] or 'FROM "user_profile_profilecentraluser"' in query['sql']
+        ]
+
+    def test_branch_and_profile_resolved_once(self):
+        response = self.client.post(
+            self.url + "events/office/", data={"name": "Gabinet 1"}, format='json', HTTP_HOST=self.domain_obj.domain
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+
+        # Członkostwo jest już w cache - odczyt listy nie pyta ani o branch, ani o profil
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url + "events/office/", HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(self.lookups(queries.captured_queries), [])
+
+    def test_membership_invalidated_on_profile_delete(self):
+        self.client.force_authenticate(user=self.employee_user)
+        response = self.client.get(self.url + "events/office/", HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with tenant_context(self.institution):
+            ProfileCentralUser.objects.filter(user=self.employee_user).delete()
+
+        response = self.client.get(self.url + "events/office/", HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_membership_invalidated_on_owner_change(self):
+        response = self.client.get(self.url + "profiles/list-profiles/", HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with tenant_context(self.institution):
+            self.branch.refresh_from_db()
+            self.branch.owner = ProfileCentralUser.objects.get(user=self.employee_user)
+            self.branch.save()
+
+        response = self.client.get(self.url + "profiles/list-profiles/", HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def login(self):
+        client = APIClient()
+        response = client.post(
+            "/user/login/", data={"email": "kontekst@example.com", "password": "test12345"},
+            format='json', HTTP_HOST=self.domain_obj.domain
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        self.assertEqual(response.json()['institutions'][0]['domains'], [f"{self.domain_obj.domain}/{self.branch.identyficator}"])
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        return client
+
+    def test_membership_from_token_claims(self):
+        client = self.login()
+        # Członkostwo jest w tokenie - ani cache członkostwa, ani baza nie są potrzebne
+        with patch('branch.membership.get_memberships', side_effect=AssertionError), \
+                CaptureQueriesContext(connection) as queries:
+            response = client.get(self.url + "events/office/", HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.lookups(queries.captured_queries), [])
+
+    def test_stale_token_claims_fall_back(self):
+        client = self.login()
+        with tenant_context(self.institution):
+            Branch.objects.filter(pk=self.branch.pk).update(owner=None)
+            self.branch.refresh_from_db()
+            self.branch.save()
+
+        response = client.get(self.url + "profiles/list-profiles/", HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        # Wyczyszczony Redis to też nieaktualny token, a nie "wersja 0"
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(self.url + "events/office/", HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(self.lookups(queries.captured_queries), [])
+
+    def test_branch_edit_keeps_tenant_cache(self):
+        with tenant_context(self.institution):
+            namespace().set('occupancy:test', 1)
+            self.assertEqual(len(get_memberships(self.employee_user.id)), 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                other = Branch.objects.create(name="Filia", owner=ProfileCentralUser.objects.get(user=self.employee_user))
+                other.name = "Filia 2"
+                other.save()
+
+            # Cache tenanta (np. mapy zajętości) przetrwał, a członkostwo nowego właściciela jest odświeżone
+            self.assertEqual(namespace().get('occupancy:test'), 1)
+            self.assertTrue(get_memberships(self.employee_user.id)[str(other.identyficator)]['is_owner'])
+
+    def test_current_profile(self):
+        response = self.client.get(self.url + "profiles/me/", HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['profile']['name'], "Jan")
+
+    def test_owner_permission(self):
+        response = self.client.get(self.url + "profiles/list-profiles/", HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
 
-# Create your tests here.
+        self.client.force_authenticate(user=self.employee_user)
+        response = self.client.get(self.url + "profiles/list-profiles/", HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
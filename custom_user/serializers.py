@@ -1,47 +1,66 @@
+from collections import defaultdict
+
+from django.contrib.auth.models import update_last_login
+from django.db.models import OuterRef, Subquery
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from institution.models import Institution, Domain, UserInstitution
-from user_profile.models import ProfileCentralUser
-from django_tenants.utils import schema_context
+from rest_framework_simplejwt.settings import api_settings
+from institution.models import Institution, Domain, UserBranchMembership
+from branch import membership
 from rest_framework import serializers
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
-        data = super().validate(attrs)
+        # Tokeny wystawiamy niżej sami, żeby dopisać do nich claimy członkostwa
+        data = super(TokenObtainPairSerializer, self).validate(attrs)
         user = self.user
+        user_version = membership.token_user_version(user.id)
 
-        # Get the institutions the user is associated with
-        user_institutions = UserInstitution.objects.filter(user=user).select_related('institution')
-        institutions = [ui.institution for ui in user_institutions]
+        # Instytucje użytkownika razem z domeną - jedno zapytanie
+        institutions = list(
+            Institution.objects.filter(userinstitution__user=user).annotate(
+                domain_name=Subquery(
+                    Domain.objects.filter(tenant=OuterRef('pk')).order_by('-is_primary', 'id').values('domain')[:1]
+                )
+            ).order_by('id')
+        )
+        generations = membership.token_generations([institution.schema_name for institution in institutions])
 
-        # Get the domains for the institutions
-        domains = Domain.objects.filter(tenant__in=institutions).select_related('tenant')
-        institution_domain_map = {domain.tenant.id: domain.domain for domain in domains}
+        # Członkostwa ze wszystkich instytucji z kopii w schemacie public - bez przełączania schematów
+        memberships = defaultdict(dict)
+        for row in UserBranchMembership.objects.filter(user=user).order_by('institution_id', 'id'):
+            memberships[row.institution_id][str(row.branch_identyficator)] = {
+                'branch_id': row.branch_pk,
+                'profile_id': row.profile_pk,
+                'role': row.role,
+                'is_owner': row.is_owner,
+            }
 
         institutions_data = []
+        memberships_by_schema = {}
         for institution in institutions:
-            domain_name = institution_domain_map.get(institution.id)
-            domains_list = []
-
-            # Switch to the tenant's schema
-            with schema_context(institution.schema_name):
-                # Get the user's profiles in this tenant
-                profiles = ProfileCentralUser.objects.filter(user=user)
-                # For each profile, get the branch
-                for profile in profiles:
-                    branch = profile.branch
-                    if branch:
-                        branch_uuid = branch.identyficator
-                        # Construct the full domain URL
-                        full_domain = f"{domain_name}/{branch_uuid}"
-                        domains_list.append(full_domain)
-
-            institution_data = {
+            institution_memberships = memberships.get(institution.id, {})
+            memberships_by_schema[institution.schema_name] = (generations[institution.schema_name], institution_memberships)
+
+            institutions_data.append({
                 'name': institution.name,
                 'address': institution.address,
-                'domains': domains_list,
-            }
-            institutions_data.append(institution_data)
+                'domains': [
+                    f"{institution.domain_name}/{branch_uuid}"
+                    for branch_uuid, entry in institution_memberships.items()
+                    if entry['profile_id'] is not None
+                ],
+            })
+
+        # Claimy na refresh tokenie - access token i tokeny z odświeżenia je dziedziczą
+        refresh = self.get_token(user)
+        for claim, value in membership.token_claims(user_version, memberships_by_schema).items():
+            refresh[claim] = value
+
+        data['refresh'] = str(refresh)
+        data['access'] = str(refresh.access_token)
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
 
         data['institutions'] = institutions_data
         return data
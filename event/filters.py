@@ -7,4 +7,4 @@ class EventFilter(filters.FilterSet):
 
     class Meta:
         model = Event
-        fields = ['doctor', 'office', 'patient', 'date']
\ No newline at end of file
+        fields = ['doctor', 'office', 'patient', 'date', 'rep_id']
\ No newline at end of file
@@ -0,0 +1,61 @@
+from bisect import bisect_right
+
+# Interwały to pary (start, end) w minutach od północy, półotwarte [start, end).
+# Wszystkie funkcje poza merge_intervals zakładają listy posortowane i rozłączne
+# (wynik merge_intervals).
+
+MINUTES_IN_DAY = 24 * 60
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def to_interval(start_time, end_time):
+    return to_minutes(start_time), to_minutes(end_time)
+
+
+def merge_intervals(intervals):
+    """
+    Sortuje i scala nachodzące na siebie lub stykające się interwały.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def covers(intervals, interval):
+    """
+    Czy `interval` mieści się w całości w jednym z interwałów.
+    """
+    start, end = interval
+    index = bisect_right(intervals, (start, MINUTES_IN_DAY + 1)) - 1
+    return index >= 0 and intervals[index][0] <= start and end <= intervals[index][1]
+
+
+def overlaps_any(intervals, interval):
+    """
+    Czy `interval` nachodzi na którykolwiek z interwałów.
+    """
+    start, end = interval
+    index = bisect_right(intervals, (start, MINUTES_IN_DAY + 1))
+    if index > 0 and intervals[index - 1][1] > start:
+        return True
+    return index < len(intervals) and intervals[index][0] < end
+
+
+def iter_slots(free_intervals, length):
+    """
+    Dzieli wolne interwały na kolejne sloty o długości `length` minut.
+    """
+    for start, end in free_intervals:
+        while start + length <= end:
+            yield start, start + length
+            start += length
@@ -0,0 +1,101 @@
+import time as timer
+from datetime import datetime, time, timedelta
+
+import orjson
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django_tenants.utils import schema_context
+
+from branch.models import Branch
+from user_profile.models import ProfileCentralUser
+from event.models import Event
+from event.serializers import EventCalendarSerializer, EventListSerializer, EventCalendarRows, EventListRows
+
+SLOT_MINUTES = 10
+SLOTS_PER_DAY = 80
+
+
+class Command(BaseCommand):
+    help = "Porównuje odczyt kalendarza i listy wizyt przez serializery modelowe i przez .values()."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', required=True, help="Schemat tenanta.")
+        parser.add_argument('--branch', required=True, help="Identyfikator (UUID) branchu.")
+        parser.add_argument('--date-start', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(), required=True)
+        parser.add_argument('--date-end', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(), required=True)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help="Dołóż tyle sztucznych wizyt na czas pomiaru (zmiany są wycofywane)."
+        )
+
+    def handle(self, *args, **options):
+        with schema_context(options['schema']):
+            try:
+                branch = Branch.objects.get(identyficator=options['branch'])
+            except Branch.DoesNotExist:
+                raise CommandError("Nie znaleziono branchu o podanym identyfikatorze.")
+
+            with transaction.atomic():
+                if options['seed']:
+                    self.seed(branch, options['date_start'], options['seed'])
+
+                queryset = Event.objects.filter(
+                    branch=branch,
+                    date__range=(options['date_start'], options['date_end'])
+                ).order_by('date', 'start_time', 'id')
+                self.stdout.write(f"Wizyt w oknie: {queryset.count()}")
+
+                self.compare(
+                    'kalendarz', options['repeat'],
+                    lambda: EventCalendarSerializer(queryset.select_related('doctor', 'office', 'visit_type'), many=True).data,
+                    lambda: EventCalendarRows.many(EventCalendarRows.values(queryset)),
+                )
+                self.compare(
+                    'lista', options['repeat'],
+                    lambda: EventListSerializer(queryset.select_related('doctor', 'patient', 'event_status'), many=True).data,
+                    lambda: EventListRows.many(EventListRows.values(queryset)),
+                )
+
+                transaction.set_rollback(True)
+
+    def seed(self, branch, first_date, count):
+        doctor = ProfileCentralUser.objects.filter(branch=branch, role='doctor').first()
+        if doctor is None:
+            raise CommandError("Do wygenerowania wizyt potrzebny jest lekarz w branchu.")
+
+        events = []
+        for index in range(count):
+            day, slot = divmod(index, SLOTS_PER_DAY)
+            start = datetime.combine(first_date, time(8)) + timedelta(minutes=slot * SLOT_MINUTES)
+            events.append(Event(
+                branch=branch,
+                doctor=doctor,
+                date=first_date + timedelta(days=day),
+                start_time=start.time(),
+                end_time=(start + timedelta(minutes=SLOT_MINUTES)).time(),
+            ))
+        # Kolizje z istniejącymi wizytami lekarza pomijamy - liczy się wolumen, nie dokładna liczba
+        Event.objects.bulk_create(events, ignore_conflicts=True)
+
+    def compare(self, label, repeat, serializer_path, values_path):
+        serializer_time, serializer_output = self.measure(serializer_path, repeat)
+        values_time, values_output = self.measure(values_path, repeat)
+
+        if orjson.loads(serializer_output) != orjson.loads(values_output):
+            raise CommandError(f"{label}: wyniki obu ścieżek się różnią.")
+
+        self.stdout.write(
+            f"{label}: serializer {serializer_time * 1000:.1f} ms, values {values_time * 1000:.1f} ms "
+            f"(x{serializer_time / values_time if values_time else 0:.1f}), {len(values_output)} B"
+        )
+
+    def measure(self, path, repeat):
+        best = None
+        output = b''
+        for _ in range(max(repeat, 1)):
+            started = timer.perf_counter()
+            output = orjson.dumps(path())
+            elapsed = timer.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, output
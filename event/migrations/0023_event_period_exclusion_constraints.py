@@ -0,0 +1,92 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:14
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.indexes
+import event.models
+from django.db import migrations, models
+
+
+# Ograniczenia EXCLUDE i kolumna period nie powstaną na danych, które je łamią:
+# wizyty kończące się przed rozpoczęciem (tsrange odrzuca taki zakres) oraz
+# nakładające się rezerwacje lekarza, gabinetu lub asystenta (stary kod sprawdzał
+# kolizje przed zapisem, więc równoległe żądania mogły je przepuścić). Takie
+# wiersze trzeba poprawić ręcznie - migracja przerywa się przed jakąkolwiek
+# zmianą schematu i wypisuje ich id, zamiast zostawić tenanta w połowie.
+BOOKING_RESOURCES = ('doctor_id', 'office_id', 'assistant_id')
+
+
+def find_booking_conflicts(cursor, table):
+    """
+    (id wizyt z end_time < start_time, {kolumna: [(id, id), ...]} nakładających się par).
+    """
+    cursor.execute(f'SELECT id FROM {table} WHERE end_time < start_time ORDER BY id')
+    reversed_ids = [row[0] for row in cursor.fetchall()]
+
+    overlaps = {}
+    for column in BOOKING_RESOURCES:
+        # Pusty zakres (start = end) z niczym się nie nakłada
+        cursor.execute(
+            f'SELECT a.id, b.id FROM {table} a JOIN {table} b '
+            f'ON a.{column} = b.{column} AND a.date = b.date AND a.id < b.id '
+            f'WHERE a.start_time < a.end_time AND b.start_time < b.end_time '
+            f'AND a.start_time < b.end_time AND b.start_time < a.end_time '
+            f'ORDER BY a.id, b.id'
+        )
+        pairs = cursor.fetchall()
+        if pairs:
+            overlaps[column] = pairs
+    return reversed_ids, overlaps
+
+
+def check_existing_bookings(apps, schema_editor):
+    connection = schema_editor.connection
+    table = connection.ops.quote_name(apps.get_model('event', 'Event')._meta.db_table)
+    with connection.cursor() as cursor:
+        reversed_ids, overlaps = find_booking_conflicts(cursor, table)
+    if not reversed_ids and not overlaps:
+        return
+
+    lines = [f"Schemat {getattr(connection, 'schema_name', '?')}: wizyty blokujące ograniczenia EXCLUDE."]
+    if reversed_ids:
+        lines.append(f"end_time < start_time: {', '.join(map(str, reversed_ids))}")
+    for column, pairs in overlaps.items():
+        lines.append(f"nakładające się ({column}): {', '.join(f'{a}/{b}' for a, b in pairs)}")
+    lines.append("Popraw godziny, przenieś albo odepnij zasób od jednej z wizyt w parze i uruchom migrację ponownie.")
+    raise RuntimeError('\n'.join(lines))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('event', '0022_alter_eventstatus_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_existing_bookings, migrations.RunPython.noop),
+        # Rozszerzenie trafia do schematu public, żeby operator class była widoczna dla każdego tenanta
+        migrations.RunSQL(
+            sql='CREATE EXTENSION IF NOT EXISTS btree_gist WITH SCHEMA public',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='period',
+            field=models.GeneratedField(db_persist=True, expression=event.models.TsRange(event.models.DateTimeCombine(models.F('date'), models.F('start_time')), event.models.DateTimeCombine(models.F('date'), models.F('end_time'))), output_field=event.models.TimestampRangeField()),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['patient', 'period'], name='event_patient_period_gist'),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(expressions=[('doctor', '='), ('period', '&&')], name='event_doctor_no_overlap'),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(expressions=[('office', '='), ('period', '&&')], name='event_office_no_overlap'),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(expressions=[('assistant', '='), ('period', '&&')], name='event_assistant_no_overlap'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_counters(apps, schema_editor):
+    # Dotychczas numer był unikalny w obrębie dnia (bez względu na branch), więc każdy
+    # licznik startuje od maksimum z całego dnia - nowe numery nie powtórzą starych.
+    Event = apps.get_model('event', 'Event')
+    EventNumberCounter = apps.get_model('event', 'EventNumberCounter')
+
+    last_numbers = {}
+    for row in Event.objects.filter(event_status__number__isnull=False).values('date').annotate(m=Max('event_status__number')):
+        if row['m'] and row['m'].isdigit():
+            last_numbers[row['date']] = int(row['m'])
+
+    pairs = Event.objects.filter(date__in=last_numbers).values_list('branch_id', 'date').distinct()
+    EventNumberCounter.objects.bulk_create([
+        EventNumberCounter(branch_id=branch_id, date=date, last_number=last_numbers[date])
+        for branch_id, date in pairs
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branch', '0005_branchinfo'),
+        ('event', '0023_event_period_exclusion_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventNumberCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('last_number', models.PositiveIntegerField(default=0)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='event_number_counters', to='branch.branch')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('branch', 'date'), name='event_number_counter_branch_date')],
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
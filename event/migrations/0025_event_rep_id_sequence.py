@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('event', '0024_event_number_counter'),
+    ]
+
+    operations = [
+        # Sekwencja powstaje w schemacie tenanta (search_path migracji) i startuje za dotychczasowym maksimum
+        migrations.RunSQL(
+            sql=[
+                'CREATE SEQUENCE IF NOT EXISTS event_rep_id_seq',
+                "SELECT setval('event_rep_id_seq', COALESCE((SELECT MAX(rep_id) FROM event_event), 0) + 1, false)",
+            ],
+            reverse_sql='DROP SEQUENCE IF EXISTS event_rep_id_seq',
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['rep_id'], name='event_rep_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('event', '0025_event_rep_id_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['branch', 'date', 'start_time', 'id'], name='event_branch_keyset_idx'),
+        ),
+    ]
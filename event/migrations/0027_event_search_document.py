@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:40
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('event', '0026_event_keyset_index'),
+    ]
+
+    operations = [
+        # Jak btree_gist - rozszerzenie w schemacie public, widoczne dla wszystkich tenantów
+        migrations.RunSQL(
+            sql='CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('search_document'), name='gin_trgm_ops'), name='event_search_trgm'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE event_event e SET search_document =
+                    COALESCE((SELECT name FROM user_profile_profilecentraluser WHERE id = e.doctor_id), '') || ' ' ||
+                    COALESCE((SELECT surname FROM user_profile_profilecentraluser WHERE id = e.doctor_id), '') || ' ' ||
+                    COALESCE((SELECT name FROM patients_patient WHERE id = e.patient_id), '') || ' ' ||
+                    COALESCE((SELECT surname FROM patients_patient WHERE id = e.patient_id), '') || ' ' ||
+                    COALESCE((SELECT status FROM event_eventstatus WHERE id = e.event_status_id), '') || ' ' ||
+                    e.date::varchar
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,4 +1,10 @@
-from django.db import models
+from django.db import models, connections
+from django.db.models import F, Func
+from django.db.backends.postgresql.psycopg_any import DateTimeRange
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
+from django.contrib.postgres.indexes import GistIndex, GinIndex, OpClass
+from django.db.models.functions import Upper
 from user_profile.models import ProfileCentralUser
 from patients.models import Patient
 from branch.models import Branch
@@ -20,11 +26,79 @@ Statuses_of_Event = [
 ]
 
 
+class TimestampRangeField(DateTimeRangeField):
+    """
+    tsrange - zakres bez strefy czasowej, bo Event trzyma datę i godziny lokalne.
+    """
+    range_type = DateTimeRange
+
+    def db_type(self, connection):
+        return 'tsrange'
+
+
+class DateTimeCombine(Func):
+    template = '(%(expressions)s)'
+    arg_joiner = ' + '
+    output_field = models.DateTimeField()
+
+
+class TsRange(Func):
+    function = 'tsrange'
+    output_field = TimestampRangeField()
+
+
 class EventStatus(models.Model):
     number = models.CharField(max_length=5, null=True)
     status = models.CharField(choices=Statuses_of_Event, default='planned', max_length=255)
 
 
+class EventNumberCounterManager(models.Manager):
+
+    def allocate(self, branch, date, count=1):
+        """
+        Rezerwuje `count` kolejnych numerów wizyt na dany dzień i zwraca pierwszy z nich.
+        """
+        return self.allocate_many(branch, {date: count})[date]
+
+    def allocate_many(self, branch, counts):
+        """
+        Rezerwuje numery dla wielu dni jednym zapytaniem: {date: count} -> {date: pierwszy numer}.
+        Licznik jest podbijany przez INSERT ... ON CONFLICT DO UPDATE, więc równoległe
+        zapisy dostają rozłączne zakresy bez blokowania całej tabeli.
+        """
+        counts = {date: count for date, count in counts.items() if count > 0}
+        if not counts:
+            return {}
+
+        table = connections[self.db].ops.quote_name(self.model._meta.db_table)
+        values = ', '.join(['(%s, %s, %s)'] * len(counts))
+        params = []
+        for date, count in counts.items():
+            params.extend([branch.id, date, count])
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (branch_id, date, last_number) VALUES {values} "
+                f"ON CONFLICT (branch_id, date) DO UPDATE SET last_number = {table}.last_number + EXCLUDED.last_number "
+                f"RETURNING date, last_number",
+                params
+            )
+            return {date: last_number - counts[date] + 1 for date, last_number in cursor.fetchall()}
+
+
+class EventNumberCounter(models.Model):
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='event_number_counters')
+    date = models.DateField()
+    last_number = models.PositiveIntegerField(default=0)
+
+    objects = EventNumberCounterManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['branch', 'date'], name='event_number_counter_branch_date'),
+        ]
+
+
 class Office(models.Model):
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='office', default=None)
     name = models.CharField(max_length=255)
@@ -46,6 +120,19 @@ class Tags(models.Model):
         unique_together = ('branch', 'name')
 
 
+class EventManager(models.Manager):
+    # Sekwencja jest tworzona migracją w schemacie każdego tenanta
+    rep_id_sequence = 'event_rep_id_seq'
+
+    def next_rep_id(self):
+        """
+        Nowy identyfikator serii wizyt cyklicznych (rep_id).
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute("SELECT nextval(%s)", [self.rep_id_sequence])
+            return cursor.fetchone()[0]
+
+
 class Event(models.Model):
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='events', default=None)
     doctor = models.ForeignKey(ProfileCentralUser, on_delete=models.CASCADE)
@@ -62,11 +149,39 @@ class Event(models.Model):
     is_rep = models.BooleanField(default=False)
     rep_id = models.IntegerField(default=0)
     event_status = models.OneToOneField(EventStatus, null=True, blank=True, related_name='event', on_delete=models.CASCADE)
+    period = models.GeneratedField(
+        expression=TsRange(DateTimeCombine(F('date'), F('start_time')), DateTimeCombine(F('date'), F('end_time'))),
+        output_field=TimestampRangeField(),
+        db_persist=True,
+    )
+
+    # Utrzymywane przez event/search.py - lekarz, pacjent, status i data w jednym polu
+    search_document = models.TextField(blank=True, default='', editable=False)
+
+    objects = EventManager()
     
     class Meta:
         indexes = [
+            models.Index(fields=['rep_id'], name='event_rep_id_idx'),
+            models.Index(fields=['branch', 'date', 'start_time', 'id'], name='event_branch_keyset_idx'),
             models.Index(fields=['doctor', 'date']),
             models.Index(fields=['office', 'date']),
+            GistIndex(fields=['patient', 'period'], name='event_patient_period_gist'),
+            GinIndex(OpClass(Upper('search_document'), name='gin_trgm_ops'), name='event_search_trgm'),
+        ]
+        constraints = [
+            ExclusionConstraint(
+                name='event_doctor_no_overlap',
+                expressions=[('doctor', RangeOperators.EQUAL), ('period', RangeOperators.OVERLAPS)],
+            ),
+            ExclusionConstraint(
+                name='event_office_no_overlap',
+                expressions=[('office', RangeOperators.EQUAL), ('period', RangeOperators.OVERLAPS)],
+            ),
+            ExclusionConstraint(
+                name='event_assistant_no_overlap',
+                expressions=[('assistant', RangeOperators.EQUAL), ('period', RangeOperators.OVERLAPS)],
+            ),
         ]
 
 
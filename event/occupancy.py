@@ -0,0 +1,280 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+
+from institution.scoped_cache import namespace
+from user_profile.models import EmployeeSchedule
+from .models import Event, PlanChange, Absence
+from .intervals import MINUTES_IN_DAY, to_interval
+
+# Mapa zajętości zasobu na dany dzień: liczba całkowita, w której bit `n`
+# oznacza, że minuta `n` od północy jest wolna. Mapy trzymamy w cache tenanta
+# (institution/scoped_cache.py) i przeliczamy leniwie; sygnały
+# z event/signals.py je unieważniają.
+
+RESOURCES = ('doctor', 'assistant', 'office')
+EMPLOYEE_RESOURCES = ('doctor', 'assistant')
+
+CACHE_TIMEOUT = 60 * 60 * 24
+BITMAP_BYTES = MINUTES_IN_DAY // 8
+FULL_DAY = (1 << MINUTES_IN_DAY) - 1
+
+
+def interval_mask(start, end):
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def is_free(bitmap, start, end):
+    mask = interval_mask(start, end)
+    return (bitmap & mask) == mask
+
+
+def bitmap_intervals(bitmap):
+    """
+    Zamienia mapę na posortowaną listę wolnych interwałów (start, end) w minutach.
+    """
+    intervals = []
+    while bitmap:
+        start = (bitmap & -bitmap).bit_length() - 1
+        shifted = bitmap >> start
+        length = (shifted ^ (shifted + 1)).bit_length() - 1
+        intervals.append((start, start + length))
+        bitmap &= ~interval_mask(start, start + length)
+    return intervals
+
+
+def intervals_bitmap(intervals):
+    bitmap = 0
+    for start, end in intervals:
+        bitmap |= interval_mask(start, end)
+    return bitmap
+
+
+def _version_key(resource, resource_id):
+    return f'occupancy:{resource}:{resource_id}:version'
+
+
+def _bitmap_key(resource, resource_id, date, version):
+    return f'occupancy:{resource}:{resource_id}:{version}:{date.isoformat()}'
+
+
+def _get_versions(scope, resource, resource_ids):
+    return _get_all_versions(scope, {resource: resource_ids})[resource]
+
+
+def _get_all_versions(scope, resource_ids):
+    keys = {
+        (resource, resource_id): _version_key(resource, resource_id)
+        for resource, ids in resource_ids.items()
+        for resource_id in ids
+    }
+    cached = scope.counters(keys.values())
+    versions = {resource: {} for resource in resource_ids}
+    for (resource, resource_id), key in keys.items():
+        versions[resource][resource_id] = cached[key]
+    return versions
+
+
+def get_day_bitmaps(resource, resource_ids, dates):
+    """
+    Zwraca {(resource_id, date): bitmap} dla wszystkich kombinacji zasobów i dat.
+    Brakujące mapy są liczone stałą liczbą zapytań i zapisywane w cache.
+    """
+    return get_resources_bitmaps({resource: resource_ids}, dates)[resource]
+
+
+def get_resources_bitmaps(resource_ids, dates):
+    """
+    Jak get_day_bitmaps, ale dla kilku typów zasobów naraz:
+    {resource: ids} -> {resource: {(resource_id, date): bitmap}}.
+    """
+    resource_ids = {resource: list(ids) for resource, ids in resource_ids.items()}
+    dates = list(dates)
+    scope = namespace()
+    versions = _get_all_versions(scope, resource_ids)
+    keys = {
+        (resource, resource_id, date): _bitmap_key(resource, resource_id, date, versions[resource][resource_id])
+        for resource, ids in resource_ids.items()
+        for resource_id in ids
+        for date in dates
+    }
+    cached = scope.get_many(keys.values())
+
+    bitmaps = {resource: {} for resource in resource_ids}
+    missing = []
+    for triple, key in keys.items():
+        resource, resource_id, date = triple
+        if key in cached:
+            bitmaps[resource][(resource_id, date)] = int.from_bytes(cached[key], 'big')
+        else:
+            missing.append(triple)
+
+    if missing:
+        missing_ids = defaultdict(set)
+        for resource, resource_id, _ in missing:
+            missing_ids[resource].add(resource_id)
+        missing_dates = {date for _, _, date in missing}
+        built = build_resources_bitmaps(missing_ids, missing_dates)
+        to_cache = {}
+        for triple in missing:
+            resource, resource_id, date = triple
+            bitmap = built[resource][(resource_id, date)]
+            bitmaps[resource][(resource_id, date)] = bitmap
+            to_cache[keys[triple]] = bitmap.to_bytes(BITMAP_BYTES, 'big')
+        scope.set_many(to_cache, timeout=CACHE_TIMEOUT)
+
+    return bitmaps
+
+
+def unavailable_dates(resource, resource_id, dates, start_time, end_time):
+    """
+    Daty, w które zasób nie może przyjąć wizyty w godzinach start_time-end_time
+    (poza grafikiem, nieobecność, zmiana planu lub kolizja z wydarzeniem).
+    """
+    mask = interval_mask(*to_interval(start_time, end_time))
+    bitmaps = get_day_bitmaps(resource, [resource_id], dates)
+    return {date for date in dates if bitmaps[(resource_id, date)] & mask != mask}
+
+
+def build_day_bitmaps(resource, resource_ids, dates):
+    return build_resources_bitmaps({resource: resource_ids}, dates)[resource]
+
+
+def build_resources_bitmaps(resource_ids, dates):
+    """
+    Liczy mapy dla {resource: ids}: jedno zapytanie o wydarzenia wszystkich zasobów
+    i po jednym o grafiki, zmiany planu i nieobecności pracowników.
+    """
+    for resource in resource_ids:
+        if resource not in RESOURCES:
+            raise ValueError(f"Nieznany typ zasobu: {resource}")
+
+    resource_ids = {resource: set(ids) for resource, ids in resource_ids.items()}
+    first_date, last_date = min(dates), max(dates)
+
+    employee_ids = set()
+    for resource in EMPLOYEE_RESOURCES:
+        employee_ids |= resource_ids.get(resource, set())
+    working = _working_bitmaps(employee_ids, dates, first_date, last_date) if employee_ids else {}
+
+    bitmaps = {}
+    for resource, ids in resource_ids.items():
+        if resource in EMPLOYEE_RESOURCES:
+            bitmaps[resource] = {(resource_id, date): working[(resource_id, date)] for resource_id in ids for date in dates}
+        else:
+            bitmaps[resource] = {(resource_id, date): FULL_DAY for resource_id in ids for date in dates}
+
+    query = Q()
+    for resource, ids in resource_ids.items():
+        if ids:
+            query |= Q(**{f'{resource}_id__in': ids})
+    if query:
+        events = Event.objects.filter(query, date__in=dates).values_list(
+            'doctor_id', 'assistant_id', 'office_id', 'date', 'start_time', 'end_time'
+        )
+        for doctor_id, assistant_id, office_id, date, start_time, end_time in events:
+            mask = ~interval_mask(*to_interval(start_time, end_time))
+            for resource, resource_id in (('doctor', doctor_id), ('assistant', assistant_id), ('office', office_id)):
+                if resource_id in resource_ids.get(resource, ()):
+                    bitmaps[resource][(resource_id, date)] &= mask
+
+    return bitmaps
+
+
+def _working_bitmaps(employee_ids, dates, first_date, last_date):
+    schedules = defaultdict(int)
+    for employee_id, day_num, start_time, end_time in EmployeeSchedule.objects.filter(
+        employee_id__in=employee_ids
+    ).values_list('employee_id', 'day_num', 'start_time', 'end_time'):
+        schedules[(employee_id, day_num)] |= interval_mask(*to_interval(start_time, end_time))
+
+    plan_changes = {}
+    for employee_id, date, start_time, end_time in PlanChange.objects.filter(
+        doctor_id__in=employee_ids,
+        date__range=(first_date, last_date)
+    ).values_list('doctor_id', 'date', 'start_time', 'end_time'):
+        plan_changes[(employee_id, date)] = interval_mask(*to_interval(start_time, end_time))
+
+    absent = set()
+    for employee_id, start_date, end_date in Absence.objects.filter(
+        profile_id__in=employee_ids,
+        start_date__lte=last_date,
+        end_date__gte=first_date
+    ).values_list('profile_id', 'start_date', 'end_date'):
+        current = max(start_date, first_date)
+        while current <= min(end_date, last_date):
+            absent.add((employee_id, current))
+            current += timedelta(days=1)
+
+    bitmaps = {}
+    for employee_id in employee_ids:
+        for date in dates:
+            if (employee_id, date) in absent:
+                bitmaps[(employee_id, date)] = 0
+            elif (employee_id, date) in plan_changes:
+                bitmaps[(employee_id, date)] = plan_changes[(employee_id, date)]
+            else:
+                bitmaps[(employee_id, date)] = schedules[(employee_id, date.weekday())]
+    return bitmaps
+
+
+def _invalidate(scope, dates, versions):
+    """
+    dates: {(resource, resource_id): daty}. Mapy z bieżącej wersji kasujemy od razu,
+    a po commicie podbijamy wersję zasobu. Odczyt, który zdążył pobrać starą wersję
+    i stan bazy sprzed commitu, zapisze wtedy mapę pod kluczem, którego nikt już
+    nie czyta - samo ponowne kasowanie po commicie mogłoby się z nim minąć.
+    """
+    keys = [
+        _bitmap_key(resource, resource_id, date, versions[resource][resource_id])
+        for (resource, resource_id), resource_dates in dates.items()
+        for date in resource_dates
+    ]
+    scope.delete_many(keys)
+
+    def bump():
+        for resource, resource_id in dates:
+            scope.bump(_version_key(resource, resource_id))
+
+    transaction.on_commit(bump)
+
+
+def invalidate_dates(dates):
+    """
+    Unieważnia mapy {(resource, resource_id): daty} jednym odczytem wersji
+    i jednym kasowaniem.
+    """
+    dates = {key: resource_dates for key, resource_dates in dates.items() if key[1] is not None and resource_dates}
+    if not dates:
+        return
+
+    resource_ids = defaultdict(list)
+    for resource, resource_id in dates:
+        resource_ids[resource].append(resource_id)
+    scope = namespace()
+    _invalidate(scope, dates, _get_all_versions(scope, resource_ids))
+
+
+def invalidate_resource(resource, resource_id):
+    if resource_id is None:
+        return
+    scope = namespace()
+    key = _version_key(resource, resource_id)
+    scope.bump(key)
+    transaction.on_commit(lambda: scope.bump(key))
+
+
+def invalidate_events(events):
+    """
+    Unieważnia mapy dla wielu wydarzeń naraz - dla ścieżek, które omijają
+    sygnały (bulk_create, update na querysecie).
+    """
+    dates = defaultdict(set)
+    for event in events:
+        for resource in RESOURCES:
+            dates[(resource, getattr(event, f'{resource}_id'))].add(event.date)
+    invalidate_dates(dates)
@@ -0,0 +1,136 @@
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Stronicowanie po kluczu: kursor to wartości pól `ordering` ostatniego rekordu,
+    a kolejna strona to WHERE (a, b, id) > (...) zamiast OFFSET. Koszt strony nie
+    zależy od jej numeru, pod warunkiem że na `ordering` jest indeks.
+    """
+    ordering = ('id',)
+    page_size = 100
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Nieprawidłowy kursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        self.approximate_count = None
+        if request.query_params.get(self.count_query_param) == 'approximate':
+            self.approximate_count = self.estimate_count(queryset)
+
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def after(self, position):
+        """
+        (f1, f2, f3) > (v1, v2, v3) rozpisane na warunki, które planer zamienia na zakres indeksu.
+        """
+        pairs = list(zip(self.ordering, position))
+        last_field, last_value = pairs[-1]
+        condition = Q(**{f'{last_field}__gt': last_value})
+        for field, value in reversed(pairs[:-1]):
+            condition = Q(**{f'{field}__gt': value}) | (Q(**{field: value}) & condition)
+        return Q(**{f'{self.ordering[0]}__gte': position[0]}) & condition
+
+    def encode_cursor(self, instance):
+        position = []
+        for field in self.ordering:
+            value = instance[field] if isinstance(instance, dict) else getattr(instance, field)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if len(position) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def estimate_count(self, queryset):
+        # Szacunek planera zamiast COUNT(*) - wystarcza do paska przewijania
+        plan = json.loads(queryset.explain(format='json'))
+        return plan[0]['Plan']['Plan Rows']
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+        return remove_query_param(url, self.count_query_param)
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link()}
+        if self.approximate_count is not None:
+            response['approximate_count'] = self.approximate_count
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'approximate_count': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+
+class PageNumberOrKeysetPagination(PageNumberPagination):
+    """
+    Domyślnie zwykłe stronicowanie numerami stron; z parametrem `cursor`
+    (także pustym - pierwsza strona) przełącza się na KeysetPagination.
+    """
+    keyset_ordering = ('id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            self.keyset.ordering = self.keyset_ordering
+            self.keyset.page_size = self.page_size
+            self.keyset.max_page_size = self.max_page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,35 @@
+from django.db.models import CharField, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Cast, Coalesce, Concat
+
+from patients.models import Patient
+from user_profile.models import ProfileCentralUser
+from .models import Event, EventStatus
+
+# Event.search_document skleja pola, po których szuka EventListView, żeby wyszukiwanie
+# było jednym ILIKE po indeksie trigramowym zamiast po złączeniach z lekarzem,
+# pacjentem i statusem. Dokument odświeżamy UPDATE-em z podzapytaniami, więc
+# nie wywołuje to ponownie sygnałów zapisu.
+
+
+def _related(model, key, field):
+    return Coalesce(Subquery(model.objects.filter(pk=OuterRef(key)).values(field)[:1]), Value(''))
+
+
+def search_document():
+    return Concat(
+        _related(ProfileCentralUser, 'doctor_id', 'name'), Value(' '),
+        _related(ProfileCentralUser, 'doctor_id', 'surname'), Value(' '),
+        _related(Patient, 'patient_id', 'name'), Value(' '),
+        _related(Patient, 'patient_id', 'surname'), Value(' '),
+        _related(EventStatus, 'event_status_id', 'status'), Value(' '),
+        Cast('date', CharField()),
+        output_field=TextField()
+    )
+
+
+def refresh_search_documents(queryset):
+    return queryset.update(search_document=search_document())
+
+
+def refresh_event_search_documents(**filters):
+    return refresh_search_documents(Event.objects.filter(**filters))
@@ -1,26 +1,211 @@
 from rest_framework import serializers
+from django.conf import settings
 
-from .models import Event, Absence, Office, VisitType, Tags, EventStatus
-from .validators import validate_doctor_id, validate_office_id, validate_assistant_id, validate_patient_id, validate_dates, validate_times, is_doctor_available, is_office_available, is_assistant_available, is_patient_available, validate_doctor_id_with_id
+from .models import Event, Absence, Office, VisitType, Tags, EventStatus, EventNumberCounter
+from .validators import validate_doctor_id, validate_office_id, validate_assistant_id, validate_patient_id, validate_dates, validate_times, validate_doctor_id_with_id, reject_double_booking, booking_conflicts, UNAVAILABLE_MESSAGES
 
 from user_profile.models import EmployeeSchedule, ProfileCentralUser
+from user_profile.serializers import ProfileCentralUserSerializer
 from patients.models import Patient
-from django.db.models import Max
+from django.db.models import prefetch_related_objects, Value, CharField
+from django.db.models.functions import Coalesce, Concat, NullIf, Trim
 from datetime import timedelta
-from branch.models import Branch
+from collections import Counter
+from branch.mixins import get_profile
 from payment.models import Obligation
+from payment import ledger
+from .occupancy import invalidate_events, EMPLOYEE_RESOURCES
+from .search import refresh_event_search_documents
 from decimal import Decimal
 import decimal
 
 
 class ObligationSerializer(serializers.ModelSerializer):
-    ammount = serializers.DecimalField(max_digits=8, decimal_places=2)
+    ammount = serializers.DecimalField(source='amount', max_digits=8, decimal_places=2)
 
     class Meta:
         model = Obligation
         fields = ['ammount']
 
 
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField, który przy tworzeniu serii bierze obiekty pobrane raz
+    dla wszystkich elementów (EventBulkCreateSerializer.to_internal_value)
+    zamiast pytać bazę o każdy identyfikator osobno.
+    """
+
+    def __init__(self, prefetch_key, **kwargs):
+        self.prefetch_key = prefetch_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        prefetched = getattr(self.root, 'prefetched', {}).get(self.prefetch_key)
+        if prefetched is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in prefetched:
+            self.fail('does_not_exist', pk_value=data)
+        return prefetched[pk]
+
+
+def _pk_values(values):
+    pks = set()
+    for value in values:
+        try:
+            pks.add(int(value))
+        except (TypeError, ValueError):
+            pass
+    return pks
+
+
+class EventBulkCreateSerializer(serializers.ListSerializer):
+    """
+    Tworzenie serii wydarzeń (np. wizyt cyklicznych) stałą liczbą zapytań:
+    powiązane obiekty pobieramy raz dla całej serii, dostępność sprawdzamy
+    jednym zestawem zapytań dla wszystkich dat naraz, a EventStatus, Obligation,
+    Event i tagi zapisujemy przez bulk_create w jednej transakcji.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            items = [item for item in data if isinstance(item, dict)]
+            tag_pks = _pk_values(
+                pk for item in items if isinstance(item.get('tags'), list) for pk in item['tags']
+            )
+            visit_type_pks = _pk_values(item.get('visit_type') for item in items)
+            fields = self.child.fields
+            self.prefetched = {
+                'tags': fields['tags'].child_relation.get_queryset().in_bulk(tag_pks),
+                'visit_type': fields['visit_type'].get_queryset().in_bulk(visit_type_pks),
+            }
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        profile_ids = {data['doctor_id'] for data in attrs} | {data['assistant_id'] for data in attrs if data.get('assistant_id')}
+        office_ids = {data['office_id'] for data in attrs if data.get('office_id')}
+        patient_ids = {data['patient_id'] for data in attrs if data.get('patient_id')}
+
+        profiles = ProfileCentralUser.objects.in_bulk(profile_ids)
+        offices = Office.objects.in_bulk(office_ids)
+        patients = Patient.objects.in_bulk(patient_ids)
+
+        for data in attrs:
+            doctor = profiles.get(data['doctor_id'])
+            if doctor is None:
+                raise serializers.ValidationError("Nie znaleziono lekarza o podanym identyfikatorze.")
+            if doctor.role != 'doctor':
+                raise serializers.ValidationError("Eventy mogą być generowane tylko dla lekarzy.")
+            data['doctor'] = doctor
+
+            data['assistant'] = None
+            if data.get('assistant_id'):
+                assistant = profiles.get(data['assistant_id'])
+                if assistant is None or assistant.role != 'assistant':
+                    raise serializers.ValidationError("Wybrany asystent nie istnieje lub nie ma roli 'assistant'.")
+                data['assistant'] = assistant
+
+            data['office'] = None
+            if data.get('office_id'):
+                if data['office_id'] not in offices:
+                    raise serializers.ValidationError("Nie znaleziono gabinetu o podanym identyfikatorze.")
+                data['office'] = offices[data['office_id']]
+
+            data['patient'] = None
+            if data.get('patient_id'):
+                if data['patient_id'] not in patients:
+                    raise serializers.ValidationError("Wybrany pacjent nie istnieje.")
+                data['patient'] = patients[data['patient_id']]
+
+        self.check_availability(attrs)
+        return attrs
+
+    def check_availability(self, attrs):
+        """
+        Dostępność wszystkich elementów naraz, z bazy - tak samo jak
+        przy pojedynczym wydarzeniu (booking_conflicts).
+        """
+        conflicts = booking_conflicts(attrs)
+        if conflicts:
+            index = min(conflicts)
+            message = UNAVAILABLE_MESSAGES[conflicts[index]]
+            raise serializers.ValidationError(f"{message} ({attrs[index]['date'].isoformat()}).")
+
+    def create(self, validated_data):
+        with reject_double_booking():
+            return self._bulk_create(validated_data)
+
+    def _bulk_create(self, validated_data):
+        branch = self.context['view'].get_branch()
+
+        for data in validated_data:
+            if data['doctor'].branch_id != branch.id:
+                raise serializers.ValidationError("Wybrany lekarz nie należy do tego branchu.")
+            if data.get('office') and data['office'].branch_id != branch.id:
+                raise serializers.ValidationError("Wybrany gabinet nie należy do tego branchu.")
+            if data.get('assistant') and data['assistant'].branch_id != branch.id:
+                raise serializers.ValidationError("Wybrany asystent nie należy do tego branchu.")
+            if data.get('patient') and data['patient'].branch_id != branch.id:
+                raise serializers.ValidationError("Wybrany pacjent nie należy do tego branchu.")
+
+        rep_id = Event.objects.next_rep_id()
+
+        next_numbers = EventNumberCounter.objects.allocate_many(
+            branch, Counter(data['date'] for data in validated_data)
+        )
+
+        statuses = []
+        obligations = []
+        for data in validated_data:
+            number = next_numbers[data['date']]
+            next_numbers[data['date']] = number + 1
+            statuses.append(EventStatus(number=f"{number:05d}", status='planned'))
+            obligations.append(Obligation(amount=data['cost_input'], branch=branch, patient=data.get('patient')))
+
+        EventStatus.objects.bulk_create(statuses)
+        Obligation.objects.bulk_create(obligations)
+        # bulk_create omija sygnały, które prowadzą saldo pacjenta
+        ledger.record_created(obligations)
+
+        events = []
+        tags = []
+        for data, event_status, obligation in zip(validated_data, statuses, obligations):
+            data = dict(data)
+            tags.append(data.pop('tags', []))
+            data.pop('cost_input')
+            for key in ('doctor_id', 'office_id', 'assistant_id', 'patient_id'):
+                data.pop(key, None)
+            events.append(Event(
+                **data,
+                branch=branch,
+                is_rep=True,
+                rep_id=rep_id,
+                event_status=event_status,
+                cost=obligation,
+            ))
+
+        Event.objects.bulk_create(events)
+
+        EventTags = Event.tags.through
+        EventTags.objects.bulk_create([
+            EventTags(event_id=event.id, tags_id=tag.id)
+            for event, event_tags in zip(events, tags)
+            for tag in event_tags
+        ])
+        prefetch_related_objects(events, 'tags')
+
+        # bulk_create nie wysyła sygnałów, więc mapy zajętości i dokumenty wyszukiwania odświeżamy sami
+        invalidate_events(events)
+        refresh_event_search_documents(id__in=[event.id for event in events])
+
+        return events
+
+
 class EventSerializer(serializers.ModelSerializer):
     doctor_id = serializers.IntegerField(write_only=True, required=True)
     office_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
@@ -31,7 +216,10 @@ class EventSerializer(serializers.ModelSerializer):
     office = serializers.IntegerField(source='office.id', read_only=True)
     assistant = serializers.IntegerField(source='assistant.id', read_only=True)
     patient = serializers.IntegerField(source='patient.id', read_only=True)
-    tags = serializers.PrimaryKeyRelatedField(queryset=Tags.objects.all(), many=True, required=False)
+    tags = PrefetchedPrimaryKeyRelatedField(prefetch_key='tags', queryset=Tags.objects.all(), many=True, required=False)
+    visit_type = PrefetchedPrimaryKeyRelatedField(
+        prefetch_key='visit_type', queryset=VisitType.objects.all(), required=False, allow_null=True
+    )
     event_status = serializers.CharField(source='event_status.status', read_only=True)
     cost = ObligationSerializer(read_only=True)
     cost_input = serializers.DecimalField(max_digits=8, decimal_places=2, write_only=True, required=True)
@@ -44,6 +232,7 @@ class EventSerializer(serializers.ModelSerializer):
             'end_time', 'cost', 'cost_input', 'visit_type', 'tags', 'description', 'event_status'
         ]
         read_only_fields = ['id', 'rep_id', 'is_rep']
+        list_serializer_class = EventBulkCreateSerializer
     
     def validate_cost(self, value):
         if not isinstance(value, (float, int, decimal.Decimal)):
@@ -51,6 +240,11 @@ class EventSerializer(serializers.ModelSerializer):
         return value
 
     def validate(self, data):
+        if isinstance(self.parent, EventBulkCreateSerializer):
+            # Seria: tutaj tylko format, obiekty i dostępność sprawdza EventBulkCreateSerializer.validate
+            validate_times(data.get('start_time'), data.get('end_time'))
+            return data
+
         doctor_id = data.get('doctor_id')
         office_id = data.get('office_id')
         assistant_id = data.get('assistant_id')
@@ -67,17 +261,12 @@ class EventSerializer(serializers.ModelSerializer):
 
         validate_times(start_time, end_time)
 
-        if not is_doctor_available(doctor, date, start_time, end_time, exclude_event_id=exclude_event_id):
-            raise serializers.ValidationError("Lekarz nie jest dostępny w podanym czasie.")
-
-        if not is_office_available(office, date, start_time, end_time, exclude_event_id=exclude_event_id):
-            raise serializers.ValidationError("Gabinet nie jest dostępny w podanym czasie.")
-
-        if not is_assistant_available(assistant, date, start_time, end_time, exclude_event_id=exclude_event_id):
-            raise serializers.ValidationError("Asystent nie jest dostępny w podanym czasie.")
-
-        if not is_patient_available(patient, date, start_time, end_time, exclude_event_id=exclude_event_id):
-            raise serializers.ValidationError("Pacjent nie jest dostępny w podanym czasie.")
+        conflicts = booking_conflicts([{
+            'doctor': doctor, 'office': office, 'assistant': assistant, 'patient': patient,
+            'date': date, 'start_time': start_time, 'end_time': end_time,
+        }], exclude_event_id=exclude_event_id)
+        if conflicts:
+            raise serializers.ValidationError(f"{UNAVAILABLE_MESSAGES[conflicts[0]]}.")
 
         data['doctor'] = doctor
         data['office'] = office
@@ -87,9 +276,16 @@ class EventSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
+        with reject_double_booking():
+            return self._create(validated_data)
+
+    def update(self, instance, validated_data):
+        with reject_double_booking():
+            return super().update(instance, validated_data)
+
+    def _create(self, validated_data):
         request = self.context['request']
-        branch_uuid = self.context['view'].kwargs.get('branch_uuid')
-        branch = Branch.objects.get(identyficator=branch_uuid)
+        branch = self.context['view'].get_branch()
 
         try:
             profile = validated_data['doctor'].user.profile.get(branch=branch)
@@ -114,38 +310,14 @@ class EventSerializer(serializers.ModelSerializer):
 
         tags = validated_data.pop('tags', [])
 
-        is_rep = bool(self.parent)
-        if is_rep:
-
-            if not hasattr(self.parent, '_rep_id'):
-                last_rep = Event.objects.aggregate(max_rep=Max('rep_id'))['max_rep'] or 0
-                new_rep_id = last_rep + 1
-                self.parent._rep_id = new_rep_id
-                
-            rep_id = self.parent._rep_id
-            validated_data['is_rep'] = True
-            validated_data['rep_id'] = rep_id
-        else:
-            validated_data['is_rep'] = False
-            validated_data['rep_id'] = 0
+        validated_data['is_rep'] = False
+        validated_data['rep_id'] = 0
 
         # -----------------------------------
         # Generowanie numeru w EventStatus
         # -----------------------------------
 
-        event_date = validated_data['date']
-        max_number_str = (
-            EventStatus.objects
-            .filter(event__date=event_date)
-            .aggregate(m=Max('number'))['m']
-        )
-
-        if max_number_str:
-            current_max = int(max_number_str)
-            new_number_int = current_max + 1 
-        else:
-            new_number_int = 1
-
+        new_number_int = EventNumberCounter.objects.allocate(branch, validated_data['date'])
         new_number_str = f"{new_number_int:05d}"
 
         new_event_status = EventStatus.objects.create(
@@ -156,7 +328,7 @@ class EventSerializer(serializers.ModelSerializer):
         validated_data['event_status'] = new_event_status
 
         cost_value = validated_data.pop('cost_input')
-        new_payment = Obligation.objects.create(ammount=cost_value, branch=branch, patient=patient)
+        new_payment = Obligation.objects.create(amount=cost_value, branch=branch, patient=patient)
         validated_data['cost'] = new_payment
 
         event = Event.objects.create(**validated_data)
@@ -176,13 +348,10 @@ class AbsenceSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         request = self.context['request']
-        branch_uuid = self.context['view'].kwargs.get('branch_uuid')
-        branch = Branch.objects.get(identyficator=branch_uuid)
-
-        try:
-            profile = ProfileCentralUser.objects.get(user=request.user, branch=branch)
-        except ProfileCentralUser.DoesNotExist:
+        profile = get_profile(request)
+        if profile is None:
             raise serializers.ValidationError("Nie masz profilu w tym branchu.")
+        branch = profile.branch
 
         validated_data['branch'] = branch
         validated_data['profile'] = profile
@@ -200,13 +369,10 @@ class DoctorScheduleSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         request = self.context['request']
-        branch_uuid = self.context['view'].kwargs.get('branch_uuid')
-        branch = Branch.objects.get(identyficator=branch_uuid)
-
-        try:
-            profile = ProfileCentralUser.objects.get(user=request.user, branch=branch)
-        except ProfileCentralUser.DoesNotExist:
+        profile = get_profile(request)
+        if profile is None:
             raise serializers.ValidationError("Nie masz profilu w tym branchu.")
+        branch = profile.branch
 
         validated_data['branch'] = branch
         validated_data['employee'] = profile
@@ -250,6 +416,104 @@ class EventCalendarSerializer(serializers.ModelSerializer):
         return "Nieznany lekarz"
     
 
+def full_name(prefix, default):
+    """
+    SQL-owy odpowiednik "f'{name} {surname}'.strip() or default" dla powiązanego profilu.
+    """
+    return Coalesce(
+        NullIf(Trim(Concat(
+            Coalesce(f'{prefix}__name', Value('')), Value(' '), Coalesce(f'{prefix}__surname', Value('')),
+            output_field=CharField()
+        )), Value('')),
+        Value(default)
+    )
+
+
+class ValuesRowSerializer:
+    """
+    Tylko do odczytu: pobiera kolumny przez .values() i składa z nich słowniki
+    o tym samym kształcie co odpowiadający ModelSerializer - bez budowania
+    instancji modeli i bez SerializerMethodField dla każdego wiersza.
+
+    `columns` mapuje nazwę pola w JSON-ie na lookup (str) albo wyrażenie SQL,
+    `keys` to dodatkowe kolumny potrzebne np. do kursora paginacji.
+    """
+    columns = {}
+    keys = ()
+
+    @classmethod
+    def values(cls, queryset):
+        lookups = [lookup for lookup in cls.columns.values() if isinstance(lookup, str)]
+        expressions = {
+            f'row_{name}': expression
+            for name, expression in cls.columns.items()
+            if not isinstance(expression, str)
+        }
+        return queryset.values(*lookups, *cls.keys, **expressions)
+
+    @classmethod
+    def to_representation(cls, row):
+        return {
+            name: row[lookup if isinstance(lookup, str) else f'row_{name}']
+            for name, lookup in cls.columns.items()
+        }
+
+    @classmethod
+    def many(cls, rows):
+        return [cls.to_representation(row) for row in rows]
+
+
+class EventCalendarRows(ValuesRowSerializer):
+    columns = {
+        'id': 'id',
+        'doctor_name': full_name('doctor', "Nieznany lekarz"),
+        'office_name': 'office__name',
+        'start_time': 'start_time',
+        'end_time': 'end_time',
+        'date': 'date',
+        'visit_type_name': 'visit_type__name',
+    }
+
+
+CalendarLayouts = [
+    ('rows', 'Rows'),
+    ('columnar', 'Columnar'),
+]
+
+
+class EventCalendarRequestSerializer(serializers.Serializer):
+    date_start = serializers.DateField()
+    date_end = serializers.DateField()
+    layout = serializers.ChoiceField(choices=CalendarLayouts, default='rows')
+
+    def validate(self, attrs):
+        validate_dates(attrs['date_start'], attrs['date_end'])
+        max_span = settings.EVENT_CALENDAR_MAX_SPAN_DAYS
+        if (attrs['date_end'] - attrs['date_start']).days + 1 > max_span:
+            raise serializers.ValidationError(f"Zakres kalendarza nie może przekraczać {max_span} dni.")
+        return attrs
+
+
+def columnar(rows, columns, encoded):
+    """
+    Układ kolumnowy: jedna tablica na pole, a powtarzalne pola z `encoded`
+    zastąpione indeksami do słownika wartości (null zostaje nullem).
+    """
+    data = {column: [] for column in columns}
+    dictionaries = {column: {} for column in encoded}
+    for row in rows:
+        for column in columns:
+            value = row[column]
+            if column in dictionaries and value is not None:
+                value = dictionaries[column].setdefault(value, len(dictionaries[column]))
+            data[column].append(value)
+    return {
+        'count': len(rows),
+        'columns': data,
+        'dictionaries': {column: list(values) for column, values in dictionaries.items()},
+    }
+
+
 class EventListSerializer(serializers.ModelSerializer):
     doctor_name = serializers.SerializerMethodField()
     event_status = serializers.SerializerMethodField()
@@ -278,12 +542,32 @@ class EventListSerializer(serializers.ModelSerializer):
         return obj.patient.surname if obj.patient else "Unknown surname"
     
 
+class EventListRows(ValuesRowSerializer):
+    columns = {
+        'id': 'id',
+        'doctor_name': full_name('doctor', "Nieznany lekarz"),
+        'patient_name': Coalesce('patient__name', Value("Unknown patient")),
+        'date': 'date',
+        'event_status': Coalesce('event_status__status', Value("Unknown status")),
+        'patient_surname': Coalesce('patient__surname', Value("Unknown surname")),
+    }
+    keys = ('start_time',)
+
+
+TimeSlotLayouts = [
+    ('slots', 'Slots'),
+    ('intervals', 'Intervals'),
+    ('bitmask', 'Bitmask'),
+]
+
+
 class TimeSlotRequestSerializer(serializers.Serializer):
     doctor_id = serializers.IntegerField()
     office_id = serializers.IntegerField(required=False, allow_null=True)
     interval = serializers.IntegerField(min_value=1)
     start_date = serializers.DateField()
     end_date = serializers.DateField()
+    layout = serializers.ChoiceField(choices=TimeSlotLayouts, default='slots')
 
     def validate_doctor_id_with_id(self, value):
         return validate_doctor_id_with_id(value)
@@ -301,4 +585,40 @@ class TimeSlotSerializer(serializers.Serializer):
     start = serializers.DateTimeField()
     end = serializers.DateTimeField()
     status = serializers.CharField()
-    occupied_by = serializers.CharField(allow_null=True, required=False)
\ No newline at end of file
+    occupied_by = serializers.CharField(allow_null=True, required=False)
+
+
+class BatchTimeSlotRequestSerializer(serializers.Serializer):
+    doctor_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    # Sloty pracowników z mapami zajętości (EMPLOYEE_RESOURCES); doctor_ids
+    # i doctor_id w odpowiedzi to wtedy identyfikatory profili o tej roli
+    role = serializers.ChoiceField(choices=[(role, role.capitalize()) for role in EMPLOYEE_RESOURCES], default='doctor')
+    office_id = serializers.IntegerField(required=False, allow_null=True)
+    interval = serializers.IntegerField(min_value=1)
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    limit = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+
+    def validate(self, attrs):
+        validate_dates(attrs.get('start_date'), attrs.get('end_date'))
+        return attrs
+
+
+class BatchTimeSlotSerializer(TimeSlotSerializer):
+    doctor_id = serializers.IntegerField()
+
+
+class AvailableResourcesRequestSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+
+    def validate(self, attrs):
+        validate_times(attrs.get('start_time'), attrs.get('end_time'))
+        return attrs
+
+
+class AvailableResourcesSerializer(serializers.Serializer):
+    doctors = ProfileCentralUserSerializer(many=True)
+    assistants = ProfileCentralUserSerializer(many=True)
+    offices = OfficeSerializer(many=True)
@@ -0,0 +1,106 @@
+from collections import defaultdict
+
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from user_profile.models import EmployeeSchedule, ProfileCentralUser
+from patients.models import Patient
+from .models import Event, EventStatus, PlanChange, Absence
+from .occupancy import invalidate_dates, invalidate_resource, RESOURCES, EMPLOYEE_RESOURCES
+from .search import refresh_event_search_documents
+
+
+@receiver(pre_save, sender=Event)
+def store_event_old_resources(sender, instance, **kwargs):
+    instance._occupancy_old = None
+    if instance.pk:
+        instance._occupancy_old = Event.objects.filter(pk=instance.pk).values(
+            'doctor_id', 'office_id', 'assistant_id', 'date'
+        ).first()
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_event_occupancy(sender, instance, **kwargs):
+    current = {
+        'doctor_id': instance.doctor_id,
+        'office_id': instance.office_id,
+        'assistant_id': instance.assistant_id,
+        'date': instance.date,
+    }
+    # Bieżące i poprzednie zasoby razem - jeden odczyt wersji i jedno kasowanie
+    dates = defaultdict(set)
+    for values in (current, getattr(instance, '_occupancy_old', None)):
+        if not values:
+            continue
+        for resource in RESOURCES:
+            dates[(resource, values[f'{resource}_id'])].add(values['date'])
+    invalidate_dates(dates)
+
+
+@receiver(post_save, sender=PlanChange)
+@receiver(post_delete, sender=PlanChange)
+def invalidate_plan_change_occupancy(sender, instance, **kwargs):
+    for resource in EMPLOYEE_RESOURCES:
+        invalidate_resource(resource, instance.doctor_id)
+
+
+@receiver(post_save, sender=EmployeeSchedule)
+@receiver(post_delete, sender=EmployeeSchedule)
+def invalidate_schedule_occupancy(sender, instance, **kwargs):
+    for resource in EMPLOYEE_RESOURCES:
+        invalidate_resource(resource, instance.employee_id)
+
+
+@receiver(post_save, sender=Absence)
+@receiver(post_delete, sender=Absence)
+def invalidate_absence_occupancy(sender, instance, **kwargs):
+    for resource in EMPLOYEE_RESOURCES:
+        invalidate_resource(resource, instance.profile_id)
+
+
+@receiver(post_save, sender=Event)
+def refresh_event_search_document(sender, instance, **kwargs):
+    refresh_event_search_documents(pk=instance.pk)
+
+
+# Pola modeli powiązanych, które trafiają do Event.search_document (event/search.py)
+SEARCH_FIELDS = {
+    ProfileCentralUser: ('name', 'surname'),
+    Patient: ('name', 'surname'),
+    EventStatus: ('status',),
+}
+
+
+@receiver(pre_save, sender=ProfileCentralUser)
+@receiver(pre_save, sender=Patient)
+@receiver(pre_save, sender=EventStatus)
+def store_search_old_values(sender, instance, **kwargs):
+    instance._search_old = None
+    if instance.pk:
+        instance._search_old = sender.objects.filter(pk=instance.pk).values(*SEARCH_FIELDS[sender]).first()
+
+
+def _search_fields_changed(instance, created):
+    if created:
+        return False
+    old = getattr(instance, '_search_old', None)
+    return old is None or any(getattr(instance, field) != value for field, value in old.items())
+
+
+@receiver(post_save, sender=ProfileCentralUser)
+def refresh_doctor_search_documents(sender, instance, created, **kwargs):
+    if _search_fields_changed(instance, created):
+        refresh_event_search_documents(doctor_id=instance.pk)
+
+
+@receiver(post_save, sender=Patient)
+def refresh_patient_search_documents(sender, instance, created, **kwargs):
+    if _search_fields_changed(instance, created):
+        refresh_event_search_documents(patient_id=instance.pk)
+
+
+@receiver(post_save, sender=EventStatus)
+def refresh_status_search_documents(sender, instance, created, **kwargs):
+    if _search_fields_changed(instance, created):
+        refresh_event_search_documents(event_status_id=instance.pk)
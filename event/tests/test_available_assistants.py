@@ -0,0 +1,125 @@
+from datetime import date, time
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from django_tenants.utils import tenant_context
+
+from institution.models import CentralUser, Domain
+from institution.serializers import InstitutionSerializer
+from branch.models import Branch
+from user_profile.models import ProfileCentralUser, EmployeeSchedule
+from event.models import Event, Absence, PlanChange, Office
+
+
+class AvailableAssistantsTestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+        self.client = APIClient()
+        payload = {
+            "name": "Instytucja Asystenci",
+            "owner_email": "asystenci@example.com",
+            "owner_password": "test12345",
+            "owner_name": "Jan",
+            "owner_surname": "Kowalski",
+            "owner_phone_number": "+48123456789",
+        }
+        serializer = InstitutionSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.institution = serializer.save()
+        self.domain_obj = Domain.objects.get(tenant=self.institution)
+
+        self.owner_user = CentralUser.objects.get(email=payload["owner_email"])
+        self.client.force_authenticate(user=self.owner_user)
+
+        with tenant_context(self.institution):
+            self.branch = Branch.objects.filter(is_mother=True).first()
+            user = CentralUser.objects.create_user(email="lekarz@example.com")
+            self.doctor = ProfileCentralUser.objects.create(user=user, branch=self.branch, role='doctor')
+            self.assistants = []
+
+        self.url = f"/{self.branch.identyficator}/events/available-assistants/"
+
+    def tearDown(self):
+        connection.set_schema_to_public()
+
+    def add_assistant(self, start=time(8), end=time(16)):
+        with tenant_context(self.institution):
+            index = len(self.assistants)
+            user = CentralUser.objects.create_user(email=f"asystent{index}@example.com")
+            assistant = ProfileCentralUser.objects.create(user=user, branch=self.branch, role='assistant')
+            # 2025-03-03 to poniedziałek
+            EmployeeSchedule.objects.create(employee=assistant, branch=self.branch, day_num=0, start_time=start, end_time=end)
+            self.assistants.append(assistant)
+            return assistant
+
+    def post(self, day="2025-03-03"):
+        return self.client.post(self.url, data={
+            "date": day, "start_time": "10:00", "end_time": "11:00"
+        }, format='json', HTTP_HOST=self.domain_obj.domain)
+
+    def test_available_assistants(self):
+        free = self.add_assistant()
+        busy = self.add_assistant()
+        absent = self.add_assistant()
+        off_schedule = self.add_assistant(time(12), time(16))
+        replanned = self.add_assistant(time(12), time(16))
+        with tenant_context(self.institution):
+            Event.objects.create(branch=self.branch, doctor=self.doctor, assistant=busy, date=date(2025, 3, 3), start_time=time(10, 30), end_time=time(11, 30))
+            Absence.objects.create(branch=self.branch, profile=absent, start_date=date(2025, 3, 1), end_date=date(2025, 3, 5))
+            PlanChange.objects.create(branch=self.branch, doctor=replanned, date=date(2025, 3, 3), start_time=time(9), end_time=time(12))
+
+        response = self.post()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(item['id'] for item in response.data), sorted([free.id, replanned.id]))
+        self.assertEqual(
+            {item['email'] for item in response.data},
+            {"asystent0@example.com", "asystent4@example.com"}
+        )
+
+        # Wtorek - brak grafiku
+        self.assertEqual(self.post("2025-03-04").data, [])
+
+    def test_query_count_constant(self):
+        self.add_assistant()
+        # Pierwsze żądanie rozwiązuje tenanta z bazy, kolejne z cache middleware
+        self.post()
+        with CaptureQueriesContext(connection) as one:
+            self.assertEqual(len(self.post().data), 1)
+        self.add_assistant()
+        self.add_assistant()
+        with CaptureQueriesContext(connection) as three:
+            self.assertEqual(len(self.post().data), 3)
+        self.assertEqual(len(one), len(three))
+
+    def test_available_resources(self):
+        free = self.add_assistant()
+        busy = self.add_assistant()
+        with tenant_context(self.institution):
+            EmployeeSchedule.objects.create(employee=self.doctor, branch=self.branch, day_num=0, start_time=time(8), end_time=time(16))
+            user = CentralUser.objects.create_user(email="lekarz2@example.com")
+            busy_doctor = ProfileCentralUser.objects.create(user=user, branch=self.branch, role='doctor')
+            EmployeeSchedule.objects.create(employee=busy_doctor, branch=self.branch, day_num=0, start_time=time(8), end_time=time(16))
+            free_office = Office.objects.create(branch=self.branch, name="Gabinet 1")
+            busy_office = Office.objects.create(branch=self.branch, name="Gabinet 2")
+            Event.objects.create(
+                branch=self.branch, doctor=busy_doctor, assistant=busy, office=busy_office,
+                date=date(2025, 3, 3), start_time=time(9), end_time=time(10, 30)
+            )
+
+        url = f"/{self.branch.identyficator}/events/available-resources/"
+        payload = {"date": "2025-03-03", "start_time": "10:00", "end_time": "11:00"}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data=payload, format='json', HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual([item['id'] for item in response.data['doctors']], [self.doctor.id])
+        self.assertEqual([item['id'] for item in response.data['assistants']], [free.id])
+        self.assertEqual(response.data['offices'], [{'id': free_office.id, 'name': "Gabinet 1"}])
+
+        # Druga odpowiedź korzysta z map w cache - bez zapytań o grafiki i wydarzenia
+        with CaptureQueriesContext(connection) as cached:
+            self.client.post(url, data=payload, format='json', HTTP_HOST=self.domain_obj.domain)
+        self.assertLess(len(cached), len(queries))
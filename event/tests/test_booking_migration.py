@@ -0,0 +1,67 @@
+from datetime import date, time
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django_tenants.utils import tenant_context
+
+from institution.models import CentralUser
+from institution.serializers import InstitutionSerializer
+from branch.models import Branch
+from user_profile.models import ProfileCentralUser
+from event.models import Event, Office
+
+migration = import_module('event.migrations.0023_event_period_exclusion_constraints')
+
+
+class BookingConflictCheckTestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+        serializer = InstitutionSerializer(data={
+            "name": "Instytucja Migracja",
+            "owner_email": "migracja@example.com",
+            "owner_password": "test12345",
+            "owner_name": "Jan",
+            "owner_surname": "Kowalski",
+            "owner_phone_number": "+48123456789",
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.institution = serializer.save()
+
+    def tearDown(self):
+        connection.set_schema_to_public()
+
+    def test_legacy_rows_are_reported(self):
+        table = connection.ops.quote_name(Event._meta.db_table)
+        with tenant_context(self.institution):
+            branch = Branch.objects.filter(is_mother=True).first()
+            doctors = [
+                ProfileCentralUser.objects.create(
+                    user=CentralUser.objects.create_user(email=f"lekarz{index}@example.com"), branch=branch, role='doctor'
+                )
+                for index in range(3)
+            ]
+            office = Office.objects.create(branch=branch, name="Gabinet 1")
+            day = date(2025, 3, 3)
+            first = Event.objects.create(branch=branch, doctor=doctors[0], office=office, date=day, start_time=time(8), end_time=time(9))
+            second = Event.objects.create(branch=branch, doctor=doctors[1], office=office, date=day, start_time=time(9), end_time=time(10))
+            third = Event.objects.create(branch=branch, doctor=doctors[2], date=day, start_time=time(11), end_time=time(12))
+
+            with connection.cursor() as cursor:
+                self.assertEqual(migration.find_booking_conflicts(cursor, table), ([], {}))
+
+                # Dane sprzed ograniczeń: bez kolumny period (i zależnych od niej ograniczeń)
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+                cursor.execute(f'ALTER TABLE {table} DROP COLUMN period CASCADE')
+                cursor.execute(f"UPDATE {table} SET start_time = '08:30' WHERE id = %s", [second.id])
+                cursor.execute(f"UPDATE {table} SET end_time = '10:00' WHERE id = %s", [third.id])
+
+                reversed_ids, overlaps = migration.find_booking_conflicts(cursor, table)
+            self.assertEqual(reversed_ids, [third.id])
+            self.assertEqual(overlaps, {'office_id': [(first.id, second.id)]})
+            with self.assertRaisesMessage(RuntimeError, f"nakładające się (office_id): {first.id}/{second.id}"):
+                migration.check_existing_bookings(apps, SimpleNamespace(connection=connection))
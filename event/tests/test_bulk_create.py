@@ -0,0 +1,201 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from django_tenants.utils import tenant_context
+
+from institution.models import CentralUser, Domain
+from institution.serializers import InstitutionSerializer
+from branch.models import Branch
+from user_profile.models import ProfileCentralUser, EmployeeSchedule
+from event.models import Event, Tags, EventNumberCounter, Absence, PlanChange
+from event.utlis import get_time_slots_for_date_range
+
+
+class EventBulkCreateTestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+        self.client = APIClient()
+        payload = {
+            "name": "Instytucja Serie",
+            "owner_email": "serie@example.com",
+            "owner_password": "test12345",
+            "owner_name": "Jan",
+            "owner_surname": "Kowalski",
+            "owner_phone_number": "+48123456789",
+        }
+        serializer = InstitutionSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.institution = serializer.save()
+        self.domain_obj = Domain.objects.get(tenant=self.institution)
+
+        self.owner_user = CentralUser.objects.get(email=payload["owner_email"])
+        self.client.force_authenticate(user=self.owner_user)
+
+        with tenant_context(self.institution):
+            self.branch = Branch.objects.filter(is_mother=True).first()
+            user = CentralUser.objects.create_user(email="lekarz@example.com")
+            self.doctor = ProfileCentralUser.objects.create(user=user, branch=self.branch, role='doctor')
+            EmployeeSchedule.objects.create(employee=self.doctor, branch=self.branch, day_num=0, start_time=time(8), end_time=time(16))
+            self.tag = Tags.objects.create(branch=self.branch, name="Kontrola", icon="i.png", color="#FFFFFF")
+
+        self.url = f"/{self.branch.identyficator}/events/events/"
+
+    def tearDown(self):
+        connection.set_schema_to_public()
+
+    def series(self, weeks):
+        first = date(2025, 3, 3)
+        return [
+            {
+                "doctor_id": self.doctor.id,
+                "date": (first + timedelta(weeks=week)).isoformat(),
+                "start_time": "10:00",
+                "end_time": "11:00",
+                "cost_input": "150.00",
+                "tags": [self.tag.id],
+            }
+            for week in range(weeks)
+        ]
+
+    def test_create_series(self):
+        with tenant_context(self.institution):
+            # Mapa zajętości w cache - po zapisie serii musi zostać unieważniona
+            before = get_time_slots_for_date_range(self.doctor, date(2025, 3, 3), date(2025, 3, 3), 60, None)
+            self.assertEqual(len(before), 8)
+
+        response = self.client.post(self.url, data=self.series(52), format='json', HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(len(response.data), 52)
+        self.assertEqual(response.data[0]['tags'], [self.tag.id])
+        self.assertEqual(response.data[0]['cost'], {'ammount': '150.00'})
+        self.assertEqual(response.data[0]['event_status'], 'planned')
+
+        with tenant_context(self.institution):
+            events = Event.objects.filter(doctor=self.doctor).select_related('event_status', 'cost')
+            self.assertEqual(events.count(), 52)
+            self.assertEqual({event.rep_id for event in events}, {1})
+            self.assertTrue(all(event.is_rep for event in events))
+            self.assertEqual({event.event_status.number for event in events}, {"00001"})
+            self.assertEqual({event.cost.amount for event in events}, {Decimal("150.00")})
+            self.assertEqual(Event.tags.through.objects.filter(event__doctor=self.doctor).count(), 52)
+
+            after = get_time_slots_for_date_range(self.doctor, date(2025, 3, 3), date(2025, 3, 3), 60, None)
+            self.assertEqual(len(after), 7)
+
+    def test_create_query_count(self):
+        # Rozgrzewka: tenant i członkostwo trafiają do cache przy pierwszym żądaniu
+        self.client.get(f"/{self.branch.identyficator}/events/office/", HTTP_HOST=self.domain_obj.domain)
+
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.post(self.url, data=self.series(2), format='json', HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        with tenant_context(self.institution):
+            Event.objects.all().delete()
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(self.url, data=self.series(10), format='json', HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+        # Walidacja i zapis serii nie zależą od jej długości
+        self.assertEqual(
+            len(small), len(large),
+            '\n'.join(query['sql'] for query in large.captured_queries)
+        )
+
+    def test_create_single(self):
+        response = self.client.post(self.url, data=self.series(1)[0], format='json', HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data['cost'], {'ammount': '150.00'})
+        with tenant_context(self.institution):
+            event = Event.objects.get(id=response.data['id'])
+            self.assertFalse(event.is_rep)
+
+    def test_event_numbers_per_day(self):
+        self.client.post(self.url, data=self.series(1)[0], format='json', HTTP_HOST=self.domain_obj.domain)
+        payload = self.series(2)
+        payload[0]['start_time'], payload[0]['end_time'] = "12:00", "13:00"
+        response = self.client.post(self.url, data=payload, format='json', HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+        with tenant_context(self.institution):
+            numbers = sorted(Event.objects.values_list('date', 'event_status__number'))
+            self.assertEqual(numbers, [
+                (date(2025, 3, 3), "00001"),
+                (date(2025, 3, 3), "00002"),
+                (date(2025, 3, 10), "00001"),
+            ])
+            self.assertEqual(EventNumberCounter.objects.allocate(self.branch, date(2025, 3, 3), 5), 3)
+            self.assertEqual(EventNumberCounter.objects.allocate(self.branch, date(2025, 3, 3)), 8)
+
+    def test_series_get_distinct_rep_ids(self):
+        first = self.client.post(self.url, data=self.series(2), format='json', HTTP_HOST=self.domain_obj.domain)
+        payload = self.series(2)
+        for item in payload:
+            item['start_time'], item['end_time'] = "12:00", "13:00"
+        second = self.client.post(self.url, data=payload, format='json', HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED, second.data)
+
+        with tenant_context(self.institution):
+            first_rep = Event.objects.get(id=first.data[0]['id']).rep_id
+            second_rep = Event.objects.get(id=second.data[0]['id']).rep_id
+        self.assertNotEqual(first_rep, second_rep)
+
+        response = self.client.get(
+            f"/{self.branch.identyficator}/events/events-calendar/", {"rep_id": second_rep, "date_start": "2025-03-01", "date_end": "2025-03-31"}, HTTP_HOST=self.domain_obj.domain
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(item['id'] for item in response.data), sorted(item['id'] for item in second.data))
+
+    def test_series_validation(self):
+        with tenant_context(self.institution):
+            Event.objects.create(
+                branch=self.branch, doctor=self.doctor, date=date(2025, 3, 10), start_time=time(10, 30), end_time=time(11, 30)
+            )
+
+        response = self.client.post(self.url, data=self.series(3), format='json', HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("2025-03-10", str(response.data))
+
+        payload = self.series(2)
+        payload[1]['tags'] = [999999]
+        response = self.client.post(self.url, data=payload, format='json', HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', response.data[1])
+
+        payload = self.series(2)
+        payload[1]['doctor_id'] = 999999
+        response = self.client.post(self.url, data=payload, format='json', HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with tenant_context(self.institution):
+            self.assertEqual(Event.objects.count(), 1)
+
+    def test_single_and_series_respect_plan_changes_and_absences(self):
+        with tenant_context(self.institution):
+            # Zmiana planu na 10.03 wypada poza termin, 17.03 lekarz jest nieobecny
+            PlanChange.objects.create(branch=self.branch, doctor=self.doctor, date=date(2025, 3, 10), start_time=time(13), end_time=time(16))
+            Absence.objects.create(branch=self.branch, profile=self.doctor, start_date=date(2025, 3, 17), end_date=date(2025, 3, 17))
+
+        series = self.series(3)
+        for item in series[1:]:
+            response = self.client.post(self.url, data=item, format='json', HTTP_HOST=self.domain_obj.domain)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("Lekarz nie jest dostępny", str(response.data))
+
+        response = self.client.post(self.url, data=series, format='json', HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("2025-03-10", str(response.data))
+
+        response = self.client.post(self.url, data=series[2:], format='json', HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("2025-03-17", str(response.data))
+
+        # W godzinach zmiany planu termin jest wolny
+        series[1]['start_time'], series[1]['end_time'] = "14:00", "15:00"
+        response = self.client.post(self.url, data=series[:2], format='json', HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
@@ -0,0 +1,37 @@
+from datetime import time
+from django.test import SimpleTestCase
+
+from event.intervals import (
+    to_minutes, merge_intervals, covers, overlaps_any, iter_slots,
+)
+
+
+class IntervalsTestCase(SimpleTestCase):
+
+    def test_minutes_conversion(self):
+        self.assertEqual(to_minutes(time(8, 30)), 510)
+
+    def test_merge_intervals(self):
+        intervals = [(600, 660), (480, 540), (530, 570), (570, 580), (700, 700)]
+        self.assertEqual(merge_intervals(intervals), [(480, 580), (600, 660)])
+
+    def test_covers(self):
+        working_hours = [(480, 720), (780, 960)]
+        self.assertTrue(covers(working_hours, (480, 540)))
+        self.assertTrue(covers(working_hours, (900, 960)))
+        self.assertFalse(covers(working_hours, (700, 800)))
+        self.assertFalse(covers(working_hours, (420, 500)))
+        self.assertFalse(covers([], (480, 540)))
+
+    def test_overlaps_any(self):
+        busy = [(480, 540), (600, 660)]
+        self.assertTrue(overlaps_any(busy, (500, 520)))
+        self.assertTrue(overlaps_any(busy, (590, 610)))
+        self.assertFalse(overlaps_any(busy, (540, 600)))
+        self.assertFalse(overlaps_any(busy, (660, 700)))
+
+    def test_iter_slots(self):
+        self.assertEqual(
+            list(iter_slots([(480, 575), (600, 630)], 30)),
+            [(480, 510), (510, 540), (540, 570), (600, 630)]
+        )
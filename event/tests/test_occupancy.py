@@ -0,0 +1,24 @@
+from django.test import SimpleTestCase
+
+from event.occupancy import interval_mask, is_free, bitmap_intervals, FULL_DAY
+
+
+class OccupancyBitmapTestCase(SimpleTestCase):
+
+    def test_interval_mask(self):
+        self.assertEqual(interval_mask(2, 5), 0b11100)
+        self.assertEqual(interval_mask(5, 5), 0)
+
+    def test_is_free(self):
+        bitmap = interval_mask(480, 720)
+        self.assertTrue(is_free(bitmap, 480, 540))
+        self.assertTrue(is_free(bitmap, 660, 720))
+        self.assertFalse(is_free(bitmap, 700, 760))
+
+    def test_bitmap_intervals(self):
+        bitmap = interval_mask(480, 960) & ~interval_mask(600, 660) & ~interval_mask(700, 710)
+        self.assertEqual(bitmap_intervals(bitmap), [(480, 600), (660, 700), (710, 960)])
+
+    def test_bitmap_intervals_full_and_empty_day(self):
+        self.assertEqual(bitmap_intervals(FULL_DAY), [(0, 1440)])
+        self.assertEqual(bitmap_intervals(0), [])
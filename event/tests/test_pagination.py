@@ -0,0 +1,96 @@
+from datetime import date, time
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from django_tenants.utils import tenant_context
+
+from institution.models import CentralUser, Domain
+from institution.serializers import InstitutionSerializer
+from branch.models import Branch
+from user_profile.models import ProfileCentralUser
+from patients.models import Patient
+from event.models import Event
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+        self.client = APIClient()
+        payload = {
+            "name": "Instytucja Strony",
+            "owner_email": "strony@example.com",
+            "owner_password": "test12345",
+            "owner_name": "Jan",
+            "owner_surname": "Kowalski",
+            "owner_phone_number": "+48123456789",
+        }
+        serializer = InstitutionSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.institution = serializer.save()
+        self.domain_obj = Domain.objects.get(tenant=self.institution)
+
+        self.owner_user = CentralUser.objects.get(email=payload["owner_email"])
+        self.client.force_authenticate(user=self.owner_user)
+
+        with tenant_context(self.institution):
+            self.branch = Branch.objects.filter(is_mother=True).first()
+            self.doctors = []
+            for index in range(3):
+                user = CentralUser.objects.create_user(email=f"lekarz{index}@example.com")
+                self.doctors.append(ProfileCentralUser.objects.create(user=user, branch=self.branch, role='doctor'))
+            # Kilka wizyt o tej samej dacie i godzinie - kolejność rozstrzyga id
+            for day in (5, 3, 4):
+                for hour in (12, 9):
+                    for doctor in self.doctors:
+                        Event.objects.create(
+                            branch=self.branch, doctor=doctor, date=date(2025, 3, day),
+                            start_time=time(hour), end_time=time(hour + 1)
+                        )
+            for surname, name in [("Nowak", "Anna"), ("Kowalska", "Ewa"), ("Nowak", "Adam"), ("Nowak", "Anna"), ("Zieliński", "Piotr")]:
+                Patient.objects.create(branch=self.branch, name=name, surname=surname, email="p@example.com", age=30)
+
+            self.expected_events = list(Event.objects.order_by('date', 'start_time', 'id').values_list('id', flat=True))
+            self.expected_patients = list(Patient.objects.order_by('surname', 'name', 'id').values_list('id', flat=True))
+
+    def tearDown(self):
+        connection.set_schema_to_public()
+
+    def walk(self, url, params):
+        ids = []
+        response = self.client.get(url, params, HTTP_HOST=self.domain_obj.domain)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+            data = response.json()
+            ids.extend(item['id'] for item in data['results'])
+            if not data['next']:
+                return ids, data
+            response = self.client.get(data['next'], HTTP_HOST=self.domain_obj.domain)
+
+    def test_events_keyset(self):
+        url = f"/{self.branch.identyficator}/events/get_event_list/"
+        ids, _ = self.walk(url, {"cursor": "", "page_size": 4})
+        self.assertEqual(ids, self.expected_events)
+
+        response = self.client.get(url, {"cursor": "", "page_size": 4, "count": "approximate"}, HTTP_HOST=self.domain_obj.domain)
+        self.assertIn('approximate_count', response.json())
+        self.assertNotIn('count=', response.json()['next'])
+
+    def test_events_page_number_still_default(self):
+        url = f"/{self.branch.identyficator}/events/get_event_list/"
+        response = self.client.get(url, HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 18)
+        self.assertEqual([item['id'] for item in response.json()['results']], self.expected_events)
+
+    def test_patients_keyset(self):
+        url = f"/{self.branch.identyficator}/patients/patient/"
+        ids, _ = self.walk(url, {"cursor": "", "page_size": 2})
+        self.assertEqual(ids, self.expected_patients)
+
+    def test_invalid_cursor(self):
+        url = f"/{self.branch.identyficator}/events/get_event_list/"
+        response = self.client.get(url, {"cursor": "nie-kursor"}, HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
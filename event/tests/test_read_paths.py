@@ -0,0 +1,116 @@
+from datetime import date, time
+import orjson
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from django_tenants.utils import tenant_context
+
+from institution.models import CentralUser, Domain
+from institution.serializers import InstitutionSerializer
+from branch.models import Branch
+from user_profile.models import ProfileCentralUser
+from patients.models import Patient
+from event.models import Event, EventStatus, Office, VisitType
+from event.serializers import EventCalendarSerializer, EventListSerializer, EventCalendarRows, EventListRows
+
+
+class ValuesReadPathTestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+        self.client = APIClient()
+        payload = {
+            "name": "Instytucja Odczyt",
+            "owner_email": "odczyt@example.com",
+            "owner_password": "test12345",
+            "owner_name": "Jan",
+            "owner_surname": "Kowalski",
+            "owner_phone_number": "+48123456789",
+        }
+        serializer = InstitutionSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.institution = serializer.save()
+        self.domain_obj = Domain.objects.get(tenant=self.institution)
+
+        self.owner_user = CentralUser.objects.get(email=payload["owner_email"])
+        self.client.force_authenticate(user=self.owner_user)
+
+        with tenant_context(self.institution):
+            self.branch = Branch.objects.filter(is_mother=True).first()
+            doctors = [
+                ProfileCentralUser.objects.create(
+                    user=CentralUser.objects.create_user(email=f"lekarz{index}@example.com"),
+                    branch=self.branch, role='doctor', name=name, surname=surname
+                )
+                for index, (name, surname) in enumerate([("Marek", "Nowak"), (None, None), ("", "Kowalski")])
+            ]
+            office = Office.objects.create(branch=self.branch, name="Gabinet 1")
+            visit_type = VisitType.objects.create(branch=self.branch, name="Przegląd", cost=100)
+            patient = Patient.objects.create(branch=self.branch, name="Anna", surname="Zielińska", email="a@example.com", age=30)
+
+            for index, doctor in enumerate(doctors):
+                Event.objects.create(
+                    branch=self.branch, doctor=doctor, date=date(2025, 3, 3 + index),
+                    start_time=time(9, 15), end_time=time(10),
+                    office=office if index != 1 else None,
+                    visit_type=visit_type if index == 0 else None,
+                    patient=patient if index != 2 else None,
+                    event_status=EventStatus.objects.create(number="00001", status='started') if index == 0 else None,
+                )
+
+    def tearDown(self):
+        connection.set_schema_to_public()
+
+    def test_rows_match_serializers(self):
+        with tenant_context(self.institution):
+            queryset = Event.objects.order_by('date', 'start_time', 'id')
+            for serializer_class, rows in ((EventCalendarSerializer, EventCalendarRows), (EventListSerializer, EventListRows)):
+                expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+                actual = orjson.dumps(rows.many(rows.values(queryset)))
+                self.assertEqual(orjson.loads(actual), orjson.loads(expected))
+                self.assertEqual(
+                    [list(row) for row in orjson.loads(actual)],
+                    [list(row) for row in orjson.loads(expected)]
+                )
+
+    def calendar(self, **params):
+        return self.client.get(f"/{self.branch.identyficator}/events/events-calendar/", params, HTTP_HOST=self.domain_obj.domain)
+
+    def test_calendar_endpoint(self):
+        response = self.calendar(date_start="2025-03-01", date_end="2025-03-31")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['doctor_name'] for item in response.json()],
+            ["Marek Nowak", "Nieznany lekarz", "Kowalski"]
+        )
+
+    def test_calendar_requires_bounded_window(self):
+        self.assertEqual(self.calendar().status_code, 400)
+        self.assertEqual(self.calendar(date_start="2025-03-01").status_code, 400)
+        self.assertEqual(self.calendar(date_start="2025-03-10", date_end="2025-03-01").status_code, 400)
+        with self.settings(EVENT_CALENDAR_MAX_SPAN_DAYS=3):
+            self.assertEqual(self.calendar(date_start="2025-03-01", date_end="2025-03-03").status_code, 200)
+            self.assertEqual(self.calendar(date_start="2025-03-01", date_end="2025-03-04").status_code, 400)
+
+    def test_calendar_columnar(self):
+        rows = self.calendar(date_start="2025-03-01", date_end="2025-03-31").json()
+        response = self.calendar(date_start="2025-03-01", date_end="2025-03-31", layout="columnar")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(data['columns']['office_name'], [0, None, 0])
+        self.assertEqual(data['dictionaries']['office_name'], ["Gabinet 1"])
+
+        decoded = [
+            {
+                column: (
+                    data['dictionaries'][column][values[index]]
+                    if column in data['dictionaries'] and values[index] is not None else values[index]
+                )
+                for column, values in data['columns'].items()
+            }
+            for index in range(data['count'])
+        ]
+        self.assertEqual(decoded, rows)
@@ -0,0 +1,95 @@
+from datetime import date, time
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from django_tenants.utils import tenant_context
+
+from institution.models import CentralUser, Domain
+from institution.serializers import InstitutionSerializer
+from institution.middleware import tenant_cache
+from branch.models import Branch
+from user_profile.models import ProfileCentralUser, EmployeeSchedule
+from patients.models import Patient
+from event.models import Event, Office, Absence, PlanChange
+
+
+class CheckRepetitionEventsTestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+        self.client = APIClient()
+        payload = {
+            "name": "Instytucja Powtorzenia",
+            "owner_email": "powtorzenia@example.com",
+            "owner_password": "test12345",
+            "owner_name": "Jan",
+            "owner_surname": "Kowalski",
+            "owner_phone_number": "+48123456789",
+        }
+        serializer = InstitutionSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.institution = serializer.save()
+        self.domain_obj = Domain.objects.get(tenant=self.institution)
+
+        self.owner_user = CentralUser.objects.get(email=payload["owner_email"])
+        self.client.force_authenticate(user=self.owner_user)
+
+        with tenant_context(self.institution):
+            self.branch = Branch.objects.filter(is_mother=True).first()
+            user = CentralUser.objects.create_user(email="lekarz@example.com")
+            self.doctor = ProfileCentralUser.objects.create(user=user, branch=self.branch, role='doctor')
+            EmployeeSchedule.objects.create(employee=self.doctor, branch=self.branch, day_num=0, start_time=time(8), end_time=time(16))
+            self.office = Office.objects.create(branch=self.branch, name="Gabinet 1")
+            self.patient = Patient.objects.create(branch=self.branch, name="Anna", surname="Nowak", email="anna@example.com", age=30)
+
+            # Poniedziałki: 03.03 wizyta lekarza, 10.03 gabinet zajęty, 17.03 urlop,
+            # 24.03 zmiana planu na popołudnie, 31.03 wizyta pacjenta u innego lekarza
+            Event.objects.create(branch=self.branch, doctor=self.doctor, date=date(2025, 3, 3), start_time=time(9, 30), end_time=time(10, 30))
+            other_user = CentralUser.objects.create_user(email="inny@example.com")
+            other = ProfileCentralUser.objects.create(user=other_user, branch=self.branch, role='doctor')
+            Event.objects.create(branch=self.branch, doctor=other, office=self.office, date=date(2025, 3, 10), start_time=time(10), end_time=time(11))
+            Absence.objects.create(branch=self.branch, profile=self.doctor, start_date=date(2025, 3, 17), end_date=date(2025, 3, 17))
+            PlanChange.objects.create(branch=self.branch, doctor=self.doctor, date=date(2025, 3, 24), start_time=time(13), end_time=time(18))
+            Event.objects.create(branch=self.branch, doctor=other, patient=self.patient, date=date(2025, 3, 31), start_time=time(9), end_time=time(12))
+
+        self.url = f"/{self.branch.identyficator}/events/check-repetition-events/"
+
+    def tearDown(self):
+        connection.set_schema_to_public()
+
+    def check(self, end_date):
+        return self.client.post(self.url, data={
+            "start_date": "2025-03-03", "end_date": end_date, "interval_days": 7,
+            "start_time": "10:00", "end_time": "11:00",
+            "doctor_id": self.doctor.id, "office_id": self.office.id, "patient_id": self.patient.id,
+        }, format='json', HTTP_HOST=self.domain_obj.domain)
+
+    def test_conflicts(self):
+        response = self.check("2025-04-07")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['date'], item['conflicts']) for item in response.data],
+            [
+                (date(2025, 3, 3), ['Lekarz niedostępny']),
+                (date(2025, 3, 10), ['Gabinet zajęty']),
+                (date(2025, 3, 17), ['Lekarz niedostępny']),
+                (date(2025, 3, 24), ['Lekarz niedostępny']),
+                (date(2025, 3, 31), ['Pacjent niedostępny']),
+                (date(2025, 4, 7), []),
+            ]
+        )
+        self.assertTrue(response.data[-1]['available'])
+
+    def test_query_count_independent_of_repetitions(self):
+        with CaptureQueriesContext(connection) as short:
+            self.check("2025-03-31")
+        # Oba żądania od zera: bez map zajętości i bez tenanta w pamięci procesu
+        cache.clear()
+        tenant_cache.clear()
+        with CaptureQueriesContext(connection) as long:
+            response = self.check("2026-03-02")
+        self.assertEqual(len(response.data), 53)
+        self.assertEqual(len(short), len(long))
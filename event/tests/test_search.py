@@ -0,0 +1,105 @@
+from datetime import date, time
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from django_tenants.utils import tenant_context
+
+from institution.models import CentralUser, Domain
+from institution.serializers import InstitutionSerializer
+from branch.models import Branch
+from user_profile.models import ProfileCentralUser
+from patients.models import Patient
+from event.models import Event, EventStatus
+
+
+class SearchTestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+        self.client = APIClient()
+        payload = {
+            "name": "Instytucja Szukaj",
+            "owner_email": "szukaj@example.com",
+            "owner_password": "test12345",
+            "owner_name": "Jan",
+            "owner_surname": "Kowalski",
+            "owner_phone_number": "+48123456789",
+        }
+        serializer = InstitutionSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.institution = serializer.save()
+        self.domain_obj = Domain.objects.get(tenant=self.institution)
+
+        self.owner_user = CentralUser.objects.get(email=payload["owner_email"])
+        self.client.force_authenticate(user=self.owner_user)
+
+        with tenant_context(self.institution):
+            self.branch = Branch.objects.filter(is_mother=True).first()
+            user = CentralUser.objects.create_user(email="lekarz@example.com")
+            self.doctor = ProfileCentralUser.objects.create(user=user, branch=self.branch, role='doctor', name="Marek", surname="Wiśniewski")
+            self.patients = [
+                Patient.objects.create(branch=self.branch, name=name, surname=surname, email=f"{name.lower()}@example.com", age=30)
+                for name, surname in [("Anna", "Nowak"), ("Adam", "Nowakowski"), ("Ewa", "Kowalska")]
+            ]
+            for hour, patient in zip((8, 10, 12), self.patients):
+                Event.objects.create(
+                    branch=self.branch, doctor=self.doctor, patient=patient, date=date(2025, 3, 3),
+                    start_time=time(hour), end_time=time(hour + 1),
+                    event_status=EventStatus.objects.create(number="00001", status='planned')
+                )
+
+    def tearDown(self):
+        connection.set_schema_to_public()
+
+    def search_events(self, term):
+        response = self.client.get(
+            f"/{self.branch.identyficator}/events/get_event_list/", {"search": term}, HTTP_HOST=self.domain_obj.domain
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(item['patient_name'], item['patient_surname']) for item in response.json()['results']]
+
+    def test_event_search_document(self):
+        self.assertEqual(self.search_events("nowak"), [("Anna", "Nowak"), ("Adam", "Nowakowski")])
+        self.assertEqual(self.search_events("wiśniewski kowalska"), [("Ewa", "Kowalska")])
+        self.assertEqual(len(self.search_events("2025-03-03")), 3)
+
+        with tenant_context(self.institution):
+            patient = self.patients[2]
+            patient.surname = "Zielińska"
+            patient.save()
+            status_obj = Event.objects.get(patient=self.patients[0]).event_status
+            status_obj.status = 'canceled'
+            status_obj.save()
+
+        self.assertEqual(self.search_events("kowalska"), [])
+        self.assertEqual(self.search_events("zielińska"), [("Ewa", "Zielińska")])
+        self.assertEqual(self.search_events("canceled"), [("Anna", "Nowak")])
+
+    def test_unrelated_changes_do_not_refresh_documents(self):
+        with tenant_context(self.institution):
+            patient = self.patients[0]
+            patient.email = "nowy@example.com"
+            with CaptureQueriesContext(connection) as queries:
+                patient.save()
+        self.assertFalse([query for query in queries.captured_queries if 'search_document' in query['sql']])
+
+        with tenant_context(self.institution):
+            patient.name = "Joanna"
+            with CaptureQueriesContext(connection) as queries:
+                patient.save()
+        self.assertTrue([query for query in queries.captured_queries if 'search_document' in query['sql']])
+
+    def test_patient_autocomplete(self):
+        url = f"/{self.branch.identyficator}/patients/autocomplete/"
+        response = self.client.get(url, {"q": "nowa"}, HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['surname'] for item in response.json()], ["Nowak", "Nowakowski"])
+
+        response = self.client.get(url, {"q": "nowa ad"}, HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual([item['name'] for item in response.json()], ["Adam"])
+
+        response = self.client.get(url, {"q": "owak"}, HTTP_HOST=self.domain_obj.domain)
+        self.assertEqual(response.json(), [])
@@ -0,0 +1,215 @@
+from datetime import date, time
+import orjson
+import base64
+from django.core.cache import cache
+from django.db import connection, transaction, IntegrityError
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from django_tenants.utils import tenant_context
+
+from institution.models import CentralUser, Domain
+from institution.serializers import InstitutionSerializer
+from branch.models import Branch
+from user_profile.models import ProfileCentralUser, EmployeeSchedule
+from event.models import Event
+from event import occupancy
+from institution.scoped_cache import namespace
+
+
+class TimeSlotAPITestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+        self.client = APIClient()
+        payload = {
+            "name": "Instytucja Sloty",
+            "owner_email": "sloty@example.com",
+            "owner_password": "test12345",
+            "owner_name": "Jan",
+            "owner_surname": "Kowalski",
+            "owner_phone_number": "+48123456789",
+        }
+        serializer = InstitutionSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.institution = serializer.save()
+        self.domain_obj = Domain.objects.get(tenant=self.institution)
+
+        self.owner_user = CentralUser.objects.get(email=payload["owner_email"])
+        self.client.force_authenticate(user=self.owner_user)
+
+        with tenant_context(self.institution):
+            self.branch = Branch.objects.filter(is_mother=True).first()
+            self.doctors = []
+            for index, (start, end) in enumerate([(time(8), time(12)), (time(10), time(14))]):
+                user = CentralUser.objects.create_user(email=f"lekarz{index}@example.com")
+                doctor = ProfileCentralUser.objects.create(user=user, branch=self.branch, role='doctor')
+                # 2025-03-03 to poniedziałek
+                EmployeeSchedule.objects.create(employee=doctor, branch=self.branch, day_num=0, start_time=start, end_time=end)
+                self.doctors.append(doctor)
+
+            Event.objects.create(
+                branch=self.branch, doctor=self.doctors[0], date=date(2025, 3, 3),
+                start_time=time(8), end_time=time(11)
+            )
+
+        self.url = f"/{self.branch.identyficator}/events/"
+
+    def tearDown(self):
+        connection.set_schema_to_public()
+
+    def post(self, path, payload, **extra):
+        return self.client.post(self.url + path, data=payload, format='json', HTTP_HOST=self.domain_obj.domain, **extra)
+
+    def test_time_slots(self):
+        response = self.post("time-slots/", {
+            "doctor_id": self.doctors[0].id, "interval": 30, "start_date": "2025-03-03", "end_date": "2025-03-09"
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [slot['start'] for slot in response.json()],
+            ["2025-03-03T11:00:00Z", "2025-03-03T11:30:00Z"]
+        )
+
+    def test_time_slots_ndjson_stream(self):
+        payload = {"doctor_id": self.doctors[0].id, "interval": 30, "start_date": "2025-03-01", "end_date": "2025-08-31"}
+        response = self.post("time-slots/", payload, HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        lines = b''.join(response.streaming_content).splitlines()
+        expected = self.post("time-slots/", payload).json()
+        self.assertEqual([orjson.loads(line) for line in lines], expected)
+
+    def test_time_slots_compact_intervals(self):
+        response = self.post("time-slots/", {
+            "doctor_id": self.doctors[0].id, "interval": 30, "start_date": "2025-03-03", "end_date": "2025-03-10", "layout": "intervals"
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            "interval": 30,
+            "cell_minutes": 1,
+            "days": [
+                {"date": "2025-03-03", "free": [[660, 720]]},
+                {"date": "2025-03-10", "free": [[480, 720]]},
+            ],
+        })
+
+    def test_time_slots_compact_bitmask(self):
+        response = self.post("time-slots/", {
+            "doctor_id": self.doctors[0].id, "interval": 30, "start_date": "2025-03-03", "end_date": "2025-03-03", "layout": "bitmask"
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        day = response.json()["days"][0]
+        free = int.from_bytes(base64.b64decode(day["mask"]), 'little')
+        self.assertEqual(free, ((1 << 60) - 1) << 660)
+
+    def test_batch_time_slots(self):
+        response = self.post("batch-time-slots/", {
+            "interval": 60, "start_date": "2025-03-03", "end_date": "2025-03-16"
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        slots = [(slot['doctor_id'], slot['start']) for slot in response.json()]
+        self.assertEqual(slots[:5], [
+            (self.doctors[1].id, "2025-03-03T10:00:00Z"),
+            (self.doctors[0].id, "2025-03-03T11:00:00Z"),
+            (self.doctors[1].id, "2025-03-03T11:00:00Z"),
+            (self.doctors[1].id, "2025-03-03T12:00:00Z"),
+            (self.doctors[1].id, "2025-03-03T13:00:00Z"),
+        ])
+        self.assertEqual(len(slots), 5 + 8)
+
+    def test_batch_time_slots_earliest(self):
+        response = self.post("batch-time-slots/", {
+            "doctor_ids": [self.doctors[0].id], "interval": 60, "start_date": "2025-03-04", "end_date": "2025-06-30", "limit": 2
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [slot['start'] for slot in response.json()],
+            ["2025-03-10T08:00:00Z", "2025-03-10T09:00:00Z"]
+        )
+
+    def test_batch_time_slots_foreign_doctor(self):
+        response = self.post("batch-time-slots/", {
+            "doctor_ids": [self.doctors[0].id, 999999], "interval": 60, "start_date": "2025-03-03", "end_date": "2025-03-09"
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_time_slots_assistant_role(self):
+        with tenant_context(self.institution):
+            user = CentralUser.objects.create_user(email="asystent@example.com")
+            assistant = ProfileCentralUser.objects.create(user=user, branch=self.branch, role='assistant')
+            EmployeeSchedule.objects.create(employee=assistant, branch=self.branch, day_num=0, start_time=time(9), end_time=time(12))
+            Event.objects.create(
+                branch=self.branch, doctor=self.doctors[1], assistant=assistant, date=date(2025, 3, 3),
+                start_time=time(10), end_time=time(11)
+            )
+
+        response = self.post("batch-time-slots/", {
+            "role": "assistant", "interval": 60, "start_date": "2025-03-03", "end_date": "2025-03-09"
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(slot['doctor_id'], slot['start']) for slot in response.json()],
+            [(assistant.id, "2025-03-03T09:00:00Z"), (assistant.id, "2025-03-03T11:00:00Z")]
+        )
+
+        # Lekarze nie mają roli asystenta
+        response = self.post("batch-time-slots/", {
+            "role": "assistant", "doctor_ids": [self.doctors[0].id], "interval": 60, "start_date": "2025-03-03", "end_date": "2025-03-09"
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.post("batch-time-slots/", {
+            "role": "receptionist", "interval": 60, "start_date": "2025-03-03", "end_date": "2025-03-09"
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('role', response.json())
+
+    def test_overlapping_event_rejected_by_constraint(self):
+        with tenant_context(self.institution):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                Event.objects.create(
+                    branch=self.branch, doctor=self.doctors[0], date=date(2025, 3, 3),
+                    start_time=time(10, 30), end_time=time(11, 30)
+                )
+            # Styk końca z początkiem nie jest kolizją
+            Event.objects.create(
+                branch=self.branch, doctor=self.doctors[0], date=date(2025, 3, 3),
+                start_time=time(11), end_time=time(12)
+            )
+
+    def test_late_cache_write_after_commit_is_ignored(self):
+        day = date(2025, 3, 3)
+        doctor = self.doctors[0]
+        with tenant_context(self.institution):
+            stale = occupancy.get_day_bitmaps('doctor', [doctor.id], [day])[(doctor.id, day)]
+            # Odczyt, który pobrał wersję mapy przed commitem zapisu...
+            scope = namespace()
+            old_version = occupancy._get_versions(scope, 'doctor', [doctor.id])[doctor.id]
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Event.objects.create(
+                    branch=self.branch, doctor=doctor, date=day, start_time=time(11), end_time=time(12)
+                )
+            # ...i zapisał nieaktualną mapę już po nim
+            scope.set(occupancy._bitmap_key('doctor', doctor.id, day, old_version), stale.to_bytes(occupancy.BITMAP_BYTES, 'big'))
+
+            fresh = occupancy.get_day_bitmaps('doctor', [doctor.id], [day])[(doctor.id, day)]
+        self.assertNotEqual(fresh, stale)
+        self.assertFalse(occupancy.is_free(fresh, 11 * 60, 12 * 60))
+
+    def test_moved_event_invalidates_old_and_new_doctor(self):
+        day = date(2025, 3, 3)
+        first, second = self.doctors
+        with tenant_context(self.institution):
+            occupancy.get_day_bitmaps('doctor', [first.id, second.id], [day])
+            event = Event.objects.get(doctor=first)
+            event.doctor, event.start_time, event.end_time = second, time(11), time(12)
+            with self.captureOnCommitCallbacks(execute=True):
+                event.save()
+
+            bitmaps = occupancy.get_day_bitmaps('doctor', [first.id, second.id], [day])
+        self.assertTrue(occupancy.is_free(bitmaps[(first.id, day)], 8 * 60, 11 * 60))
+        self.assertFalse(occupancy.is_free(bitmaps[(second.id, day)], 11 * 60, 12 * 60))
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import EventViewSet, TimeSlotView, AbsenceViewSet, DoctorScheduleViewSet, OfficeViewSet, VisitTypeViewSet, TagsViewSet, AvailableAssistantsView, CheckRepetitionEvents, EventCalendarViewSet, EventListView
+from .views import EventViewSet, TimeSlotView, BatchTimeSlotView, AbsenceViewSet, DoctorScheduleViewSet, OfficeViewSet, VisitTypeViewSet, TagsViewSet, AvailableAssistantsView, AvailableResourcesView, CheckRepetitionEvents, EventCalendarViewSet, EventListView
 
 router = DefaultRouter()
 router.register(r'events', EventViewSet, basename='events')
@@ -14,7 +14,9 @@ router.register(r'events-calendar', EventCalendarViewSet, basename='event-calend
 urlpatterns = [
     path('', include(router.urls)),
     path('time-slots/', TimeSlotView.as_view(), name='time-slots'),
+    path('batch-time-slots/', BatchTimeSlotView.as_view(), name='batch-time-slots'),
     path('available-assistants/', AvailableAssistantsView.as_view(), name='available-assistants'),
+    path('available-resources/', AvailableResourcesView.as_view(), name='available-resources'),
     path('check-repetition-events/', CheckRepetitionEvents.as_view(), name='check-repetition-events'),
     path('get_event_list/', EventListView.as_view(), name='get_event_list')
 ]
\ No newline at end of file
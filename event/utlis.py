@@ -1,118 +1,86 @@
-from .models import Event
-from user_profile.models import EmployeeSchedule
-from .models import PlanChange
-from collections import defaultdict
+from .intervals import iter_slots
+from .occupancy import get_day_bitmaps, bitmap_intervals
 from datetime import timedelta, datetime
+from heapq import merge
+from operator import itemgetter
 
-def get_time_slots_for_date_range(doctor, start_date, end_date, interval_minutes, office):
-    if doctor.role != 'doctor':
-        return []
+def get_dates(start_date, end_date):
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
 
-    slots = []
-    delta = timedelta(days=1)
+def iter_day_slots(current_date, free, interval_minutes, **extra):
     interval_delta = timedelta(minutes=interval_minutes)
-    date_range = (start_date, end_date)
-
-    # Fetch doctor's appointments
-    doctor_appointments = Event.objects.filter(
-        doctor=doctor,
-        date__range=date_range
-    ).values('date', 'start_time', 'end_time')
-
-    # Fetch other appointments in the office if office is provided
-    if office:
-        other_appointments = Event.objects.filter(
-            date__range=date_range,
-            office=office
-        ).exclude(doctor=doctor).values('date', 'start_time', 'end_time')
-    else:
-        other_appointments = []
-
-    # Group appointments by date
-    busy_intervals_by_date = defaultdict(list)
-    for appt in doctor_appointments:
-        busy_intervals_by_date[appt['date']].append((appt['start_time'], appt['end_time']))
-
-    for appt in other_appointments:
-        busy_intervals_by_date[appt['date']].append((appt['start_time'], appt['end_time']))
-
-    # Merge overlapping intervals for each day
-    for date in busy_intervals_by_date:
-        intervals = sorted(busy_intervals_by_date[date])
-        merged_intervals = [intervals[0]]
-        for current in intervals[1:]:
-            last_start, last_end = merged_intervals[-1]
-            current_start, current_end = current
-            if current_start <= last_end:
-                merged_intervals[-1] = (last_start, max(last_end, current_end))
-            else:
-                merged_intervals.append(current)
-        busy_intervals_by_date[date] = merged_intervals
-
-    # Fetch plan changes and schedules
-    plan_changes = PlanChange.objects.filter(
-        doctor=doctor,
-        date__range=date_range
-    ).values('date', 'start_time', 'end_time')
-    plan_changes_by_date = {pc['date']: pc for pc in plan_changes}
-
-    schedules = EmployeeSchedule.objects.filter(
-        employee=doctor
-    ).values('day_num', 'start_time', 'end_time')
-    schedules_by_day = {s['day_num']: s for s in schedules}
-
-    current_date = start_date
-    while current_date <= end_date:
-        if current_date in plan_changes_by_date:
-            working_hours = [(plan_changes_by_date[current_date]['start_time'], plan_changes_by_date[current_date]['end_time'])]
-        else:
-            day_num = current_date.weekday()
-            schedule = schedules_by_day.get(day_num)
-            if schedule:
-                working_hours = [(schedule['start_time'], schedule['end_time'])]
-            else:
-                current_date += delta
-                continue
-
-        # Get busy intervals for the current date
-        busy_intervals = busy_intervals_by_date.get(current_date, [])
-
-        # Subtract busy intervals from working hours to get free intervals
-        free_intervals = subtract_intervals(working_hours, busy_intervals)
+    day_start = datetime.combine(current_date, datetime.min.time())
+    for slot_start, _ in iter_slots(bitmap_intervals(free), interval_minutes):
+        start_datetime = day_start + timedelta(minutes=slot_start)
+        yield {
+            **extra,
+            'start': start_datetime,
+            'end': start_datetime + interval_delta,
+            'status': 'wolny',
+            'occupied_by': None,
+        }
+
+def iter_day_bitmaps(doctor_ids, office, dates, chunk_days=None, resource='doctor'):
+    """
+    Zwraca kolejne (date, {doctor_id: wolne minuty}), ładując mapy zajętości
+    paczkami po `chunk_days` dni (domyślnie cały zakres naraz). `resource`
+    to typ pracownika z EMPLOYEE_RESOURCES.
+    """
+    chunk_days = chunk_days or len(dates)
+    for chunk_start in range(0, len(dates), chunk_days):
+        chunk = dates[chunk_start:chunk_start + chunk_days]
+
+        # Free minutes of the doctors (schedule, plan changes, absences and appointments)
+        doctor_bitmaps = get_day_bitmaps(resource, doctor_ids, chunk)
+
+        # Free minutes of the office if office is provided
+        office_bitmaps = get_day_bitmaps('office', [office.id], chunk) if office else {}
+
+        for current_date in chunk:
+            office_free = office_bitmaps[(office.id, current_date)] if office else -1
+            yield current_date, {
+                doctor_id: doctor_bitmaps[(doctor_id, current_date)] & office_free
+                for doctor_id in doctor_ids
+            }
+
+def iter_time_slots_for_date_range(doctor, start_date, end_date, interval_minutes, office, chunk_days=None):
+    if doctor.role != 'doctor':
+        return
 
-        # Generate slots from free intervals
-        for start_time, end_time in free_intervals:
-            start_datetime = datetime.combine(current_date, start_time)
-            end_datetime = datetime.combine(current_date, end_time)
-            while start_datetime + interval_delta <= end_datetime:
-                slots.append({
-                    'start': start_datetime,
-                    'end': start_datetime + interval_delta,
-                    'status': 'wolny',
-                    'occupied_by': None,
-                })
-                start_datetime += interval_delta
+    for current_date, free in iter_day_bitmaps([doctor.id], office, get_dates(start_date, end_date), chunk_days):
+        yield from iter_day_slots(current_date, free[doctor.id], interval_minutes)
 
-        current_date += delta
+def iter_free_intervals_for_date_range(doctor, start_date, end_date, interval_minutes, office):
+    """
+    Zwraca (date, [(start, end), ...]) z wolnymi interwałami w minutach,
+    pomijając te, w których nie zmieści się ani jeden slot.
+    """
+    if doctor.role != 'doctor':
+        return
 
-    return slots
+    for current_date, free in iter_day_bitmaps([doctor.id], office, get_dates(start_date, end_date)):
+        intervals = [(start, end) for start, end in bitmap_intervals(free[doctor.id]) if end - start >= interval_minutes]
+        if intervals:
+            yield current_date, intervals
 
-def subtract_intervals(working_hours, busy_intervals):
-    free_intervals = []
-    for work_start, work_end in working_hours:
-        temp_intervals = [(work_start, work_end)]
-        for busy_start, busy_end in busy_intervals:
-            new_intervals = []
-            for interval_start, interval_end in temp_intervals:
-                # No overlap
-                if busy_end <= interval_start or busy_start >= interval_end:
-                    new_intervals.append((interval_start, interval_end))
-                else:
-                    # Overlap exists
-                    if interval_start < busy_start:
-                        new_intervals.append((interval_start, busy_start))
-                    if busy_end < interval_end:
-                        new_intervals.append((busy_end, interval_end))
-            temp_intervals = new_intervals
-        free_intervals.extend(temp_intervals)
-    return free_intervals
\ No newline at end of file
+def get_time_slots_for_date_range(doctor, start_date, end_date, interval_minutes, office):
+    return list(iter_time_slots_for_date_range(doctor, start_date, end_date, interval_minutes, office))
+
+def iter_time_slots_for_doctors(doctors, start_date, end_date, interval_minutes, office, chunk_days=None, role='doctor'):
+    """
+    Generuje wolne sloty wielu pracowników o roli `role` (lekarz, asystent)
+    posortowane po czasie rozpoczęcia. Przerwanie iteracji kończy też
+    ładowanie kolejnych paczek dat.
+    """
+    doctor_ids = [doctor.id for doctor in doctors if doctor.role == role]
+    if not doctor_ids:
+        return
+
+    for current_date, free in iter_day_bitmaps(doctor_ids, office, get_dates(start_date, end_date), chunk_days, resource=role):
+        yield from merge(
+            *(
+                iter_day_slots(current_date, free[doctor_id], interval_minutes, doctor_id=doctor_id)
+                for doctor_id in doctor_ids
+            ),
+            key=itemgetter('start')
+        )
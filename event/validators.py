@@ -2,82 +2,170 @@ from rest_framework.exceptions import ValidationError
 from user_profile.models import ProfileCentralUser
 from .models import Office
 from patients.models import Patient
-from datetime import timedelta
-from .models import Event
+from datetime import timedelta, datetime
+from contextlib import contextmanager
+from django.db import IntegrityError, transaction
+from django.db.backends.postgresql.psycopg_any import DateTimeRange
+from .models import Event, Absence, PlanChange
+from django.db.models import Exists, OuterRef, Q
 from user_profile.models import EmployeeSchedule
+from .intervals import to_interval, merge_intervals, covers, overlaps_any
+from collections import defaultdict
 
 
-def is_doctor_available(doctor, date, start_time, end_time, exclude_event_id=None):
-    day_num = date.weekday()
-    try:
-        schedule = EmployeeSchedule.objects.get(employee=doctor, day_num=day_num)
-    except EmployeeSchedule.DoesNotExist:
-        return False  
-
-    if start_time < schedule.start_time or end_time > schedule.end_time:
-        return False
-
-    conflicting_events = Event.objects.filter(
-        doctor=doctor,
-        date=date,
-        start_time__lt=end_time,
-        end_time__gt=start_time
-    )
-    if exclude_event_id:
-        conflicting_events = conflicting_events.exclude(id=exclude_event_id)
-
-    return not conflicting_events.exists()
-
-def is_assistant_available(assistant, date, start_time, end_time, exclude_event_id=None):
-    if assistant is None:
-        return True
-    day_num = date.weekday()
-    try:
-        schedule = EmployeeSchedule.objects.get(employee=assistant, day_num=day_num)
-    except EmployeeSchedule.DoesNotExist:
-        return False  
-
-    if start_time < schedule.start_time or end_time > schedule.end_time:
-        return False
-
-    conflicting_events = Event.objects.filter(
-        assistant=assistant,
-        date=date,
+def conflicting_dates(dates, start_time, end_time, **resource):
+    """
+    Zbiór dat z `dates`, w które zasób ma już wydarzenie nachodzące na start_time-end_time.
+    """
+    return set(Event.objects.filter(
+        date__in=dates,
         start_time__lt=end_time,
-        end_time__gt=start_time
+        end_time__gt=start_time,
+        **resource
+    ).values_list('date', flat=True))
+
+def available_profiles(queryset, date, start_time, end_time):
+    """
+    Zawęża queryset profili do osób wolnych w danym terminie - jednym zapytaniem.
+    Termin musi mieścić się w grafiku (albo w zmianie planu na ten dzień),
+    osoba nie może mieć nieobecności ani wydarzenia nachodzącego na termin.
+    """
+    period = DateTimeRange(datetime.combine(date, start_time), datetime.combine(date, end_time))
+    plan_changes = PlanChange.objects.filter(doctor=OuterRef('pk'), date=date)
+
+    return queryset.filter(
+        Exists(plan_changes.filter(start_time__lte=start_time, end_time__gte=end_time))
+        | (
+            ~Exists(plan_changes)
+            & Exists(EmployeeSchedule.objects.filter(
+                employee=OuterRef('pk'),
+                day_num=date.weekday(),
+                start_time__lte=start_time,
+                end_time__gte=end_time,
+            ))
+        ),
+        ~Exists(Absence.objects.filter(profile=OuterRef('pk'), start_date__lte=date, end_date__gte=date)),
+        ~Exists(Event.objects.filter(Q(doctor=OuterRef('pk')) | Q(assistant=OuterRef('pk')), period__overlap=period)),
     )
-    if exclude_event_id:
-        conflicting_events = conflicting_events.exclude(id=exclude_event_id)
-
-    return not conflicting_events.exists()
 
-def is_office_available(office, date, start_time, end_time, exclude_event_id=None):
-    if office is None:
-        return True
-    conflicting_events = Event.objects.filter(
-        office=office,
-        date=date,
-        start_time__lt=end_time,
-        end_time__gt=start_time
-    )
+# Kolejność sprawdzania i komunikaty - jak dotąd przy pojedynczym wydarzeniu
+BOOKING_RESOURCES = ('doctor', 'office', 'assistant', 'patient')
+EMPLOYEE_BOOKING_RESOURCES = ('doctor', 'assistant')
+
+UNAVAILABLE_MESSAGES = {
+    'doctor': "Lekarz nie jest dostępny w podanym czasie",
+    'office': "Gabinet nie jest dostępny w podanym czasie",
+    'assistant': "Asystent nie jest dostępny w podanym czasie",
+    'patient': "Pacjent nie jest dostępny w podanym czasie",
+}
+
+def booking_conflicts(bookings, exclude_event_id=None):
+    """
+    Dostępność wielu rezerwacji naraz, prosto z bazy - stała liczba zapytań
+    niezależnie od liczby rezerwacji. `bookings` to słowniki z kluczami date,
+    start_time, end_time oraz doctor, office, assistant, patient (obiekt albo None).
+    Zwraca {indeks rezerwacji: pierwszy niedostępny zasób}.
+
+    Lekarz i asystent muszą mieć termin w godzinach pracy - z grafiku albo
+    ze zmiany planu na ten dzień - i nie mogą mieć nieobecności; żaden zasób
+    nie może mieć wydarzenia nachodzącego na termin. Kolejne rezerwacje z listy
+    liczą się jako zajęte dla następnych.
+    """
+    if not bookings:
+        return {}
+
+    dates = {booking['date'] for booking in bookings}
+    resource_ids = {
+        resource: {booking[resource].id for booking in bookings if booking.get(resource)}
+        for resource in BOOKING_RESOURCES
+    }
+    employee_ids = resource_ids['doctor'] | resource_ids['assistant']
+
+    schedules = defaultdict(list)
+    plan_changes = defaultdict(list)
+    absences = defaultdict(list)
+    if employee_ids:
+        for employee_id, day_num, start_time, end_time in EmployeeSchedule.objects.filter(
+            employee_id__in=employee_ids, day_num__in={date.weekday() for date in dates}
+        ).values_list('employee_id', 'day_num', 'start_time', 'end_time'):
+            schedules[(employee_id, day_num)].append(to_interval(start_time, end_time))
+        for employee_id, date, start_time, end_time in PlanChange.objects.filter(
+            doctor_id__in=employee_ids, date__in=dates
+        ).values_list('doctor_id', 'date', 'start_time', 'end_time'):
+            plan_changes[(employee_id, date)].append(to_interval(start_time, end_time))
+        for employee_id, start_date, end_date in Absence.objects.filter(
+            profile_id__in=employee_ids, start_date__lte=max(dates), end_date__gte=min(dates)
+        ).values_list('profile_id', 'start_date', 'end_date'):
+            absences[employee_id].append((start_date, end_date))
+
+    busy = defaultdict(list)
+    query = Q()
+    for resource, ids in resource_ids.items():
+        if ids:
+            query |= Q(**{f'{resource}_id__in': ids})
+    events = Event.objects.filter(query, date__in=dates)
     if exclude_event_id:
-        conflicting_events = conflicting_events.exclude(id=exclude_event_id)
-
-    return not conflicting_events.exists()
-
-def is_patient_available(patient, date, start_time, end_time, exclude_event_id=None):
-    if patient is None:
-        return True
-    conflicting_events = Event.objects.filter(
-        patient=patient,
-        date=date,
-        start_time__lt=end_time,
-        end_time__gt=start_time
-    )
-    if exclude_event_id:
-        conflicting_events = conflicting_events.exclude(id=exclude_event_id)
-
-    return not conflicting_events.exists()
+        events = events.exclude(id=exclude_event_id)
+    for *event_resources, date, start_time, end_time in events.values_list(
+        'doctor_id', 'office_id', 'assistant_id', 'patient_id', 'date', 'start_time', 'end_time'
+    ):
+        for resource, resource_id in zip(BOOKING_RESOURCES, event_resources):
+            if resource_id in resource_ids[resource]:
+                busy[(resource, resource_id, date)].append(to_interval(start_time, end_time))
+    busy = defaultdict(list, {key: merge_intervals(intervals) for key, intervals in busy.items()})
+
+    def working_hours(employee_id, date):
+        if any(start <= date <= end for start, end in absences[employee_id]):
+            return []
+        if (employee_id, date) in plan_changes:
+            return merge_intervals(plan_changes[(employee_id, date)])
+        return merge_intervals(schedules[(employee_id, date.weekday())])
+
+    conflicts = {}
+    for index, booking in enumerate(bookings):
+        date = booking['date']
+        interval = to_interval(booking['start_time'], booking['end_time'])
+        for resource in BOOKING_RESOURCES:
+            obj = booking.get(resource)
+            if obj is None:
+                continue
+            if resource in EMPLOYEE_BOOKING_RESOURCES and not covers(working_hours(obj.id, date), interval):
+                conflicts[index] = resource
+                break
+            if overlaps_any(busy[(resource, obj.id, date)], interval):
+                conflicts[index] = resource
+                break
+
+        for resource in BOOKING_RESOURCES:
+            obj = booking.get(resource)
+            if obj is not None:
+                key = (resource, obj.id, date)
+                busy[key] = merge_intervals(busy[key] + [interval])
+    return conflicts
+
+EXCLUSION_VIOLATION = '23P01'
+
+BOOKING_CONFLICT_MESSAGES = {
+    'event_doctor_no_overlap': "Lekarz nie jest dostępny w podanym czasie.",
+    'event_office_no_overlap': "Gabinet nie jest dostępny w podanym czasie.",
+    'event_assistant_no_overlap': "Asystent nie jest dostępny w podanym czasie.",
+}
+
+@contextmanager
+def reject_double_booking():
+    """
+    Zamienia naruszenie ograniczeń EXCLUDE na Event w ValidationError.
+    Chroni przed wyścigiem dwóch zapisów, które osobno przeszły walidację.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as e:
+        cause = e.__cause__
+        if getattr(cause, 'pgcode', None) != EXCLUSION_VIOLATION:
+            raise
+        constraint = getattr(getattr(cause, 'diag', None), 'constraint_name', None)
+        raise ValidationError(BOOKING_CONFLICT_MESSAGES.get(constraint, "Termin koliduje z innym wydarzeniem."))
 
 def validate_doctor_id(value):
     try:
@@ -1,4 +1,5 @@
 from drf_spectacular.utils import extend_schema, OpenApiParameter
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 
 from rest_framework import viewsets, status, mixins, serializers
@@ -8,34 +9,42 @@ from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from rest_framework.parsers import JSONParser
 from rest_framework.exceptions import ValidationError
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.filters import SearchFilter
 
 from .models import Event, Office, Absence, VisitType, Tags, PlanChange
-from .serializers import EventSerializer, DoctorScheduleSerializer, AbsenceSerializer, OfficeSerializer, VisitTypeSerializer, TagsSerializer, EventCalendarSerializer, EventListSerializer, TimeSlotRequestSerializer, TimeSlotSerializer
+from .serializers import EventSerializer, DoctorScheduleSerializer, AbsenceSerializer, OfficeSerializer, VisitTypeSerializer, TagsSerializer, EventCalendarSerializer, EventListSerializer, TimeSlotRequestSerializer, TimeSlotSerializer, BatchTimeSlotRequestSerializer, BatchTimeSlotSerializer, AvailableResourcesRequestSerializer, AvailableResourcesSerializer, EventCalendarRows, EventListRows, EventCalendarRequestSerializer, columnar
 
 from .filters import EventFilter
 from .utlis import *
-from .renderers import ORJSONRenderer
-from .validators import validate_assistant_id, is_assistant_available, validate_doctor_id, is_doctor_available, validate_patient_id, is_office_available, validate_office_id, is_patient_available, validate_dates, validate_times
+from .renderers import ORJSONRenderer, NDJSONRenderer
+from .pagination import PageNumberOrKeysetPagination
+from .intervals import to_interval
+from .occupancy import intervals_bitmap, unavailable_dates, get_resources_bitmaps, is_free, BITMAP_BYTES, EMPLOYEE_RESOURCES
+from .validators import validate_assistant_id, validate_doctor_id, validate_patient_id, validate_office_id, validate_dates, validate_times, conflicting_dates, available_profiles
 
 from user_profile.models import ProfileCentralUser, EmployeeSchedule
 from user_profile.permissions import IsOwnerOfInstitution, HasProfilePermission
 from user_profile.serializers import ProfileCentralUserSerializer
 from user_profile.utils import generate_daily_time_slots, mark_occupied_slots
-from branch.models import Branch
+from branch.mixins import BranchContextMixin, get_branch, BRANCH_NOT_FOUND
 
+from itertools import islice
 from datetime import timedelta, datetime
 from dateutil.relativedelta import relativedelta
+import orjson
+import base64
 
 
-class EventViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.DestroyModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+class EventViewSet(BranchContextMixin, mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.DestroyModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     queryset = Event.objects.select_related('doctor', 'office', 'assistant', 'patient').all()
     serializer_class = EventSerializer
     permission_classes = [HasProfilePermission]
     filter_backends = [DjangoFilterBackend]
     filterset_class = EventFilter
 
+    def get_queryset(self):
+        return super().get_queryset().filter(branch_id=self.get_branch_id())
+
     def create(self, request, *args, **kwargs):
         is_many = isinstance(request.data, list)
 
@@ -47,41 +56,59 @@ class EventViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.Dest
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
-class EventCalendarViewSet(viewsets.ReadOnlyModelViewSet):
+class EventCalendarViewSet(BranchContextMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet do wyświetlania listy eventów w kalendarzu.
     """
     queryset = Event.objects.select_related('doctor', 'office').all()
     serializer_class = EventCalendarSerializer
     permission_classes = [HasProfilePermission]
+    renderer_classes = [ORJSONRenderer]
     filter_backends = [DjangoFilterBackend]
     filterset_class = EventFilter
 
+    DICTIONARY_COLUMNS = ('doctor_name', 'office_name', 'visit_type_name')
+
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        return Event.objects.filter(branch__identyficator=branch_uuid).select_related('doctor', 'office')
+        return Event.objects.filter(branch_id=self.get_branch_id()).select_related('doctor', 'office')
+
+    @extend_schema(
+        description=(
+            "Wydarzenia z okna date_start..date_end (wymagane, maks. EVENT_CALENDAR_MAX_SPAN_DAYS dni). "
+            "Dla layout=columnar zwraca tablicę na każde pole, a nazwy lekarzy, gabinetów "
+            "i typów wizyt jako indeksy do `dictionaries`."
+        ),
+        parameters=[EventCalendarRequestSerializer],
+    )
+    def list(self, request, *args, **kwargs):
+        window = EventCalendarRequestSerializer(data=request.query_params)
+        if not window.is_valid():
+            return Response(window.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset()).order_by('date', 'start_time', 'id')
+        rows = EventCalendarRows.many(EventCalendarRows.values(queryset))
+        if window.validated_data['layout'] == 'columnar':
+            return Response(columnar(rows, list(EventCalendarRows.columns), self.DICTIONARY_COLUMNS))
+        return Response(rows)
 
 
-class AbsenceViewSet(viewsets.ModelViewSet):
+class AbsenceViewSet(BranchContextMixin, viewsets.ModelViewSet):
     serializer_class = AbsenceSerializer
     permission_classes = [HasProfilePermission]
     filterset_fields = ['profile']
 
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        user = self.request.user
         profile_id = self.request.query_params.get('profile')
 
-        try:
-            profile = ProfileCentralUser.objects.get(user=user, branch__identyficator=branch_uuid)
-        except ProfileCentralUser.DoesNotExist:
+        profile = self.get_profile()
+        if profile is None:
             return Absence.objects.none()
 
-        queryset = Absence.objects.filter(branch__identyficator=branch_uuid)
+        queryset = Absence.objects.filter(branch_id=profile.branch_id)
 
         if profile_id:
             try:
-                profile = ProfileCentralUser.objects.get(id=profile_id, branch__identyficator=branch_uuid)
+                profile = ProfileCentralUser.objects.get(id=profile_id, branch_id=profile.branch_id)
                 queryset = queryset.filter(profile=profile)
             except ProfileCentralUser.DoesNotExist:
                 raise serializers.ValidationError("Podany profil nie istnieje w tym branchu.")
@@ -91,31 +118,26 @@ class AbsenceViewSet(viewsets.ModelViewSet):
         return queryset
     
     def perform_create(self, serializer):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        branch = Branch.objects.get(identyficator=branch_uuid)
-        serializer.save(branch=branch)
+        serializer.save(branch=self.get_branch())
         
 
-class DoctorScheduleViewSet(viewsets.ModelViewSet):
+class DoctorScheduleViewSet(BranchContextMixin, viewsets.ModelViewSet):
     serializer_class = DoctorScheduleSerializer
     permission_classes = [IsAuthenticated, HasProfilePermission]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['employee']
 
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        user = self.request.user
         employee_id = self.request.query_params.get('employee')
-        try:
-            profile = ProfileCentralUser.objects.get(user=user, branch__identyficator=branch_uuid)
-        except ProfileCentralUser.DoesNotExist:
+        profile = self.get_profile()
+        if profile is None:
             return EmployeeSchedule.objects.none()
         
-        queryset = EmployeeSchedule.objects.filter(branch__identyficator=branch_uuid)
+        queryset = EmployeeSchedule.objects.filter(branch_id=profile.branch_id)
 
         if employee_id:
             try:
-                employee = ProfileCentralUser.objects.get(id=employee_id, branch__identyficator=branch_uuid)
+                employee = ProfileCentralUser.objects.get(id=employee_id, branch_id=profile.branch_id)
                 queryset = queryset.filter(employee=employee)
             except ProfileCentralUser.DoesNotExist:
                 raise serializers.ValidationError("Podany pracownik nie istnieje w tym branchu.")
@@ -125,12 +147,10 @@ class DoctorScheduleViewSet(viewsets.ModelViewSet):
         return queryset
     
     def perform_create(self, serializer):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        branch = Branch.objects.get(identyficator=branch_uuid)
-        serializer.save(branch=branch)
+        serializer.save(branch=self.get_branch())
 
 
-class OfficeViewSet(viewsets.ModelViewSet):
+class OfficeViewSet(BranchContextMixin, viewsets.ModelViewSet):
     queryset = Office.objects.all()
     serializer_class = OfficeSerializer
     permission_classes = [HasProfilePermission]
@@ -138,16 +158,13 @@ class OfficeViewSet(viewsets.ModelViewSet):
     search_fields = ['name']
 
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        return Office.objects.filter(branch__identyficator=branch_uuid)
+        return Office.objects.filter(branch_id=self.get_branch_id())
 
     def perform_create(self, serializer):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        branch = Branch.objects.get(identyficator=branch_uuid)
-        serializer.save(branch=branch)
+        serializer.save(branch=self.get_branch())
 
 
-class TagsViewSet(viewsets.ModelViewSet):
+class TagsViewSet(BranchContextMixin, viewsets.ModelViewSet):
     queryset = Tags.objects.all()
     serializer_class = TagsSerializer
     permission_classes = [HasProfilePermission]
@@ -155,37 +172,38 @@ class TagsViewSet(viewsets.ModelViewSet):
     search_fields = ['name']
 
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        return Tags.objects.filter(branch__identyficator=branch_uuid)
+        return Tags.objects.filter(branch_id=self.get_branch_id())
 
     def perform_create(self, serializer):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        branch = Branch.objects.get(identyficator=branch_uuid)
-        serializer.save(branch=branch)
+        serializer.save(branch=self.get_branch())
 
 
-class VisitTypeViewSet(viewsets.ModelViewSet):
+class VisitTypeViewSet(BranchContextMixin, viewsets.ModelViewSet):
     queryset = VisitType.objects.all()
     serializer_class = VisitTypeSerializer
     permission_classes = [HasProfilePermission]
 
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        return VisitType.objects.filter(branch__identyficator=branch_uuid)
+        return VisitType.objects.filter(branch_id=self.get_branch_id())
 
     def perform_create(self, serializer):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        branch = Branch.objects.get(identyficator=branch_uuid)
-        serializer.save(branch=branch)
+        serializer.save(branch=self.get_branch())
 
 
 class TimeSlotView(APIView):
     permission_classes = [IsAuthenticated, HasProfilePermission]
     parser_classes = [JSONParser]
-    renderer_classes = [ORJSONRenderer]
+    renderer_classes = [ORJSONRenderer, NDJSONRenderer]
+
+    # Przy Accept: application/x-ndjson sloty są wysyłane strumieniowo, a mapy zajętości ładowane tygodniami
+    STREAM_CHUNK_DAYS = 7
 
     @extend_schema(
-        description="Generuje dostępne sloty czasowe dla lekarza w zadanym przedziale czasowym.",
+        description=(
+            "Generuje dostępne sloty czasowe dla lekarza w zadanym przedziale czasowym. "
+            "Dla layout=intervals zwraca per dzień wolne interwały w minutach od północy, "
+            "dla layout=bitmask mapę wolnych minut w base64 (bit n = minuta n, bajty little-endian)."
+        ),
         request=TimeSlotRequestSerializer,
         responses={200: TimeSlotSerializer(many=True)}
     )
@@ -202,18 +220,16 @@ class TimeSlotView(APIView):
         start_date = validated_data['start_date']
         end_date = validated_data['end_date']
 
-        branch_uuid = self.kwargs.get('branch_uuid')
-        try:
-            branch = Branch.objects.get(identyficator=branch_uuid)
-        except Branch.DoesNotExist:
-            return Response({'error': 'Nie znaleziono branchu o podanym identyfikatorze.'}, status=status.HTTP_404_NOT_FOUND)
+        branch = get_branch(request)
+        if branch is None:
+            return Response({'error': BRANCH_NOT_FOUND}, status=status.HTTP_404_NOT_FOUND)
 
         try:
             doctor = ProfileCentralUser.objects.get(id=doctor_id)
         except ProfileCentralUser.DoesNotExist:
             return Response({'error': 'Nie znaleziono lekarza o podanym identyfikatorze.'}, status=status.HTTP_404_NOT_FOUND)
 
-        if doctor.branch != branch:
+        if doctor.branch_id != branch.id:
             return Response({'error': 'Wybrany lekarz nie należy do tego branchu.'}, status=status.HTTP_400_BAD_REQUEST)
 
         office = None
@@ -222,24 +238,106 @@ class TimeSlotView(APIView):
                 office = Office.objects.get(id=office_id)
             except Office.DoesNotExist:
                 return Response({'error': 'Nie znaleziono gabinetu.'}, status=status.HTTP_404_NOT_FOUND)
-            if office.branch != branch:
+            if office.branch_id != branch.id:
                 return Response({'error': 'Wybrany gabinet nie należy do tego branchu.'}, status=status.HTTP_400_BAD_REQUEST)
 
+        if validated_data['layout'] != 'slots':
+            free_intervals = iter_free_intervals_for_date_range(doctor, start_date, end_date, interval_minutes, office)
+            return Response(self.compact_slots(free_intervals, interval_minutes, validated_data['layout']), status=status.HTTP_200_OK)
+
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            slots = iter_time_slots_for_date_range(doctor, start_date, end_date, interval_minutes, office, chunk_days=self.STREAM_CHUNK_DAYS)
+            return StreamingHttpResponse(self.stream_slots(slots), content_type=NDJSONRenderer.media_type)
+
         slots = get_time_slots_for_date_range(doctor, start_date, end_date, interval_minutes, office)
         serialized_slots = TimeSlotSerializer(slots, many=True)
         return Response(serialized_slots.data, status=status.HTTP_200_OK)
 
+    @staticmethod
+    def compact_slots(free_intervals, interval_minutes, layout):
+        # Klient odtwarza sloty krokami `interval` od początku każdego wolnego interwału
+        days = []
+        for current_date, intervals in free_intervals:
+            if layout == 'bitmask':
+                mask = intervals_bitmap(intervals).to_bytes(BITMAP_BYTES, 'little')
+                days.append({'date': current_date, 'mask': base64.b64encode(mask).decode()})
+            else:
+                days.append({'date': current_date, 'free': intervals})
+        return {'interval': interval_minutes, 'cell_minutes': 1, 'days': days}
+
+    @staticmethod
+    def stream_slots(slots):
+        serializer = TimeSlotSerializer()
+        for slot in slots:
+            yield orjson.dumps(serializer.to_representation(slot)) + b'\n'
+
+
+class BatchTimeSlotView(APIView):
+    permission_classes = [IsAuthenticated, HasProfilePermission]
+    parser_classes = [JSONParser]
+    renderer_classes = [ORJSONRenderer]
+
+    # W trybie "limit" mapy zajętości ładujemy tygodniami, żeby nie skanować całego zakresu
+    EARLIEST_CHUNK_DAYS = 7
+
+    @extend_schema(
+        description="Generuje wolne sloty dla wielu lekarzy (albo asystentów - parametr role) naraz. Z parametrem limit zwraca tylko N najwcześniejszych slotów.",
+        request=BatchTimeSlotRequestSerializer,
+        responses={200: BatchTimeSlotSerializer(many=True)}
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = BatchTimeSlotRequestSerializer(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        validated_data = serializer.validated_data
+        doctor_ids = validated_data.get('doctor_ids')
+        office_id = validated_data.get('office_id')
+        limit = validated_data.get('limit')
+
+        branch = get_branch(request)
+        if branch is None:
+            return Response({'error': BRANCH_NOT_FOUND}, status=status.HTTP_404_NOT_FOUND)
+
+        doctors = ProfileCentralUser.objects.filter(branch=branch, role=validated_data['role']).order_by('id')
+        if doctor_ids:
+            doctors = list(doctors.filter(id__in=doctor_ids))
+            missing = set(doctor_ids) - {doctor.id for doctor in doctors}
+            if missing:
+                return Response({'error': f"Lekarze spoza branchu lub o innej roli: {', '.join(map(str, sorted(missing)))}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        office = None
+        if office_id:
+            try:
+                office = Office.objects.get(id=office_id, branch=branch)
+            except Office.DoesNotExist:
+                return Response({'error': 'Nie znaleziono gabinetu.'}, status=status.HTTP_404_NOT_FOUND)
+
+        slots = iter_time_slots_for_doctors(
+            doctors,
+            validated_data['start_date'],
+            validated_data['end_date'],
+            validated_data['interval'],
+            office,
+            chunk_days=self.EARLIEST_CHUNK_DAYS if limit else None,
+            role=validated_data['role']
+        )
+        if limit:
+            slots = islice(slots, limit)
+
+        serialized_slots = BatchTimeSlotSerializer(list(slots), many=True)
+        return Response(serialized_slots.data, status=status.HTTP_200_OK)
+
 
 class AvailableAssistantsView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [JSONParser]
 
     def post(self, request, *args, **kwargs):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        try:
-            branch = Branch.objects.get(identyficator=branch_uuid)
-        except Branch.DoesNotExist:
-            return Response({'error': 'Nie znaleziono branchu o podanym identyfikatorze.'}, status=status.HTTP_404_NOT_FOUND)
+        branch = get_branch(request)
+        if branch is None:
+            return Response({'error': BRANCH_NOT_FOUND}, status=status.HTTP_404_NOT_FOUND)
 
         data = request.data
         date_str = data.get('date')
@@ -266,34 +364,60 @@ class AvailableAssistantsView(APIView):
         except ValidationError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        assistants = ProfileCentralUser.objects.filter(role='assistant', branch=branch)
-        available_assistants = []
-        day_num = date.weekday()
+        available_assistants = available_profiles(
+            ProfileCentralUser.objects.filter(role='assistant', branch=branch).select_related('user'),
+            date, start_time, end_time
+        )
 
-        for assistant in assistants:
-            try:
-                schedule = EmployeeSchedule.objects.get(employee=assistant, day_num=day_num)
-            except EmployeeSchedule.DoesNotExist:
-                continue
+        serializer = ProfileCentralUserSerializer(available_assistants, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
-            if start_time < schedule.start_time or end_time > schedule.end_time:
-                continue
 
-            conflicting_events = Event.objects.filter(
-                assistant=assistant,
-                date=date,
-                start_time__lt=end_time,
-                end_time__gt=start_time,
-                branch=branch
-            )
+class AvailableResourcesView(APIView):
+    """
+    Wolni lekarze, asystenci i gabinety branchu w danym terminie - jedno zapytanie
+    z okna rezerwacji zamiast osobnych wywołań dla każdego typu zasobu.
+    """
+    permission_classes = [IsAuthenticated, HasProfilePermission]
+    parser_classes = [JSONParser]
 
-            if conflicting_events.exists():
-                continue
+    @extend_schema(
+        description="Zwraca lekarzy, asystentów i gabinety wolnych w podanym terminie.",
+        request=AvailableResourcesRequestSerializer,
+        responses={200: AvailableResourcesSerializer}
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = AvailableResourcesRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            available_assistants.append(assistant)
+        date = serializer.validated_data['date']
+        start, end = to_interval(serializer.validated_data['start_time'], serializer.validated_data['end_time'])
+
+        branch = get_branch(request)
+        if branch is None:
+            return Response({'error': BRANCH_NOT_FOUND}, status=status.HTTP_404_NOT_FOUND)
+
+        profiles = ProfileCentralUser.objects.filter(branch=branch, role__in=EMPLOYEE_RESOURCES).select_related('user').order_by('id')
+        resources = {
+            'doctor': [profile for profile in profiles if profile.role == 'doctor'],
+            'assistant': [profile for profile in profiles if profile.role == 'assistant'],
+            'office': list(Office.objects.filter(branch=branch).order_by('id')),
+        }
+        bitmaps = get_resources_bitmaps(
+            {resource: [item.id for item in items] for resource, items in resources.items()},
+            [date]
+        )
+        free = {
+            resource: [item for item in items if is_free(bitmaps[resource][(item.id, date)], start, end)]
+            for resource, items in resources.items()
+        }
 
-        serializer = ProfileCentralUserSerializer(available_assistants, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(AvailableResourcesSerializer({
+            'doctors': free['doctor'],
+            'assistants': free['assistant'],
+            'offices': free['office'],
+        }).data, status=status.HTTP_200_OK)
 
 
 class CheckRepetitionEvents(APIView):
@@ -317,11 +441,9 @@ class CheckRepetitionEvents(APIView):
     )
     def post(self, request, *args, **kwargs):
         data = request.data
-        branch_uuid = self.kwargs.get('branch_uuid')
-        try:
-            branch = Branch.objects.get(identyficator=branch_uuid)
-        except Branch.DoesNotExist:
-            return Response({'error': 'Nie znaleziono branchu o podanym identyfikatorze.'}, status=status.HTTP_404_NOT_FOUND)
+        branch = get_branch(request)
+        if branch is None:
+            return Response({'error': BRANCH_NOT_FOUND}, status=status.HTTP_404_NOT_FOUND)
 
         # Lista wymaganych parametrów
         required_params = ['start_date', 'end_date', 'interval_days', 'start_time', 'end_time']
@@ -396,16 +518,16 @@ class CheckRepetitionEvents(APIView):
                 return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
 
         # Sprawdzamy przynależność do branchu
-        if doctor and doctor.branch != branch:
+        if doctor and doctor.branch_id != branch.id:
             return Response({'error': 'Wybrany lekarz nie należy do tego branchu.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if assistant and assistant.branch != branch:
+        if assistant and assistant.branch_id != branch.id:
             return Response({'error': 'Wybrany asystent nie należy do tego branchu.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if office and office.branch != branch:
+        if office and office.branch_id != branch.id:
             return Response({'error': 'Wybrany gabinet nie należy do tego branchu.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if patient and patient.branch != branch:
+        if patient and patient.branch_id != branch.id:
             return Response({'error': 'Wybrany pacjent nie należy do tego branchu.'}, status=status.HTTP_400_BAD_REQUEST)
 
         dates = []
@@ -424,21 +546,20 @@ class CheckRepetitionEvents(APIView):
                 dates.append(current_date)
                 current_date += timedelta(days=interval_days)
 
+        # Zajętość liczymy dla wszystkich dat naraz - liczba zapytań nie zależy od liczby powtórzeń
+        unavailable = []
+        if doctor:
+            unavailable.append(('Lekarz niedostępny', unavailable_dates('doctor', doctor.id, dates, start_time, end_time)))
+        if assistant:
+            unavailable.append(('Asystent niedostępny', unavailable_dates('assistant', assistant.id, dates, start_time, end_time)))
+        if office:
+            unavailable.append(('Gabinet zajęty', unavailable_dates('office', office.id, dates, start_time, end_time)))
+        if patient:
+            unavailable.append(('Pacjent niedostępny', conflicting_dates(dates, start_time, end_time, patient=patient)))
+
         availability_list = []
         for date in dates:
-            conflicts = []
-
-            if doctor and not is_doctor_available(doctor, date, start_time, end_time):
-                conflicts.append('Lekarz niedostępny')
-
-            if assistant and not is_assistant_available(assistant, date, start_time, end_time):
-                conflicts.append('Asystent niedostępny')
-
-            if office and not is_office_available(office, date, start_time, end_time):
-                conflicts.append('Gabinet zajęty')
-
-            if patient and not is_patient_available(patient, date, start_time, end_time):
-                conflicts.append('Pacjent niedostępny')
+            conflicts = [message for message, busy_dates in unavailable if date in busy_dates]
 
             event_data = {
                 'date': date,
@@ -457,24 +578,30 @@ class CheckRepetitionEvents(APIView):
         return Response(availability_list, status=status.HTTP_200_OK)
     
     
-class CustomEventPagination(PageNumberPagination):
+class CustomEventPagination(PageNumberOrKeysetPagination):
     page_size = 100
     max_page_size = 200
+    keyset_ordering = ('date', 'start_time', 'id')
 
 
-class EventListView(ListAPIView):
+class EventListView(BranchContextMixin, ListAPIView):
     serializer_class = EventListSerializer
     queryset = Event.objects.none()
     pagination_class = CustomEventPagination
     renderer_classes = [ORJSONRenderer]
     filter_backends = [SearchFilter]
-    search_fields = ['doctor__name', 'patient__name', 'date', 'event_status__status', 'patient__surname']
+    # Lekarz, pacjent, status i data są w search_document - bez złączeń, po indeksie trigramowym
+    search_fields = ['search_document']
 
     
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        queryset = Event.objects.filter(branch__identyficator=branch_uuid).select_related(
+        queryset = Event.objects.filter(branch_id=self.get_branch_id()).select_related(
             'branch', 'doctor', 'patient', 'event_status'
-        )
+        ).order_by('date', 'start_time', 'id')
         return queryset
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(EventListRows.values(queryset))
+        return self.get_paginated_response(EventListRows.many(page))
     
\ No newline at end of file
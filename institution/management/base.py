@@ -0,0 +1,156 @@
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django_tenants.utils import get_public_schema_name, schema_context
+
+# Podstawa komend, które wykonują to samo na każdym schemacie tenanta. Podklasa
+# implementuje handle_tenant(schema_name, **options); reszta - wybór schematów,
+# równoległość, postęp, czasy, izolacja błędów i plik z punktami kontrolnymi -
+# jest tutaj. Przy --concurrency > 1 każdy schemat idzie do osobnego procesu
+# (spawn, bez dziedziczenia połączeń z bazą procesu głównego). Proces potomny
+# importuje ten moduł przed django.setup(), więc modele importujemy leniwie.
+
+
+@dataclass
+class TenantResult:
+    schema_name: str
+    ok: bool
+    seconds: float
+    message: str = ''
+
+
+def _init_worker(settings_module, database_name):
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    import django
+    django.setup()
+
+    # Proces potomny czyta ustawienia od nowa; nazwę bazy bierzemy od rodzica (np. testowej)
+    from django.conf import settings
+    from django.db import connections
+    settings.DATABASES['default']['NAME'] = database_name
+    connections['default'].settings_dict['NAME'] = database_name
+
+
+def run_tenant(command_class, schema_name, options):
+    command = command_class()
+    started = time.perf_counter()
+    try:
+        with schema_context(schema_name):
+            message = command.handle_tenant(schema_name, **options)
+        return TenantResult(schema_name, True, time.perf_counter() - started, message or '')
+    except Exception:
+        return TenantResult(schema_name, False, time.perf_counter() - started, traceback.format_exc())
+    finally:
+        connection.set_schema_to_public()
+
+
+class TenantParallelCommand(BaseCommand):
+    # Opcje, które nie przechodzą do procesów potomnych
+    PROCESS_LOCAL_OPTIONS = ('stdout', 'stderr', 'schemas', 'concurrency', 'checkpoint', 'resume')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', action='append', dest='schemas', help="Tylko te schematy (można podać wiele razy).")
+        parser.add_argument('--concurrency', type=int, default=1, help="Liczba procesów (domyślnie 1 - bez puli).")
+        parser.add_argument('--checkpoint', help="Plik JSON Lines z wynikami poszczególnych schematów.")
+        parser.add_argument('--resume', action='store_true', help="Pomiń schematy zapisane w --checkpoint jako udane.")
+
+    def handle_tenant(self, schema_name, **options):
+        """
+        Praca dla jednego schematu; wykonywana w schema_context. Zwrócony tekst trafia do postępu.
+        """
+        raise NotImplementedError
+
+    def get_schema_names(self, options):
+        from institution.models import Institution
+
+        queryset = Institution.objects.exclude(schema_name=get_public_schema_name()).order_by('id')
+        if options['schemas']:
+            queryset = queryset.filter(schema_name__in=options['schemas'])
+            missing = set(options['schemas']) - set(queryset.values_list('schema_name', flat=True))
+            if missing:
+                raise CommandError(f"Nie znaleziono schematów: {', '.join(sorted(missing))}")
+        return list(queryset.values_list('schema_name', flat=True))
+
+    def handle(self, *args, **options):
+        if options['resume'] and not options['checkpoint']:
+            raise CommandError("--resume wymaga --checkpoint.")
+
+        schema_names = self.get_schema_names(options)
+        if options['resume']:
+            done = self.read_checkpoint(options['checkpoint'])
+            skipped = [schema_name for schema_name in schema_names if schema_name in done]
+            schema_names = [schema_name for schema_name in schema_names if schema_name not in done]
+            if skipped:
+                self.stdout.write(f"Pominięto {len(skipped)} schematów z punktu kontrolnego.")
+
+        tenant_options = {key: value for key, value in options.items() if key not in self.PROCESS_LOCAL_OPTIONS}
+        started = time.perf_counter()
+        results = []
+        for result in self.run(schema_names, tenant_options, options['concurrency']):
+            results.append(result)
+            self.report(result, len(results), len(schema_names))
+            if options['checkpoint']:
+                self.write_checkpoint(options['checkpoint'], result)
+
+        self.summary(results, time.perf_counter() - started)
+
+    def run(self, schema_names, tenant_options, concurrency):
+        if concurrency <= 1 or len(schema_names) <= 1:
+            for schema_name in schema_names:
+                yield run_tenant(type(self), schema_name, tenant_options)
+            return
+
+        executor = ProcessPoolExecutor(
+            max_workers=min(concurrency, len(schema_names)),
+            mp_context=get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(os.environ.get('DJANGO_SETTINGS_MODULE'), connection.settings_dict['NAME']),
+        )
+        with executor:
+            futures = [executor.submit(run_tenant, type(self), schema_name, tenant_options) for schema_name in schema_names]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def report(self, result, position, total):
+        prefix = f"[{position}/{total}] {result.schema_name} {result.seconds:.2f}s"
+        if result.ok:
+            self.stdout.write(f"{prefix} {result.message}".rstrip())
+        else:
+            self.stderr.write(f"{prefix} BŁĄD\n{result.message}")
+
+    def summary(self, results, seconds):
+        failed = [result.schema_name for result in results if not result.ok]
+        self.stdout.write(f"Schematy: {len(results)}, błędy: {len(failed)}, czas: {seconds:.2f}s")
+        if results:
+            slowest = max(results, key=lambda result: result.seconds)
+            self.stdout.write(f"Najwolniejszy: {slowest.schema_name} ({slowest.seconds:.2f}s)")
+        if failed:
+            raise CommandError(f"Nie powiodło się dla: {', '.join(failed)}")
+
+    @staticmethod
+    def read_checkpoint(path):
+        if not os.path.exists(path):
+            return set()
+        done = set()
+        with open(path) as checkpoint:
+            for line in checkpoint:
+                entry = json.loads(line)
+                if entry['ok']:
+                    done.add(entry['schema_name'])
+        return done
+
+    @staticmethod
+    def write_checkpoint(path, result):
+        with open(path, 'a') as checkpoint:
+            checkpoint.write(json.dumps({
+                'schema_name': result.schema_name,
+                'ok': result.ok,
+                'seconds': round(result.seconds, 3),
+            }) + '\n')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from institution.provisioning import template_schema_name, prepare_template, template_ready
+
+
+class Command(BaseCommand):
+    help = "Tworzy lub domigrowuje schemat-szablon, z którego klonowane są nowe instytucje."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="Usuń istniejący szablon i zbuduj go od nowa.")
+
+    def handle(self, *args, **options):
+        if not template_schema_name():
+            raise CommandError("Ustaw TENANT_TEMPLATE_SCHEMA w ustawieniach.")
+
+        prepare_template(rebuild=options['rebuild'], verbosity=options['verbosity'])
+        if not template_ready():
+            raise CommandError("Szablon nie ma kompletu migracji.")
+        self.stdout.write(self.style.SUCCESS(f"Szablon {template_schema_name()} gotowy."))
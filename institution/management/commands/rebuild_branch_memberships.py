@@ -0,0 +1,11 @@
+from branch.membership import rebuild_index
+from institution.management.base import TenantParallelCommand
+from institution.models import Institution
+
+
+class Command(TenantParallelCommand):
+    help = "Odbudowuje kopię członkostw w branchach (UserBranchMembership) w schemacie public."
+
+    def handle_tenant(self, schema_name, **options):
+        rows = rebuild_index(Institution.objects.get(schema_name=schema_name))
+        return f"{rows} członkostw"
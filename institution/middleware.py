@@ -0,0 +1,107 @@
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django_tenants.middleware.main import TenantMainMiddleware
+
+# Hostname -> tenant trzymany w pamięci procesu (LRU z TTL), żeby routing żądań
+# nie pytał schematu public o Domain i Institution przy każdym wywołaniu.
+# Sygnały z institution/signals.py czyszczą cache lokalnie i podbijają wersję
+# w Redisie, po której pozostałe procesy czyszczą swoje kopie. Wersję czytamy
+# najwyżej raz na `sync_interval` sekund; gdy Redis nie odpowiada, wpisy
+# wygasają po TTL.
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'tenant-routing:version'
+
+
+class TenantCache:
+    def __init__(self, max_size, ttl, sync_interval):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self.entries = OrderedDict()
+        self.version = None
+        self.synced_at = None
+        self.lock = threading.Lock()
+
+    def get(self, hostname):
+        with self.lock:
+            entry = self.entries.get(hostname)
+            if entry is None:
+                return None
+            tenant, expires = entry
+            if expires < time.monotonic():
+                del self.entries[hostname]
+                return None
+            self.entries.move_to_end(hostname)
+            return tenant
+
+    def set(self, hostname, tenant):
+        with self.lock:
+            self.entries[hostname] = (tenant, time.monotonic() + self.ttl)
+            self.entries.move_to_end(hostname)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def sync_due(self):
+        # Zaznacza sprawdzenie od razu, żeby równoległe żądania nie pytały Redisa naraz
+        with self.lock:
+            now = time.monotonic()
+            if self.synced_at is not None and now - self.synced_at < self.sync_interval:
+                return False
+            self.synced_at = now
+            return True
+
+    def sync(self, version):
+        # Inny proces zmienił tenanta lub domenę - nasze wpisy mogą być nieaktualne
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+
+
+tenant_cache = TenantCache(
+    max_size=getattr(settings, 'TENANT_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'TENANT_CACHE_TTL', 300),
+    sync_interval=getattr(settings, 'TENANT_CACHE_BROADCAST_INTERVAL', 5),
+)
+
+
+def invalidate_tenant_cache():
+    tenant_cache.clear()
+    if not getattr(settings, 'TENANT_CACHE_BROADCAST', True):
+        return
+
+    def bump():
+        if not cache.add(VERSION_KEY, 1, timeout=None):
+            cache.incr(VERSION_KEY)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+class CachedTenantMainMiddleware(TenantMainMiddleware):
+    def get_tenant(self, domain_model, hostname):
+        if getattr(settings, 'TENANT_CACHE_BROADCAST', True) and tenant_cache.sync_due():
+            try:
+                tenant_cache.sync(cache.get(VERSION_KEY))
+            except Exception as e:
+                logger.warning(f'Tenant routing version unavailable, relying on local TTL: {e}')
+
+        tenant = tenant_cache.get(hostname)
+        if tenant is None:
+            tenant = super().get_tenant(domain_model, hostname)
+            tenant_cache.set(hostname, tenant)
+        # Każde żądanie dostaje własną kopię - process_request ustawia na niej domain_url
+        return copy.copy(tenant)
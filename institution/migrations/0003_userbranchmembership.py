@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institution', '0002_institution_address_institution_vat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserBranchMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch_identyficator', models.UUIDField()),
+                ('branch_pk', models.BigIntegerField()),
+                ('profile_pk', models.BigIntegerField(blank=True, null=True)),
+                ('role', models.CharField(blank=True, max_length=30, null=True)),
+                ('is_owner', models.BooleanField(default=False)),
+                ('institution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='branch_memberships', to='institution.institution')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='branch_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'institution', 'branch_identyficator'), name='user_branch_membership_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+from django.db import migrations
+from django_tenants.utils import get_public_schema_name
+
+
+# Wypełnia kopię członkostw (UserBranchMembership) z profili i branchy każdego
+# tenanta - bez tego logowanie po wdrożeniu zwracałoby puste domeny i claimy.
+# Zapytania odpowiadają branch.membership.collect_memberships; kod aplikacji
+# nie jest importowany, bo migracja musi działać na historycznym stanie.
+
+PROFILES_SQL = """
+    SELECT p.user_id, p.id, b.id, b.identyficator, p.role, o.user_id IS NOT DISTINCT FROM p.user_id
+    FROM {schema}.user_profile_profilecentraluser p
+    JOIN {schema}.branch_branch b ON b.id = p.branch_id
+    LEFT JOIN {schema}.user_profile_profilecentraluser o ON o.id = b.owner_id
+    WHERE p.user_id IS NOT NULL
+"""
+
+OWNED_SQL = """
+    SELECT o.user_id, b.id, b.identyficator
+    FROM {schema}.branch_branch b
+    JOIN {schema}.user_profile_profilecentraluser o ON o.id = b.owner_id
+    WHERE o.user_id IS NOT NULL
+"""
+
+
+def tenant_memberships(cursor, schema_name):
+    schema = f'"{schema_name}"'
+    cursor.execute(
+        "SELECT to_regclass(%s) IS NOT NULL AND to_regclass(%s) IS NOT NULL",
+        [f'{schema}.user_profile_profilecentraluser', f'{schema}.branch_branch']
+    )
+    if not cursor.fetchone()[0]:
+        return {}
+
+    memberships = {}
+    cursor.execute(PROFILES_SQL.format(schema=schema))
+    for user_id, profile_id, branch_id, identyficator, role, is_owner in cursor.fetchall():
+        memberships[(user_id, identyficator)] = (branch_id, profile_id, role, is_owner)
+    # Właściciel nie musi mieć profilu w każdym swoim branchu
+    cursor.execute(OWNED_SQL.format(schema=schema))
+    for user_id, branch_id, identyficator in cursor.fetchall():
+        memberships.setdefault((user_id, identyficator), (branch_id, None, None, True))
+    return memberships
+
+
+def backfill_memberships(apps, schema_editor):
+    connection = schema_editor.connection
+    if getattr(connection, 'schema_name', get_public_schema_name()) != get_public_schema_name():
+        return
+
+    Institution = apps.get_model('institution', 'Institution')
+    UserBranchMembership = apps.get_model('institution', 'UserBranchMembership')
+
+    with connection.cursor() as cursor:
+        for institution in Institution.objects.exclude(schema_name=get_public_schema_name()).order_by('id'):
+            memberships = tenant_memberships(cursor, institution.schema_name)
+            UserBranchMembership.objects.bulk_create([
+                UserBranchMembership(
+                    user_id=user_id,
+                    institution=institution,
+                    branch_identyficator=identyficator,
+                    branch_pk=branch_id,
+                    profile_pk=profile_id,
+                    role=role,
+                    is_owner=is_owner,
+                )
+                for (user_id, identyficator), (branch_id, profile_id, role, is_owner) in memberships.items()
+            ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institution', '0003_userbranchmembership'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_memberships, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,11 @@
-from django.db import models
+from django.db import models, connection
 from django_tenants.models import TenantMixin, DomainMixin
+from django_tenants.postgresql_backend.base import _check_schema_name
+from django_tenants.utils import schema_exists
 import re
 from django.core.exceptions import ValidationError
 from custom_user.models import CentralUser
+from .provisioning import template_schema_name, template_ready, clone_template
 
 class Institution(TenantMixin):
     name = models.CharField(max_length=255)
@@ -24,7 +27,10 @@ class Institution(TenantMixin):
             schema_candidate = base_schema_name
 
             counter = 1
-            while Institution.objects.filter(schema_name=schema_candidate).exists():
+            while (
+                Institution.objects.filter(schema_name=schema_candidate).exists()
+                or schema_candidate == template_schema_name()
+            ):
                 counter += 1
                 schema_candidate = f"{base_schema_name}_{counter}"
             
@@ -32,6 +38,15 @@ class Institution(TenantMixin):
 
         super().save(*args, **kwargs)
 
+    def create_schema(self, check_if_exists=False, sync_schema=True, verbosity=1):
+        # Kopia gotowego szablonu zamiast migracji od zera, jeśli szablon jest aktualny
+        if sync_schema and not (check_if_exists and schema_exists(self.schema_name)) and template_ready():
+            _check_schema_name(self.schema_name)
+            clone_template(self.schema_name, verbosity=verbosity)
+            connection.set_schema_to_public()
+            return
+        return super().create_schema(check_if_exists=check_if_exists, sync_schema=sync_schema, verbosity=verbosity)
+
     def clean(self):
         super().clean()
         if not re.match(r'^[a-z_][a-z0-9_]*$', self.schema_name):
@@ -53,3 +68,26 @@ class UserInstitution(models.Model):
 
     def __str__(self):
         return f'{self.user.email} - {self.institution.name}'
+
+
+class UserBranchMembership(models.Model):
+    """
+    Kopia członkostw z ProfileCentralUser i Branch w schemacie public, utrzymywana
+    sygnałami z branch/signals.py. Logowanie czyta ją jednym zapytaniem zamiast
+    przełączać się po kolei na schemat każdej instytucji.
+    """
+    user = models.ForeignKey(CentralUser, on_delete=models.CASCADE, related_name='branch_memberships')
+    institution = models.ForeignKey(Institution, on_delete=models.CASCADE, related_name='branch_memberships')
+    branch_identyficator = models.UUIDField()
+    branch_pk = models.BigIntegerField()
+    profile_pk = models.BigIntegerField(null=True, blank=True)
+    role = models.CharField(max_length=30, null=True, blank=True)
+    is_owner = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'institution', 'branch_identyficator'], name='user_branch_membership_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} - {self.institution_id} - {self.branch_identyficator}'
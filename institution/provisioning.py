@@ -0,0 +1,75 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django_tenants.clone import CloneSchema
+from django_tenants.utils import schema_exists
+
+# Nowy tenant powstaje jako kopia schematu-szablonu z kompletem migracji
+# (clone_schema z django-tenants) zamiast uruchamiania wszystkich migracji od
+# zera. Szablon przygotowuje `manage.py prepare_tenant_template`; dopóki nie
+# istnieje albo brakuje w nim migracji z kodu, schemat tworzy się po staremu.
+
+
+def template_schema_name():
+    return getattr(settings, 'TENANT_TEMPLATE_SCHEMA', None)
+
+
+@lru_cache(maxsize=None)
+def expected_migrations():
+    # W schemacie tenanta django-tenants zapisuje migracje wszystkich aplikacji.
+    # Pliki migracji nie zmieniają się w trakcie działania procesu - graf
+    # budujemy raz, a nie przy każdym create_schema
+    return frozenset(MigrationLoader(None, ignore_no_migrations=True).graph.nodes)
+
+
+def applied_migrations(schema_name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT app, name FROM "{schema_name}".django_migrations')
+        return set(cursor.fetchall())
+
+
+def clone_function_exists():
+    with connection.cursor() as cursor:
+        # to_regproc zamiast ::regproc - brak funkcji nie przerywa transakcji
+        cursor.execute("SELECT to_regproc('public.clone_schema') IS NOT NULL")
+        return cursor.fetchone()[0]
+
+
+def template_ready():
+    schema_name = template_schema_name()
+    if not schema_name or not schema_exists(schema_name) or not clone_function_exists():
+        return False
+    return expected_migrations() <= applied_migrations(schema_name)
+
+
+def clone_template(schema_name, verbosity=1):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT clone_schema(%(base_schema)s, %(new_schema)s, false, false)',
+            {'base_schema': template_schema_name(), 'new_schema': schema_name}
+        )
+    # Kopiujemy samą strukturę (INSERT ... SELECT * nie przechodzi przez kolumny
+    # GENERATED, np. Event.period), więc migracje oznaczamy jako wykonane, a typy
+    # treści i uprawnienia dodają sygnały post_migrate - jak przy zwykłej migracji
+    call_command('migrate_schemas', tenant=True, fake=True, schema_name=schema_name, interactive=False, verbosity=verbosity)
+
+
+def prepare_template(rebuild=False, verbosity=1):
+    """
+    Tworzy albo domigrowuje schemat-szablon.
+    """
+    schema_name = template_schema_name()
+    with connection.cursor() as cursor:
+        if rebuild and schema_exists(schema_name):
+            cursor.execute(f'DROP SCHEMA "{schema_name}" CASCADE')
+        if not schema_exists(schema_name):
+            cursor.execute(f'CREATE SCHEMA "{schema_name}"')
+
+    call_command('migrate_schemas', tenant=True, schema_name=schema_name, interactive=False, verbosity=verbosity)
+    connection.set_schema_to_public()
+
+    if not clone_function_exists():
+        CloneSchema()._create_clone_schema_function()
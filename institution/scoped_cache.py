@@ -0,0 +1,137 @@
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import connection, transaction
+
+# Cache w przestrzeni nazw tenanta. Każdy klucz dostaje prefiks ze schematem
+# i generacją tenanta (opcjonalnie też branchu), np.
+# `scope:klinika:1712345678901234:b:7:1712345678905678:membership:42`.
+# Podbicie generacji unieważnia wszystkie klucze tenanta albo branchu naraz -
+# stare wpisy nie są już czytane i wygasają same, bez SCAN/DEL w Redisie.
+#
+# Nowy cache w kodzie idzie przez namespace(); bezpośrednio z django.core.cache
+# korzystają tylko klucze wspólne dla wszystkich tenantów (routing, wersja
+# członkostwa użytkownika).
+
+
+def generation_key(schema_name=None, branch_id=None):
+    schema_name = schema_name or connection.schema_name
+    if branch_id is None:
+        return f'scope:{schema_name}:generation'
+    return f'scope:{schema_name}:b:{branch_id}:generation'
+
+
+def _seed():
+    # Licznik, który zniknął z Redisa (wyczyszczenie, eviction), startuje od
+    # czasu zamiast od 0 - nie wraca do wartości, pod którą mogły zostać stare
+    # klucze albo którą zapamiętał token
+    return time.time_ns() // 1000
+
+
+def _generations(keys):
+    cached = cache.get_many(keys)
+    for key in keys:
+        if key not in cached:
+            cache.add(key, _seed(), timeout=None)
+            cached[key] = cache.get(key)
+    return cached
+
+
+def tenant_generations(schema_names):
+    """
+    {schemat: generacja} dla wielu tenantów naraz - jeden odczyt z Redisa,
+    jeśli wszystkie liczniki już istnieją.
+    """
+    keys = {schema_name: generation_key(schema_name) for schema_name in schema_names}
+    generations = _generations(list(keys.values()))
+    return {schema_name: generations[key] for schema_name, key in keys.items()}
+
+
+def tenant_generation(schema_name=None):
+    schema_name = schema_name or connection.schema_name
+    return tenant_generations([schema_name])[schema_name]
+
+
+class Namespace:
+    """
+    Klucze jednego tenanta (i branchu) z generacjami odczytanymi w namespace().
+    API jak django.core.cache dla używanych u nas operacji.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+    def make_key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def get(self, key, default=None):
+        return cache.get(self.make_key(key), default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        cache.set(self.make_key(key), value, timeout=timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        return cache.add(self.make_key(key), value, timeout=timeout)
+
+    def delete(self, key):
+        cache.delete(self.make_key(key))
+
+    def get_many(self, keys):
+        keys = {self.make_key(key): key for key in keys}
+        return {keys[full_key]: value for full_key, value in cache.get_many(keys.keys()).items()}
+
+    def set_many(self, mapping, timeout=DEFAULT_TIMEOUT):
+        cache.set_many({self.make_key(key): value for key, value in mapping.items()}, timeout=timeout)
+
+    def delete_many(self, keys):
+        cache.delete_many([self.make_key(key) for key in keys])
+
+    def counters(self, keys):
+        """
+        Wartości liczników bez wygasania; brakujące są zakładane jak generacje
+        (_seed), więc po eviction nie wracają do starej wartości.
+        """
+        full_keys = {self.make_key(key): key for key in keys}
+        return {full_keys[full_key]: value for full_key, value in _generations(list(full_keys)).items()}
+
+    def bump(self, key):
+        _bump(self.make_key(key))
+
+
+def namespace(branch_id=None, schema_name=None):
+    """
+    Przestrzeń nazw bieżącego tenanta (albo schema_name), z branch_id - także branchu.
+    Generacje są czytane raz, przy tworzeniu - jeden odczyt z Redisa.
+    """
+    schema_name = schema_name or connection.schema_name
+    tenant_key = generation_key(schema_name)
+    if branch_id is None:
+        generations = _generations([tenant_key])
+        return Namespace(f'scope:{schema_name}:{generations[tenant_key]}')
+
+    branch_key = generation_key(schema_name, branch_id)
+    generations = _generations([tenant_key, branch_key])
+    return Namespace(f'scope:{schema_name}:{generations[tenant_key]}:b:{branch_id}:{generations[branch_key]}')
+
+
+def _bump(key):
+    if not cache.add(key, _seed(), timeout=None):
+        cache.incr(key)
+
+
+def _invalidate(key):
+    # Podbijamy od razu i ponownie po commicie, żeby odczyt w trakcie transakcji
+    # nie zapisał nieaktualnych danych pod nową generacją
+    _bump(key)
+    transaction.on_commit(lambda: _bump(key))
+
+
+def invalidate_tenant(schema_name=None):
+    _invalidate(generation_key(schema_name))
+
+
+def invalidate_branch(branch_id, schema_name=None):
+    if branch_id is None:
+        return
+    _invalidate(generation_key(schema_name, branch_id))
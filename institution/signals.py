@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from institution.models import Institution, Domain, UserInstitution
 from custom_user.models import CentralUser
@@ -6,6 +6,8 @@ from user_profile.models import ProfileCentralUser
 from django_tenants.utils import schema_context
 from django.conf import settings
 from django_tenants.utils import tenant_context
+from institution.middleware import invalidate_tenant_cache
+from institution.scoped_cache import invalidate_tenant
 
 import logging
 
@@ -45,3 +47,15 @@ def handle_owner_user_change(sender, instance, **kwargs):
             logger.error(f'Error handling owner_user change: {e}')
 
 
+@receiver(post_save, sender=Institution)
+@receiver(post_delete, sender=Institution)
+@receiver(post_save, sender=Domain)
+@receiver(post_delete, sender=Domain)
+def invalidate_tenant_routing(sender, instance, **kwargs):
+    invalidate_tenant_cache()
+
+
+@receiver(post_delete, sender=Institution)
+def invalidate_institution_scope(sender, instance, **kwargs):
+    # Nowa instytucja o tej samej nazwie schematu nie może trafić na stary cache
+    invalidate_tenant(instance.schema_name)
@@ -0,0 +1,110 @@
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from django_tenants.utils import tenant_context
+
+from institution.models import CentralUser, Domain, UserBranchMembership
+from institution.serializers import InstitutionSerializer
+from branch.models import Branch
+from user_profile.models import ProfileCentralUser
+from branch.membership import MEMBERSHIP_CLAIM
+
+backfill = import_module('institution.migrations.0004_backfill_userbranchmembership')
+
+
+class UserBranchMembershipTestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+        self.client = APIClient()
+        self.institution = self.create_institution("Instytucja Indeks")
+        self.domain_obj = Domain.objects.get(tenant=self.institution)
+        self.owner_user = CentralUser.objects.get(email="indeks@example.com")
+
+        with tenant_context(self.institution):
+            self.branch = Branch.objects.filter(is_mother=True).first()
+
+    def tearDown(self):
+        connection.set_schema_to_public()
+
+    def create_institution(self, name):
+        serializer = InstitutionSerializer(data={
+            "name": name,
+            "owner_email": "indeks@example.com",
+            "owner_password": "test12345",
+            "owner_name": "Jan",
+            "owner_surname": "Kowalski",
+            "owner_phone_number": "+48123456789",
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+    def login(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/user/login/", data={"email": "indeks@example.com", "password": "test12345"},
+                format='json', HTTP_HOST=self.domain_obj.domain
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        return response.json(), len(queries)
+
+    def test_index_follows_profiles(self):
+        row = UserBranchMembership.objects.get(user=self.owner_user, institution=self.institution)
+        self.assertEqual(row.branch_identyficator, self.branch.identyficator)
+        self.assertTrue(row.is_owner)
+
+        with tenant_context(self.institution):
+            user = CentralUser.objects.create_user(email="pracownik@example.com")
+            profile = ProfileCentralUser.objects.create(user=user, branch=self.branch, role='doctor')
+        self.assertEqual(UserBranchMembership.objects.get(user=user).role, 'doctor')
+
+        with tenant_context(self.institution):
+            profile.delete()
+        self.assertFalse(UserBranchMembership.objects.filter(user=user).exists())
+
+    def test_login_query_count_independent_of_institutions(self):
+        data, one = self.login()
+        self.assertEqual(data['institutions'], [{
+            'name': "Instytucja Indeks",
+            'address': '',
+            'domains': [f"{self.domain_obj.domain}/{self.branch.identyficator}"],
+        }])
+
+        connection.set_schema_to_public()
+        second = self.create_institution("Instytucja Indeks Druga")
+        data, two = self.login()
+        self.assertEqual([institution['name'] for institution in data['institutions']], ["Instytucja Indeks", second.name])
+        self.assertEqual(len(data['institutions'][1]['domains']), 1)
+        self.assertEqual(one, two)
+
+    def test_rebuild_command(self):
+        UserBranchMembership.objects.all().delete()
+        call_command('rebuild_branch_memberships', stdout=StringIO())
+        self.assertEqual(
+            list(UserBranchMembership.objects.values_list('user_id', 'branch_identyficator', 'is_owner')),
+            [(self.owner_user.id, self.branch.identyficator, True)]
+        )
+
+    def test_login_after_deploy_with_unpopulated_index(self):
+        # Stan zaraz po 0003: tabela istnieje, ale nikt jej nie wypełnił
+        UserBranchMembership.objects.all().delete()
+        backfill.backfill_memberships(apps, SimpleNamespace(connection=connection))
+
+        data, _ = self.login()
+        self.assertEqual(data['institutions'][0]['domains'], [f"{self.domain_obj.domain}/{self.branch.identyficator}"])
+        claims = AccessToken(data['access'])[MEMBERSHIP_CLAIM][self.institution.schema_name]['b']
+        self.assertEqual(list(claims), [str(self.branch.identyficator)])
+        self.assertEqual(
+            list(UserBranchMembership.objects.values_list('user_id', 'branch_identyficator', 'is_owner')),
+            [(self.owner_user.id, self.branch.identyficator, True)]
+        )
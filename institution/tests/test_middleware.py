@@ -0,0 +1,107 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from django_tenants.utils import tenant_context
+
+from institution.middleware import tenant_cache, VERSION_KEY
+from institution.models import CentralUser, Domain
+from institution.serializers import InstitutionSerializer
+from branch.models import Branch
+
+
+class CachedTenantMiddlewareTestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+        self.client = APIClient()
+        payload = {
+            "name": "Instytucja Routing",
+            "owner_email": "routing@example.com",
+            "owner_password": "test12345",
+            "owner_name": "Jan",
+            "owner_surname": "Kowalski",
+            "owner_phone_number": "+48123456789",
+        }
+        serializer = InstitutionSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.institution = serializer.save()
+        self.domain_obj = Domain.objects.get(tenant=self.institution)
+        self.client.force_authenticate(user=CentralUser.objects.get(email=payload["owner_email"]))
+
+        with tenant_context(self.institution):
+            self.branch = Branch.objects.filter(is_mother=True).first()
+        self.url = f"/{self.branch.identyficator}/events/office/"
+
+    def tearDown(self):
+        connection.set_schema_to_public()
+
+    def get(self, host):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_HOST=host)
+        routing = [query['sql'] for query in queries.captured_queries if '"institution_domain"' in query['sql']]
+        return response, routing
+
+    def test_tenant_resolved_from_cache(self):
+        response, routing = self.get(self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(routing), 1)
+
+        response, routing = self.get(self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(routing, [])
+
+    def test_domain_change_invalidates_cache(self):
+        old_domain = self.domain_obj.domain
+        self.get(old_domain)
+
+        self.domain_obj.domain = "routing-nowa.localhost"
+        self.domain_obj.save()
+
+        self.assertIsNone(tenant_cache.get(old_domain))
+        response, _ = self.get(self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @patch.object(tenant_cache, 'sync_interval', 0)
+    def test_broadcast_version_clears_local_cache(self):
+        self.get(self.domain_obj.domain)
+
+        # Zmiana w innym procesie: tylko wersja w Redisie, bez lokalnego sygnału
+        cache.incr(VERSION_KEY)
+        response, routing = self.get(self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(routing), 1)
+        self.assertIsNotNone(tenant_cache.get(self.domain_obj.domain))
+
+    @patch.object(tenant_cache, 'sync_interval', 60)
+    def test_broadcast_version_checked_once_per_interval(self):
+        tenant_cache.synced_at = None
+        self.get(self.domain_obj.domain)
+
+        cache.incr(VERSION_KEY)
+        with patch.object(cache, 'get', wraps=cache.get) as cache_get:
+            response, routing = self.get(self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(routing, [])
+        self.assertNotIn(VERSION_KEY, [call.args[0] for call in cache_get.call_args_list])
+
+    @patch.object(tenant_cache, 'sync_interval', 0)
+    def test_broadcast_version_unavailable(self):
+        self.get(self.domain_obj.domain)
+
+        # Redis nie odpowiada - routing działa dalej z lokalnej kopii
+        get = cache.get
+
+        def unavailable(key, *args, **kwargs):
+            if key == VERSION_KEY:
+                raise ConnectionError
+            return get(key, *args, **kwargs)
+
+        with patch.object(cache, 'get', side_effect=unavailable):
+            response, routing = self.get(self.domain_obj.domain)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(routing, [])
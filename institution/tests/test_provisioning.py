@@ -0,0 +1,87 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django_tenants.utils import tenant_context
+
+from institution.provisioning import clone_template, template_ready
+from institution.serializers import InstitutionSerializer
+from branch.models import Branch
+
+
+def schema_signature(schema_name):
+    """
+    Kolumny, indeksy, ograniczenia, sekwencje i migracje schematu - z nazwą
+    schematu zastąpioną znacznikiem, żeby dało się porównać dwa schematy.
+    """
+    queries = {
+        'columns': """
+            SELECT table_name, column_name, data_type, is_nullable, column_default, is_generated, generation_expression
+            FROM information_schema.columns WHERE table_schema = %s
+        """,
+        'indexes': "SELECT tablename, indexname, indexdef FROM pg_indexes WHERE schemaname = %s",
+        'constraints': """
+            SELECT cl.relname, con.conname, con.contype, pg_get_constraintdef(con.oid)
+            FROM pg_constraint con
+            JOIN pg_class cl ON cl.oid = con.conrelid
+            JOIN pg_namespace ns ON ns.oid = cl.relnamespace
+            WHERE ns.nspname = %s
+        """,
+        'sequences': "SELECT sequence_name, data_type, increment FROM information_schema.sequences WHERE sequence_schema = %s",
+    }
+    signature = {}
+    with connection.cursor() as cursor:
+        for name, sql in queries.items():
+            cursor.execute(sql, [schema_name])
+            signature[name] = sorted(
+                tuple(str(value).replace(schema_name, '<schema>') if value is not None else None for value in row)
+                for row in cursor.fetchall()
+            )
+        cursor.execute(f'SELECT app, name FROM "{schema_name}".django_migrations')
+        signature['migrations'] = sorted(cursor.fetchall())
+    return signature
+
+
+class TemplateProvisioningTestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+
+    def tearDown(self):
+        connection.set_schema_to_public()
+
+    def create_institution(self, name, email):
+        serializer = InstitutionSerializer(data={
+            "name": name,
+            "owner_email": email,
+            "owner_password": "test12345",
+            "owner_name": "Jan",
+            "owner_surname": "Kowalski",
+            "owner_phone_number": "+48123456789",
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+    def test_cloned_schema_matches_migrated(self):
+        self.assertFalse(template_ready())
+        call_command('prepare_tenant_template', verbosity=0, stdout=StringIO())
+        self.assertTrue(template_ready())
+
+        with patch('institution.models.clone_template', wraps=clone_template) as clone, \
+                patch('institution.provisioning.MigrationLoader') as loader:
+            cloned = self.create_institution("Instytucja Klon", "klon@example.com")
+        clone.assert_called_once()
+        # Oczekiwane migracje są liczone raz na proces
+        loader.assert_not_called()
+
+        with override_settings(TENANT_TEMPLATE_SCHEMA=None):
+            migrated = self.create_institution("Instytucja Migracje", "migracje@example.com")
+
+        self.assertEqual(schema_signature(cloned.schema_name), schema_signature(migrated.schema_name))
+
+        # Szablon nie przenosi danych - w klonie jest tylko to, co utworzyła rejestracja
+        with tenant_context(cloned):
+            self.assertEqual(list(Branch.objects.values_list('name', flat=True)), ["Instytucja Klon"])
@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+
+from institution import scoped_cache
+from institution.scoped_cache import namespace, invalidate_tenant, invalidate_branch
+
+
+class ScopedCacheTestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+
+    def test_tenants_do_not_share_keys(self):
+        namespace(schema_name='klinika_a').set('klucz', 'a')
+        namespace(schema_name='klinika_b').set('klucz', 'b')
+
+        self.assertEqual(namespace(schema_name='klinika_a').get('klucz'), 'a')
+        self.assertEqual(namespace(schema_name='klinika_b').get('klucz'), 'b')
+        self.assertIsNone(cache.get('klucz'))
+
+    def test_invalidate_tenant(self):
+        namespace(schema_name='klinika_a').set_many({'x': 1, 'y': 2})
+        namespace(schema_name='klinika_a', branch_id=3).set('z', 3)
+        namespace(schema_name='klinika_b').set('x', 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_tenant('klinika_a')
+
+        self.assertEqual(namespace(schema_name='klinika_a').get_many(['x', 'y']), {})
+        self.assertIsNone(namespace(schema_name='klinika_a', branch_id=3).get('z'))
+        self.assertEqual(namespace(schema_name='klinika_b').get('x'), 1)
+
+    def test_invalidate_branch(self):
+        namespace(schema_name='klinika_a').set('x', 1)
+        namespace(schema_name='klinika_a', branch_id=3).set('x', 3)
+        namespace(schema_name='klinika_a', branch_id=4).set('x', 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_branch(3, schema_name='klinika_a')
+
+        self.assertEqual(namespace(schema_name='klinika_a').get('x'), 1)
+        self.assertIsNone(namespace(schema_name='klinika_a', branch_id=3).get('x'))
+        self.assertEqual(namespace(schema_name='klinika_a', branch_id=4).get('x'), 4)
+
+    def test_lost_generation_does_not_reuse_old_keys(self):
+        generation_key = scoped_cache.generation_key('klinika_a')
+        namespace(schema_name='klinika_a').set('x', 1, timeout=None)
+        cache.delete(generation_key)
+
+        self.assertIsNone(namespace(schema_name='klinika_a').get('x'))
+        self.assertIsNotNone(cache.get(generation_key))
+
+    def test_lost_counter_does_not_restart(self):
+        scope = namespace(schema_name='klinika_a')
+        scope.bump('wersja')
+        scope.bump('wersja')
+        before = scope.counters(['wersja'])['wersja']
+        self.assertGreater(before, 2)
+
+        cache.delete(scope.make_key('wersja'))
+        # Zarówno odczyt, jak i podbicie zakładają licznik od czasu, nie od 0/1
+        self.assertGreater(scope.counters(['wersja'])['wersja'], before)
+        cache.delete(scope.make_key('wersja'))
+        scope.bump('wersja')
+        self.assertGreater(scope.get('wersja'), before)
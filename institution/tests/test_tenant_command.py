@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from institution.management.base import TenantParallelCommand
+from institution.models import UserBranchMembership
+from institution.serializers import InstitutionSerializer
+
+
+class SchemaNameCommand(TenantParallelCommand):
+    """
+    Nie dotyka bazy - procesy potomne nie widzą danych z transakcji testu.
+    """
+    failing = 'instytucja_runner_b'
+
+    def handle_tenant(self, schema_name, **options):
+        if schema_name == self.failing and not options.get('heal'):
+            raise RuntimeError("awaria testowa")
+        return f"pid={os.getpid()} schema={connection.schema_name}"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--heal', action='store_true')
+
+
+class TenantParallelCommandTestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+        self.institutions = [self.create_institution(name, f"runner{index}@example.com") for index, name in enumerate(["Instytucja Runner A", "Instytucja Runner B"])]
+        self.schema_names = [institution.schema_name for institution in self.institutions]
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'checkpoint.jsonl')
+
+    def tearDown(self):
+        connection.set_schema_to_public()
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+
+    def create_institution(self, name, email):
+        serializer = InstitutionSerializer(data={
+            "name": name,
+            "owner_email": email,
+            "owner_password": "test12345",
+            "owner_name": "Jan",
+            "owner_surname": "Kowalski",
+            "owner_phone_number": "+48123456789",
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+    def checkpoint_entries(self):
+        with open(self.checkpoint) as checkpoint:
+            return [json.loads(line) for line in checkpoint]
+
+    def test_inline_rebuild_with_checkpoint(self):
+        UserBranchMembership.objects.all().delete()
+        output = StringIO()
+        call_command('rebuild_branch_memberships', checkpoint=self.checkpoint, stdout=output)
+
+        self.assertEqual(UserBranchMembership.objects.count(), 2)
+        self.assertEqual([entry['schema_name'] for entry in self.checkpoint_entries()], self.schema_names)
+        self.assertIn("[2/2]", output.getvalue())
+
+        output = StringIO()
+        call_command('rebuild_branch_memberships', checkpoint=self.checkpoint, resume=True, stdout=output)
+        self.assertIn("Pominięto 2", output.getvalue())
+        self.assertEqual(len(self.checkpoint_entries()), 2)
+
+    def test_process_pool_isolates_failures_and_resumes(self):
+        output, errors = StringIO(), StringIO()
+        with self.assertRaises(CommandError):
+            call_command(SchemaNameCommand(), concurrency=2, checkpoint=self.checkpoint, stdout=output, stderr=errors)
+
+        results = {entry['schema_name']: entry['ok'] for entry in self.checkpoint_entries()}
+        self.assertEqual(results, {'instytucja_runner_a': True, 'instytucja_runner_b': False})
+        self.assertIn("schema=instytucja_runner_a", output.getvalue())
+        self.assertNotIn(f"pid={os.getpid()}", output.getvalue())
+        self.assertIn("awaria testowa", errors.getvalue())
+
+        output = StringIO()
+        call_command(SchemaNameCommand(), concurrency=2, checkpoint=self.checkpoint, resume=True, heal=True, stdout=output)
+        self.assertIn("Pominięto 1", output.getvalue())
+        self.assertIn("[1/1] instytucja_runner_b", output.getvalue())
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0011_alter_teethinfo_teeth'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['branch', 'surname', 'name', 'id'], name='patient_branch_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:40
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0012_patient_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='patient_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('surname'), name='gin_trgm_ops'), name='patient_surname_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='gin_trgm_ops'), name='patient_email_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(models.F('branch'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('surname'), name='text_pattern_ops'), name='patient_surname_prefix'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(models.F('branch'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='patient_name_prefix'),
+        ),
+    ]
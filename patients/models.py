@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from branch.models import Branch
 
 
@@ -15,6 +18,18 @@ class Patient(models.Model):
     surname = models.CharField(max_length=255)
     email = models.CharField(max_length=255)
     age = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['branch', 'surname', 'name', 'id'], name='patient_branch_keyset_idx'),
+            # Wyszukiwanie (ILIKE '%...%') - Django porównuje UPPER(pole), stąd indeksy na wyrażeniach
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='patient_name_trgm'),
+            GinIndex(OpClass(Upper('surname'), name='gin_trgm_ops'), name='patient_surname_trgm'),
+            GinIndex(OpClass(Upper('email'), name='gin_trgm_ops'), name='patient_email_trgm'),
+            # Podpowiedzi (LIKE '...%')
+            models.Index(F('branch'), OpClass(Upper('surname'), name='text_pattern_ops'), name='patient_surname_prefix'),
+            models.Index(F('branch'), OpClass(Upper('name'), name='text_pattern_ops'), name='patient_name_prefix'),
+        ]
     
 
 class TreatmentPlan(models.Model):
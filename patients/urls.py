@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PatientViewSet, TreatmentList, TreatmentViewSet, TreatmentPlanViewSet, TreatmentInPlanCreateView, GeneratePatientsView
+from .views import PatientViewSet, TreatmentList, TreatmentViewSet, TreatmentPlanViewSet, TreatmentInPlanCreateView, GeneratePatientsView, PatientAutocompleteView
 
 router = DefaultRouter()
 router.register(r'patient', PatientViewSet, basename='patients')
@@ -11,6 +11,7 @@ urlpatterns = [
     path('', include(router.urls)),
     path('/<int:patient_id>/treatment-list/', TreatmentList.as_view(), name='treatment-list'),
     path('treatment-plan-element/<int:plan_id>/', TreatmentInPlanCreateView.as_view(), name='treatment-create'),
+    path('autocomplete/', PatientAutocompleteView.as_view(), name='patient-autocomplete'),
     path('generate-patients/', GeneratePatientsView.as_view(), name='generate_patients'),
 
 ]
\ No newline at end of file
@@ -3,22 +3,24 @@ from rest_framework import viewsets, permissions, generics, filters, status
 from .serializers import PatientSerializer, TreatmentListSerializer, TreatmentSerializer, TreatmentPlanSerializer
 from .models import Patient, Treatment, TreatmentPlan
 from event.models import Absence
-from branch.models import Branch
+from branch.mixins import BranchContextMixin
 from user_profile.permissions import HasProfilePermission
 from rest_framework.exceptions import MethodNotAllowed
 from rest_framework.views import APIView
 from rest_framework.response import Response
 import random
-from rest_framework.pagination import PageNumberPagination
+from event.pagination import PageNumberOrKeysetPagination
 from event.renderers import ORJSONRenderer
 from rest_framework.filters import SearchFilter
+from django.db.models import Q
 
-class CustomPatientPagination(PageNumberPagination):
+class CustomPatientPagination(PageNumberOrKeysetPagination):
     page_size = 100
     max_page_size = 200
+    keyset_ordering = ('surname', 'name', 'id')
 
 
-class PatientViewSet(viewsets.ModelViewSet):
+class PatientViewSet(BranchContextMixin, viewsets.ModelViewSet):
     serializer_class = PatientSerializer
     filterset_fields = ['id', 'name', 'surname', 'email']
     ordering_fields = ['id', 'name', 'surname', 'email']
@@ -29,92 +31,101 @@ class PatientViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'surname', 'email']
 
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        queryset = Patient.objects.filter(branch__identyficator=branch_uuid).select_related('branch')
-        return queryset
+        return Patient.objects.filter(branch_id=self.get_branch_id()).select_related('branch')
 
     def perform_create(self, serializer):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        branch = Branch.objects.get(identyficator=branch_uuid)
-        serializer.save(branch=branch)
+        serializer.save(branch=self.get_branch())
 
 
-class TreatmentList(generics.ListAPIView):
+class PatientAutocompleteView(BranchContextMixin, APIView):
+    """
+    Podpowiedzi pacjentów po początku imienia lub nazwiska (?q=now an).
+    Każde słowo musi być początkiem imienia albo nazwiska - LIKE 'X%' po indeksach prefiksowych.
+    """
+    permission_classes = [HasProfilePermission]
+    renderer_classes = [ORJSONRenderer]
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request, *args, **kwargs):
+        terms = request.query_params.get('q', '').split()
+        if not terms:
+            return Response([], status=status.HTTP_200_OK)
+
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+
+        queryset = Patient.objects.filter(branch_id=self.get_branch_id())
+        for term in terms:
+            queryset = queryset.filter(Q(surname__istartswith=term) | Q(name__istartswith=term))
+
+        patients = queryset.order_by('surname', 'name', 'id')[:max(limit, 1)]
+        return Response(PatientSerializer(patients, many=True).data, status=status.HTTP_200_OK)
+
+
+class TreatmentList(BranchContextMixin, generics.ListAPIView):
     serializer_class = TreatmentListSerializer
     queryset = Treatment.objects.none()
     permission_classes = [HasProfilePermission]
 
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
         patient = self.kwargs.get('patient_id')
-        if branch_uuid and patient:
-            return Treatment.objects.filter(
-                branch__identyficator=branch_uuid, 
-                patient__id=patient
-            )
+        if patient:
+            return Treatment.objects.filter(branch_id=self.get_branch_id(), patient__id=patient)
         return Treatment.objects.none()
 
 
-class TreatmentViewSet(viewsets.ModelViewSet):
+class TreatmentViewSet(BranchContextMixin, viewsets.ModelViewSet):
     serializer_class = TreatmentSerializer
     permission_classes = [HasProfilePermission]
 
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
         patient = self.kwargs.get('patient_id')
-        return Treatment.objects.filter(branch__identyficator=branch_uuid, patient__id=patient)
+        return Treatment.objects.filter(branch_id=self.get_branch_id(), patient__id=patient)
 
     def perform_create(self, serializer):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        branch = Branch.objects.get(identyficator=branch_uuid)
         patient = self.kwargs.get('patient_id')
-        serializer.save(branch=branch, patient=patient)
+        serializer.save(branch=self.get_branch(), patient=patient)
     
     def list(self, request, *args, **kwargs):
         raise MethodNotAllowed("GET", detail="List action is not allowed for this endpoint.")
     
 
-class TreatmentPlanViewSet(viewsets.ModelViewSet):
+class TreatmentPlanViewSet(BranchContextMixin, viewsets.ModelViewSet):
     serializer_class = TreatmentPlanSerializer
     permission_classes = [HasProfilePermission]
 
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
         patient = self.kwargs.get('patient_id')
-        if branch_uuid and patient:
-            return TreatmentPlan.objects.filter(
-                branch__identyficator=branch_uuid, 
-                patient__id=patient
-            )
+        if patient:
+            return TreatmentPlan.objects.filter(branch_id=self.get_branch_id(), patient__id=patient)
         return Treatment.objects.none()
 
     def perform_create(self, serializer):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        branch = Branch.objects.get(identyficator=branch_uuid)
-        serializer.save(branch=branch)
+        serializer.save(branch=self.get_branch())
 
 
-class TreatmentInPlanCreateView(generics.CreateAPIView):
+class TreatmentInPlanCreateView(BranchContextMixin, generics.CreateAPIView):
     serializer_class = TreatmentSerializer
     permission_classes = [HasProfilePermission]
 
     def perform_create(self, serializer):
-        branch_uuid = self.kwargs.get('branch_uuid')
         plan_id = self.kwargs.get('plan_id')
-        branch = Branch.objects.get(identyficator=branch_uuid)
+        branch = self.get_branch()
         treatment_plan = TreatmentPlan.objects.get(pk=plan_id, branch=branch)
         
         serializer.save(branch=branch, treatment_plan=treatment_plan)
 
 
-class GeneratePatientsView(APIView):
+class GeneratePatientsView(BranchContextMixin, APIView):
     """
     Widok do automatycznego tworzenia 50 000 pacjentów.
     """
 
     def post(self, request, *args, **kwargs):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        branch = Branch.objects.get(identyficator=branch_uuid)
+        branch = self.get_branch()
         number_of_patients = 500
 
         patients_data = []
@@ -0,0 +1,128 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .models import Obligation, Deposits, PiggyBank
+
+# Saldo pacjenta w branchu (PiggyBank.sum) = suma wpłat + suma zobowiązań
+# z to_count. Sygnały z payment/signals.py poprawiają je przy każdym zapisie
+# i usunięciu Obligation/Deposits, ścieżki z bulk_create wołają record_created.
+# `manage.py reconcile_balances` porównuje salda z wierszami źródłowymi.
+
+
+def obligation_entry(branch_id, patient_id, amount, to_count):
+    if patient_id is None or not to_count:
+        return None
+    return (branch_id, patient_id), amount or Decimal(0)
+
+
+def deposit_entry(branch_id, patient_id, amount):
+    if patient_id is None:
+        return None
+    return (branch_id, patient_id), amount or Decimal(0)
+
+
+def entry(instance):
+    """
+    (klucz salda, kwota) wiersza albo None, jeśli nie wchodzi do salda.
+    """
+    if isinstance(instance, Obligation):
+        return obligation_entry(instance.branch_id, instance.patient_id, instance.amount, instance.to_count)
+    return deposit_entry(instance.branch_id, instance.patient_id, instance.amount)
+
+
+def stored_entry(model, pk):
+    """
+    Wpis wiersza w stanie z bazy; blokuje wiersz do końca transakcji, żeby
+    równoległa zmiana nie policzyła różnicy od tego samego stanu.
+    """
+    if model is Obligation:
+        row = Obligation.objects.select_for_update().filter(pk=pk).values_list(
+            'branch_id', 'patient_id', 'amount', 'to_count'
+        ).first()
+        return obligation_entry(*row) if row else None
+    row = Deposits.objects.select_for_update().filter(pk=pk).values_list('branch_id', 'patient_id', 'amount').first()
+    return deposit_entry(*row) if row else None
+
+
+def apply_change(old, new):
+    """
+    Przenosi wpis wiersza ze starego stanu (old) do nowego (new); None - brak wpisu.
+    """
+    if old is not None and new is not None and old[0] == new[0]:
+        PiggyBank.objects.apply({new[0]: new[1] - old[1]})
+        return
+    if old is not None:
+        PiggyBank.objects.apply({old[0]: -old[1]}, create=False)
+    if new is not None:
+        PiggyBank.objects.apply({new[0]: new[1]})
+
+
+def record_created(instances):
+    """
+    Dla wierszy utworzonych z pominięciem sygnałów (bulk_create).
+    """
+    deltas = defaultdict(Decimal)
+    for instance in instances:
+        new = entry(instance)
+        if new is not None:
+            deltas[new[0]] += new[1]
+    PiggyBank.objects.apply(deltas)
+
+
+def expected_balances():
+    """
+    {(branch_id, patient_id): saldo} policzone z wierszy źródłowych - dwa zapytania.
+    """
+    balances = defaultdict(Decimal)
+    for branch_id, patient_id, total in Deposits.objects.values_list('branch_id', 'patient_id').annotate(
+        total=Sum('amount')
+    ).order_by():
+        balances[(branch_id, patient_id)] += total or 0
+    for branch_id, patient_id, total in Obligation.objects.filter(
+        to_count=True, patient__isnull=False
+    ).values_list('branch_id', 'patient_id').annotate(total=Sum('amount')).order_by():
+        balances[(branch_id, patient_id)] += total or 0
+    return balances
+
+
+def reconcile(fix=False):
+    """
+    Rozbieżności między PiggyBank a wierszami źródłowymi bieżącego tenanta:
+    {(branch_id, patient_id): (zapisane, oczekiwane)}. Z fix=True poprawia salda.
+    """
+    if not fix:
+        return _mismatches()
+
+    with transaction.atomic():
+        # Wstrzymuje zapisy wpłat i zobowiązań do końca poprawki - inaczej
+        # zmiana w międzyczasie zostałaby policzona dwa razy
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"LOCK TABLE {Obligation._meta.db_table}, {Deposits._meta.db_table}, "
+                f"{PiggyBank._meta.db_table} IN SHARE ROW EXCLUSIVE MODE"
+            )
+        mismatches = _mismatches()
+        PiggyBank.objects.apply({
+            key: expected_sum - (stored_sum or 0) for key, (stored_sum, expected_sum) in mismatches.items()
+        })
+    return mismatches
+
+
+def _mismatches():
+    expected = expected_balances()
+    stored = {
+        (branch_id, patient_id): total or Decimal(0)
+        for branch_id, patient_id, total in PiggyBank.objects.values_list('branch_id', 'patient_id', 'sum')
+    }
+
+    mismatches = {}
+    for key in expected.keys() | stored.keys():
+        expected_sum, stored_sum = expected.get(key, Decimal(0)), stored.get(key)
+        if stored_sum is None and not expected_sum:
+            continue
+        if stored_sum != expected_sum:
+            mismatches[key] = (stored_sum, expected_sum)
+    return mismatches
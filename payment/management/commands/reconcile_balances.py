@@ -0,0 +1,25 @@
+from django.core.management.base import CommandError
+
+from institution.management.base import TenantParallelCommand
+from payment.ledger import reconcile
+
+
+class Command(TenantParallelCommand):
+    help = "Porównuje salda pacjentów (PiggyBank) z wpłatami i zobowiązaniami; z --fix je poprawia."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--fix', action='store_true', help="Popraw rozbieżne salda.")
+
+    def handle_tenant(self, schema_name, **options):
+        mismatches = reconcile(fix=options['fix'])
+        if not mismatches:
+            return "salda zgodne"
+
+        details = '\n'.join(
+            f"branch {branch_id}, pacjent {patient_id}: zapisane {stored}, oczekiwane {expected}"
+            for (branch_id, patient_id), (stored, expected) in sorted(mismatches.items(), key=lambda item: str(item[0]))
+        )
+        if options['fix']:
+            return f"poprawiono {len(mismatches)} sald\n{details}"
+        raise CommandError(f"{len(mismatches)} rozbieżnych sald\n{details}")
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:43
+
+from django.db import migrations, models
+
+
+# PiggyBank.sum nie był dotąd prowadzony - liczymy salda od nowa z wpłat
+# i zobowiązań, zanim payment/signals.py zacznie je aktualizować
+BACKFILL_BALANCES = """
+    DELETE FROM payment_piggybank;
+    INSERT INTO payment_piggybank (branch_id, patient_id, sum)
+    SELECT branch_id, patient_id, SUM(COALESCE(amount, 0))
+    FROM (
+        SELECT branch_id, patient_id, amount FROM payment_deposits
+        UNION ALL
+        SELECT branch_id, patient_id, amount FROM payment_obligation
+        WHERE to_count AND patient_id IS NOT NULL
+    ) AS entries
+    GROUP BY branch_id, patient_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branch', '0005_branchinfo'),
+        ('patients', '0013_patient_search_indexes'),
+        ('payment', '0009_rename_ammonut_deposits_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(BACKFILL_BALANCES, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='piggybank',
+            constraint=models.UniqueConstraint(fields=('branch', 'patient'), name='piggybank_branch_patient', nulls_distinct=False),
+        ),
+    ]
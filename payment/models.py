@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, connections, transaction
 from patients.models import Patient
 from branch.models import Branch
 
@@ -10,6 +10,11 @@ class Obligation(models.Model):
     is_paid = models.BooleanField(default=False)
     when_paid = models.DateField(null=True, blank=True)
     how_paid = models.CharField(null=True, blank=True, max_length=255)
+
+    def save(self, *args, **kwargs):
+        # Saldo w PiggyBank zmienia się w tej samej transakcji (payment/signals.py)
+        with transaction.atomic(using=kwargs.get('using') or self._state.db):
+            super().save(*args, **kwargs)
     
     
 class Deposits(models.Model):
@@ -18,8 +23,61 @@ class Deposits(models.Model):
     amount = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
     date = models.DateField(auto_now_add=True, null=True, blank=True)
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using') or self._state.db):
+            super().save(*args, **kwargs)
+
+
+class PiggyBankManager(models.Manager):
+
+    def apply(self, deltas, create=True):
+        """
+        Dodaje {(branch_id, patient_id): zmiana} do sald jednym zapytaniem.
+        INSERT ... ON CONFLICT DO UPDATE jest atomowy, więc równoległe zapisy
+        dla tego samego pacjenta nie gubią się nawzajem. Z create=False zmienia
+        tylko istniejące salda - przy kaskadowym usuwaniu pacjenta albo branchu
+        saldo mogło już zniknąć i nie wolno go tworzyć od nowa.
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        table = connections[self.db].ops.quote_name(self.model._meta.db_table)
+        params = []
+        for (branch_id, patient_id), delta in deltas.items():
+            params.extend([branch_id, patient_id, delta])
+
+        with connections[self.db].cursor() as cursor:
+            if create:
+                values = ', '.join(['(%s, %s, %s)'] * len(deltas))
+                cursor.execute(
+                    f"INSERT INTO {table} (branch_id, patient_id, sum) VALUES {values} "
+                    f"ON CONFLICT (branch_id, patient_id) DO UPDATE SET sum = COALESCE({table}.sum, 0) + EXCLUDED.sum",
+                    params
+                )
+            else:
+                values = ', '.join(['(%s::bigint, %s::bigint, %s::numeric)'] * len(deltas))
+                cursor.execute(
+                    f"UPDATE {table} SET sum = COALESCE({table}.sum, 0) + v.delta "
+                    f"FROM (VALUES {values}) AS v (branch_id, patient_id, delta) "
+                    f"WHERE {table}.branch_id IS NOT DISTINCT FROM v.branch_id AND {table}.patient_id = v.patient_id",
+                    params
+                )
+
+    def balance(self, branch_id, patient_id):
+        return self.filter(branch_id=branch_id, patient_id=patient_id).values_list('sum', flat=True).first() or 0
+
 
 class PiggyBank(models.Model):
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, null=True, blank=True)
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
-    sum = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
\ No newline at end of file
+    sum = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+
+    objects = PiggyBankManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['branch', 'patient'], name='piggybank_branch_patient', nulls_distinct=False
+            ),
+        ]
@@ -1,6 +1,5 @@
 from .models import Deposits, PiggyBank, Obligation
 from rest_framework import serializers
-from django.db.models import Sum
 from patients.models import Patient
 
 
@@ -34,11 +33,6 @@ class GetUserHistory(serializers.ModelSerializer):
         return ObligationSerializerMain(obligation_qs, many=True).data
 
     def get_sum(self, obj):
-        deposit_qs = self.context.get('deposit_qs', [])
-        deposit_sum = deposit_qs.aggregate(total=Sum('amount'))['total'] or 0
-
-        obligation_qs = self.context.get('obligation_qs', [])
-        obligation_sum = obligation_qs.filter(to_count=True).aggregate(total=Sum('amount'))['total'] or 0
-
-        return deposit_sum + obligation_sum
+        # Saldo prowadzone w PiggyBank (payment/ledger.py)
+        return self.context.get('balance', 0)
     
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Obligation, Deposits
+from .ledger import entry, stored_entry, apply_change
+
+
+@receiver(pre_save, sender=Obligation)
+@receiver(pre_save, sender=Deposits)
+def store_ledger_old_entry(sender, instance, **kwargs):
+    instance._ledger_old = stored_entry(sender, instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=Obligation)
+@receiver(post_save, sender=Deposits)
+def update_balance_on_save(sender, instance, **kwargs):
+    apply_change(getattr(instance, '_ledger_old', None), entry(instance))
+
+
+@receiver(post_delete, sender=Obligation)
+@receiver(post_delete, sender=Deposits)
+def update_balance_on_delete(sender, instance, **kwargs):
+    apply_change(entry(instance), None)
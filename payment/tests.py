@@ -1,3 +1,125 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from django_tenants.utils import tenant_context
+
+from institution.models import CentralUser, Domain
+from institution.serializers import InstitutionSerializer
+from branch.models import Branch
+from patients.models import Patient
+from payment import ledger
+from payment.models import Obligation, Deposits, PiggyBank
+
+
+class PatientBalanceTestCase(TestCase):
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+        self.client = APIClient()
+        payload = {
+            "name": "Instytucja Saldo",
+            "owner_email": "saldo@example.com",
+            "owner_password": "test12345",
+            "owner_name": "Jan",
+            "owner_surname": "Kowalski",
+            "owner_phone_number": "+48123456789",
+        }
+        serializer = InstitutionSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.institution = serializer.save()
+        self.domain_obj = Domain.objects.get(tenant=self.institution)
+        self.client.force_authenticate(user=CentralUser.objects.get(email=payload["owner_email"]))
+
+        with tenant_context(self.institution):
+            self.branch = Branch.objects.filter(is_mother=True).first()
+            self.patient = Patient.objects.create(
+                branch=self.branch, name="Anna", surname="Nowak", email="anna@example.com", age=30
+            )
+
+        self.url = f"/{self.branch.identyficator}/payment/"
+
+    def tearDown(self):
+        connection.set_schema_to_public()
+
+    def balance(self):
+        with tenant_context(self.institution):
+            return PiggyBank.objects.balance(self.branch.id, self.patient.id)
+
+    def test_balance_follows_deposits_and_obligations(self):
+        response = self.client.post(
+            self.url + f"{self.patient.id}/deposit/", data={"amount": "100.00"}, format='json',
+            HTTP_HOST=self.domain_obj.domain
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        deposit_id = response.json()['id']
+
+        response = self.client.post(
+            self.url + f"{self.patient.id}/obligation/", data={"amount": "-40.00"}, format='json',
+            HTTP_HOST=self.domain_obj.domain
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        # Zobowiązanie bez to_count nie wchodzi do salda
+        self.assertEqual(self.balance(), Decimal('100.00'))
+
+        with tenant_context(self.institution):
+            obligation = Obligation.objects.get(id=response.json()['id'])
+            obligation.to_count = True
+            obligation.save()
+        self.assertEqual(self.balance(), Decimal('60.00'))
+
+        response = self.client.patch(
+            self.url + f"{self.patient.id}/deposit/{deposit_id}/", data={"amount": "150.00"}, format='json',
+            HTTP_HOST=self.domain_obj.domain
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        self.assertEqual(self.balance(), Decimal('110.00'))
+
+        response = self.client.delete(
+            self.url + f"{self.patient.id}/deposit/{deposit_id}/", HTTP_HOST=self.domain_obj.domain
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.balance(), Decimal('-40.00'))
+
+        # Historia czyta saldo z PiggyBank zamiast agregować wpłaty i zobowiązania
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                self.url + f"patient_payment_history/{self.patient.id}/", HTTP_HOST=self.domain_obj.domain
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        self.assertEqual(Decimal(str(response.json()['sum'])), Decimal('-40.00'))
+        self.assertFalse([query['sql'] for query in queries.captured_queries if 'SUM(' in query['sql']])
+
+    def test_bulk_created_obligations_and_patient_delete(self):
+        with tenant_context(self.institution):
+            obligations = Obligation.objects.bulk_create([
+                Obligation(amount=Decimal('25.00'), to_count=True, branch=self.branch, patient=self.patient),
+                Obligation(amount=Decimal('15.00'), to_count=True, branch=self.branch, patient=self.patient),
+            ])
+            ledger.record_created(obligations)
+            Deposits.objects.create(amount=Decimal('5.00'), branch=self.branch, patient=self.patient)
+        self.assertEqual(self.balance(), Decimal('45.00'))
+
+        # Kaskada usuwa saldo razem z wpisami - bez odtwarzania wiersza dla usuniętego pacjenta
+        with tenant_context(self.institution):
+            self.patient.delete()
+            self.assertFalse(PiggyBank.objects.exists())
+
+    def test_reconcile_command(self):
+        with tenant_context(self.institution):
+            Deposits.objects.create(amount=Decimal('80.00'), branch=self.branch, patient=self.patient)
+            PiggyBank.objects.filter(patient=self.patient).update(sum=Decimal('1.00'))
+
+        with self.assertRaises(CommandError):
+            call_command('reconcile_balances', stdout=StringIO(), stderr=StringIO())
 
-# Create your tests here.
+        call_command('reconcile_balances', fix=True, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(self.balance(), Decimal('80.00'))
+        call_command('reconcile_balances', stdout=StringIO(), stderr=StringIO())
@@ -2,36 +2,34 @@ from django.shortcuts import render, get_object_or_404
 from django.core.exceptions import ValidationError
 
 from .serializers import DepositSerializer, ObligationSerializerMain, GetUserHistory
-from .models import Deposits, Obligation
+from .models import Deposits, Obligation, PiggyBank
 from user_profile.permissions import IsOwnerOfInstitution
 from patients.models import Patient
-from branch.models import Branch
+from branch.mixins import BranchContextMixin
 
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-class ObligationViewSet(viewsets.ModelViewSet):
+class ObligationViewSet(BranchContextMixin, viewsets.ModelViewSet):
     serializer_class = ObligationSerializerMain
     queryset = Obligation.objects.none()
     permission_classes = [IsOwnerOfInstitution]
 
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
         patient_id = self.kwargs.get('patient_id')
         
-        if not branch_uuid or not patient_id:
+        if not patient_id:
             raise ValidationError("Both 'branch_uuid' and 'patient_id' are required.")
         
-        queryset = Obligation.objects.filter(branch__identyficator=branch_uuid, patient=patient_id).select_related('branch', 'patient')
+        queryset = Obligation.objects.filter(branch_id=self.get_branch_id(), patient=patient_id).select_related('branch', 'patient')
 
         return queryset
     
     def perform_create(self, serializer):
-        branch_uuid = self.kwargs.get('branch_uuid')
         patient_id = self.kwargs.get('patient_id')
 
-        branch = get_object_or_404(Branch, identyficator=branch_uuid)
+        branch = self.get_branch()
         patient = get_object_or_404(Patient, id=patient_id)
 
         serializer.save(branch=branch, patient=patient)
@@ -39,27 +37,25 @@ class ObligationViewSet(viewsets.ModelViewSet):
         return serializer
 
 
-class DepositViewSet(viewsets.ModelViewSet):
+class DepositViewSet(BranchContextMixin, viewsets.ModelViewSet):
     serializer_class = DepositSerializer
     queryset = Deposits.objects.none()
     permission_classes = [IsOwnerOfInstitution]
 
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
         patient_id = self.kwargs.get('patient_id')
         
-        if not branch_uuid or not patient_id:
+        if not patient_id:
             raise ValidationError("Both 'branch_uuid' and 'patient_id' are required.")
         
-        queryset = Deposits.objects.filter(branch__identyficator=branch_uuid, patient=patient_id).select_related('branch', 'patient')
+        queryset = Deposits.objects.filter(branch_id=self.get_branch_id(), patient=patient_id).select_related('branch', 'patient')
 
         return queryset
     
     def perform_create(self, serializer):
-        branch_uuid = self.kwargs.get('branch_uuid')
         patient_id = self.kwargs.get('patient_id')
 
-        branch = get_object_or_404(Branch, identyficator=branch_uuid)
+        branch = self.get_branch()
         patient = get_object_or_404(Patient, id=patient_id)
 
         serializer.save(branch=branch, patient=patient)
@@ -67,11 +63,11 @@ class DepositViewSet(viewsets.ModelViewSet):
         return serializer
     
 
-class UserHistoryApiView(APIView):
+class UserHistoryApiView(BranchContextMixin, APIView):
     permission_classes = [IsOwnerOfInstitution]
 
     def get(self, request, branch_uuid, patient_id):
-        branch = get_object_or_404(Branch, identyficator=branch_uuid)
+        branch = self.get_branch()
         patient = get_object_or_404(Patient, id=patient_id)
 
         deposit_qs = Deposits.objects.filter(branch=branch, patient=patient)
@@ -81,7 +77,8 @@ class UserHistoryApiView(APIView):
             instance=patient,
             context={
                 'deposit_qs': deposit_qs,
-                'obligation_qs': obligation_qs
+                'obligation_qs': obligation_qs,
+                'balance': PiggyBank.objects.balance(branch.id, patient.id),
             }
         )
         return Response(serializer.data, status=200)
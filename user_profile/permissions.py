@@ -1,6 +1,5 @@
 from rest_framework import permissions
-from user_profile.models import ProfileCentralUser
-from branch.models import Branch
+from branch.mixins import get_membership
 
 class HasProfilePermission(permissions.BasePermission):
     message = "User doesn't have a profile in this Branch."
@@ -9,11 +8,11 @@ class HasProfilePermission(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
 
-        branch_uuid = view.kwargs.get('branch_uuid')
-        if not branch_uuid:
+        if not view.kwargs.get('branch_uuid'):
             return False
 
-        return ProfileCentralUser.objects.filter(user=request.user, branch__identyficator=branch_uuid).exists()
+        membership = get_membership(request)
+        return membership is not None and membership['profile_id'] is not None
     
 
 class IsOwnerOfInstitution(permissions.BasePermission):
@@ -25,21 +24,9 @@ class IsOwnerOfInstitution(permissions.BasePermission):
         if not user.is_authenticated:
             return False
         
-        branch_uuid = view.kwargs.get('branch_uuid')
-        
-        if not branch_uuid:
-            return False
-        try:
-            profile = ProfileCentralUser.objects.get(user=user)
-            branch = Branch.objects.get(identyficator=branch_uuid)
-            
-            if branch.owner == profile:
-                return True
-            return False
-        
-        except (ProfileCentralUser.DoesNotExist, Branch.DoesNotExist):
+        if not view.kwargs.get('branch_uuid'):
             return False
-        
-    
-        
-        
\ No newline at end of file
+
+        # Właściciel może mieć profile w kilku branchach - porównujemy użytkownika, nie profil
+        membership = get_membership(request)
+        return membership is not None and membership['is_owner']
@@ -3,7 +3,7 @@ from user_profile.models import ProfileCentralUser
 from custom_user.models import CentralUser, make_random_password
 from institution.models import UserInstitution
 from django.db import transaction
-from django_tenants.utils import tenant_context
+from branch.mixins import get_branch, get_profile as get_branch_profile
 
 
 class ProfileCentral(serializers.ModelSerializer):
@@ -22,19 +22,15 @@ class MeProfileSerializer(serializers.ModelSerializer):
 
     def get_profile(self, obj):
         request = self.context.get('request')
-        tenant = getattr(request, 'tenant', None)
-        branch_uuid = self.context.get('branch_uuid')
-
-        if tenant and branch_uuid:
-            with tenant_context(tenant):
-                try:
-                    profile = obj.profile.get(branch__identyficator=branch_uuid)
-                    return ProfileCentral(profile, context=self.context).data
-                except ProfileCentralUser.DoesNotExist:
-                    return None
-        else:
+        if request is None or getattr(request, 'tenant', None) is None:
             return None
 
+        # Profil z uprawnień (HasProfilePermission) - bez ponownego zapytania
+        profile = get_branch_profile(request)
+        if profile is None or profile.user_id != obj.id:
+            return None
+        return ProfileCentral(profile, context=self.context).data
+
 
 class ProfileCentralUserSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(source='user.email')
@@ -70,7 +66,7 @@ class EmployeeProfileSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         email = validated_data.pop('email')
         institution = self.context['request'].tenant 
-        branch = self.context['request'].branch
+        branch = get_branch(self.context['request'])
 
         with transaction.atomic():
             central_user, created = CentralUser.objects.get_or_create(email=email)
@@ -13,41 +13,34 @@ from user_profile.serializers import EmployeeProfileSerializer
 from user_profile.models import ProfileCentralUser, UserRoles
 from user_profile.permissions import HasProfilePermission, IsOwnerOfInstitution
 
-from branch.models import Branch
+from branch.mixins import BranchContextMixin
 
 
 # Lista pracowników na zasadzie Imie nazwiko rola
-class ProfileListView(ListAPIView):
+class ProfileListView(BranchContextMixin, ListAPIView):
     serializer_class = ProfileCentralUserSerializer
     permission_classes = [IsOwnerOfInstitution]
     
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        return ProfileCentralUser.objects.filter(branch__identyficator=branch_uuid)
+        return ProfileCentralUser.objects.filter(branch_id=self.get_branch_id())
 
 class CurrentProfile(APIView):
     permission_classes = [HasProfilePermission]
 
     def get(self, request, *args, **kwargs):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        serializer = MeProfileSerializer(request.user, context={'request': request, 'branch_uuid': branch_uuid})
+        serializer = MeProfileSerializer(request.user, context={'request': request})
         return Response(serializer.data)
 
 # Cały CRUD Związany z pracownikami 
-class EmployeeProfileViewSet(viewsets.ModelViewSet):
+class EmployeeProfileViewSet(BranchContextMixin, viewsets.ModelViewSet):
     serializer_class = EmployeeProfileSerializer
     permission_classes = [IsOwnerOfInstitution]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['role']
 
     def get_queryset(self):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        return ProfileCentralUser.objects.filter(branch__identyficator=branch_uuid)
+        return ProfileCentralUser.objects.filter(branch_id=self.get_branch_id())
 
     def perform_create(self, serializer):
-        branch_uuid = self.kwargs.get('branch_uuid')
-        branch = Branch.objects.get(identyficator=branch_uuid)
-        self.request.branch = branch
-        # Dodanie branch do walidacji
-        serializer.save(branch=branch)
+        serializer.save(branch=self.get_branch())
     